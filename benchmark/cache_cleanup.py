@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Measure time cache generator's cleaner takes on synthetic data of
+growing size, to check how it scales. Expressions of effects form
+chains, so that rows are found to be needed one link at a time.
+"""
+
+
+import argparse
+import os.path
+import sys
+import time
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')))
+
+from eos.benchmark.util import make_raw_data
+
+
+def add_expression_chains(raw_data, depth):
+    """Make expression trees of effects chains of passed depth."""
+    expressions = raw_data['dgmexpressions']
+    expression_id = max(row['expressionID'] for row in expressions) + 1
+    for effect_row in raw_data['dgmeffects']:
+        head_id = None
+        for _ in range(depth):
+            expressions.append({
+                'expressionID': expression_id, 'operandID': 17, 'arg1': head_id, 'arg2': None,
+                'expressionValue': None, 'expressionTypeID': None, 'expressionGroupID': None,
+                'expressionAttributeID': None})
+            head_id = expression_id
+            expression_id += 1
+        effect_row['postExpression'] = head_id
+
+
+def make_tables(raw_data):
+    """Put raw data into tables, the way generator does it."""
+    from eos.data.cache_generator.generator import TABLE_INDEXES
+    from eos.data.cache_generator.table import Table
+    data = {}
+    for table_name, rows in raw_data.items():
+        table = data[table_name] = Table(TABLE_INDEXES[table_name])
+        for table_pos, row in enumerate(rows):
+            row = dict(row)
+            row['table_pos'] = table_pos
+            table.add(row)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scaling of cache generator cleaner')
+    parser.add_argument('--types', type=int, default=5000, help='amount of synthetic types in smallest data set')
+    parser.add_argument('--effects', type=int, default=500, help='amount of synthetic effects in smallest data set')
+    parser.add_argument('--chain-depth', type=int, default=20, help='depth of expression chains')
+    parser.add_argument('--steps', type=int, default=4, help='amount of data sets, each twice as big as previous')
+    args = parser.parse_args()
+
+    from eos.data.cache_generator.cleaner import Cleaner
+
+    print('{:>8} {:>8} {:>8} {:>9} {:>14}'.format('types', 'effects', 'rows', 'clean, s', 'us per row'))
+    for step in range(args.steps):
+        scale = 2 ** step
+        raw_data = make_raw_data(args.types * scale, args.effects * scale)
+        add_expression_chains(raw_data, args.chain_depth)
+        data = make_tables(raw_data)
+        row_amount = sum(len(table) for table in data.values())
+        start = time.perf_counter()
+        Cleaner().clean(data)
+        elapsed = time.perf_counter() - start
+        print('{:>8} {:>8} {:>8} {:>9.3f} {:>14.2f}'.format(
+            args.types * scale, args.effects * scale, row_amount, elapsed, elapsed / row_amount * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Measure time cache generation and its stages take with different
+amounts of processes, and check that all of them give the same result.
+Data is read by JSON data handler from Phobos-like dump, either
+existing or synthetic one.
+"""
+
+
+import argparse
+import json
+import os.path
+import sys
+import time
+from tempfile import TemporaryDirectory
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')))
+
+from eos.benchmark.util import make_raw_data
+
+
+def write_phobos_dump(raw_data, dump_path):
+    """Write raw data the way Phobos dumps it."""
+    for table_name, rows in raw_data.items():
+        # These tables are dumped as dictionaries keyed by ID
+        if table_name == 'evetypes':
+            rows = {str(row['typeID']): row for row in rows}
+        elif table_name == 'evegroups':
+            rows = {str(row['groupID']): row for row in rows}
+        with open(os.path.join(dump_path, '{}.json'.format(table_name)), 'w', encoding='utf8') as file:
+            json.dump(rows, file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel cache generation')
+    parser.add_argument(
+        '--phobos-dump', type=str, default=None,
+        help='path to existing Phobos JSON dump; if not specified, synthetic data is used')
+    parser.add_argument('--types', type=int, default=30000, help='amount of synthetic types')
+    parser.add_argument('--effects', type=int, default=4000, help='amount of synthetic effects')
+    parser.add_argument(
+        '--processes', type=int, nargs='+', default=[1, 2, 4],
+        help='amounts of processes to measure generation with')
+    args = parser.parse_args()
+
+    from eos.data.cache_generator import CacheGenerator
+    from eos.data.data_handler import JsonDataHandler
+
+    with TemporaryDirectory() as tmp_dir:
+        if args.phobos_dump is None:
+            dump_path = tmp_dir
+            write_phobos_dump(make_raw_data(args.types, args.effects), dump_path)
+        else:
+            dump_path = os.path.expanduser(args.phobos_dump)
+        data_handler = JsonDataHandler(dump_path)
+        reference = None
+        for processes in args.processes:
+            generator = CacheGenerator(processes=processes)
+            start = time.perf_counter()
+            data = generator.run(data_handler)
+            elapsed = time.perf_counter() - start
+            serialized = json.dumps(data, sort_keys=True)
+            if reference is None:
+                reference = serialized
+            print('processes: {}, generation: {:.3f}s, identical: {}'.format(
+                processes, elapsed, 'yes' if serialized == reference else 'NO'))
+            for stage_name, stage_time in generator.stage_timings.items():
+                print('  {:<12} {:>8.3f}s'.format(stage_name, stage_time))
+            print('  tables loaded: {}'.format(', '.join(
+                '{} {:.3f}s'.format(tablename, table_time)
+                for tablename, table_time in generator.table_timings.items())))
+            modinfo_cache = generator.modinfo_cache
+            print('  modifier info YAML: {} parsed in {:.3f}s, {} reused'.format(
+                modinfo_cache.misses, modinfo_cache.parse_time, modinfo_cache.hits))
+            modifier_refs = sum(len(effect['modifiers']) for effect in data['effects'])
+            print('  modifiers: {} stored, {} referenced by effects'.format(len(data['modifiers']), modifier_refs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Compare load time and memory use of JSON and binary cache handlers.
+Each handler is measured in fresh process, so that numbers are not
+affected by data left from other runs.
+"""
+
+
+import argparse
+import multiprocessing
+import os.path
+import sys
+import time
+from tempfile import TemporaryDirectory
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')))
+
+from eos.benchmark.util import get_rss, make_cache_data
+
+
+def measure(handler_name, cache_path, type_ids, queue):
+    from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler
+    handler_class = {'json': JsonCacheHandler, 'binary': BinaryCacheHandler}[handler_name]
+    rss_before = get_rss()
+    start = time.perf_counter()
+    cache_handler = handler_class(cache_path)
+    cache_handler.get_fingerprint()
+    init_time = time.perf_counter() - start
+    rss_init = get_rss()
+    start = time.perf_counter()
+    # Keep references to make sure objects stay in weakref cache
+    types = [cache_handler.get_type(type_id) for type_id in type_ids]
+    fetch_time = time.perf_counter() - start
+    rss_fetch = get_rss()
+    queue.put((init_time, fetch_time, rss_init - rss_before, rss_fetch - rss_before, len(types)))
+
+
+def run_measurement(handler_name, cache_path, type_ids):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(handler_name, cache_path, type_ids, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark cache handler load time and memory')
+    parser.add_argument(
+        '--json-cache', type=str, default=None,
+        help='path to existing JSON cache; if not specified, synthetic data is used')
+    parser.add_argument('--types', type=int, default=30000, help='amount of synthetic types')
+    parser.add_argument('--sample', type=int, default=1000, help='amount of types to fetch')
+    args = parser.parse_args()
+
+    from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler
+    from eos.data.cache_handler.json_cache_handler import read_json_cache
+
+    with TemporaryDirectory() as tmp_dir:
+        if args.json_cache is None:
+            json_path = os.path.join(tmp_dir, 'cache.json.bz2')
+            JsonCacheHandler(json_path).update_cache(make_cache_data(args.types), 'benchmark')
+        else:
+            json_path = os.path.expanduser(args.json_cache)
+        binary_path = os.path.join(tmp_dir, 'cache.bin')
+        start = time.perf_counter()
+        BinaryCacheHandler(binary_path).import_json_cache(json_path)
+        print('conversion from JSON: {:.2f}s'.format(time.perf_counter() - start))
+        type_ids = sorted(int(k) for k in read_json_cache(json_path)['types'])[:args.sample]
+        print('{:<8} {:>10} {:>14} {:>12} {:>13}'.format(
+            'handler', 'init, s', 'fetch {}, s'.format(len(type_ids)), 'init RSS, MB', 'fetch RSS, MB'))
+        for handler_name, cache_path in (('json', json_path), ('binary', binary_path)):
+            init_time, fetch_time, rss_init, rss_fetch, _ = run_measurement(handler_name, cache_path, type_ids)
+            print('{:<8} {:>10.3f} {:>14.3f} {:>12.1f} {:>13.1f}'.format(
+                handler_name, init_time, fetch_time, rss_init, rss_fetch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Compare memory taken by several JSON cache sources with mostly the
+same data, when they are loaded independently and when they share
+records and cache objects via interner. Each variant is measured
+in fresh process.
+"""
+
+
+import argparse
+import multiprocessing
+import os.path
+import random
+import sys
+import time
+import tracemalloc
+from tempfile import TemporaryDirectory
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')))
+
+from eos.benchmark.util import make_cache_data
+
+
+def make_variant(data, changed_share, seed):
+    """Change attribute values of some share of types."""
+    rng = random.Random(seed)
+    for type_row in data['types']:
+        if rng.random() < changed_share and type_row['attributes']:
+            attr_id = rng.choice(list(type_row['attributes']))
+            type_row['attributes'][attr_id] = rng.random() * 1000
+    return data
+
+
+def measure(cache_paths, use_interner, queue):
+    from eos.data.cache_handler import CacheInterner, JsonCacheHandler
+    tracemalloc.start()
+    start = time.perf_counter()
+    interner = CacheInterner() if use_interner else None
+    cache_handlers = []
+    types = []
+    for cache_path in cache_paths:
+        cache_handler = JsonCacheHandler(cache_path, interner=interner)
+        types.extend(cache_handler.get_types(cache_handler.get_type_ids()))
+        cache_handlers.append(cache_handler)
+    elapsed = time.perf_counter() - start
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    queue.put((elapsed, allocated / 1024 / 1024))
+
+
+def run_measurement(cache_paths, use_interner):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(cache_paths, use_interner, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark memory taken by similar sources')
+    parser.add_argument('--types', type=int, default=30000, help='amount of synthetic types')
+    parser.add_argument('--sources', type=int, default=3, help='max amount of sources')
+    parser.add_argument(
+        '--changed', type=float, default=0.01,
+        help='share of types which differ between sources')
+    args = parser.parse_args()
+
+    from eos.data.cache_handler import JsonCacheHandler
+
+    with TemporaryDirectory() as tmp_dir:
+        cache_paths = []
+        for source_num in range(args.sources):
+            data = make_cache_data(args.types)
+            if source_num > 0:
+                make_variant(data, args.changed, source_num)
+            cache_path = os.path.join(tmp_dir, 'cache{}.json.bz2'.format(source_num))
+            JsonCacheHandler(cache_path).update_cache(data, 'source{}'.format(source_num))
+            cache_paths.append(cache_path)
+        print('{:<9} {:>8} {:>10} {:>15}'.format('mode', 'sources', 'load, s', 'allocated, MB'))
+        for use_interner in (False, True):
+            for source_amount in range(1, args.sources + 1):
+                elapsed, allocated = run_measurement(cache_paths[:source_amount], use_interner)
+                print('{:<9} {:>8} {:>10.3f} {:>15.1f}'.format(
+                    'interned' if use_interner else 'separate', source_amount, elapsed, allocated))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Compare memory taken by all types of cache when they are assembled
+into current cache objects (slotted, with compact attribute maps and
+shared modifier tuples) and into legacy ones (regular instances with
+attribute dictionaries). Each model is measured in fresh process.
+"""
+
+
+import argparse
+import multiprocessing
+import os.path
+import sys
+import time
+import tracemalloc
+from tempfile import TemporaryDirectory
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')))
+
+from eos.benchmark.util import get_rss, make_cache_data
+
+
+class LegacyObject:
+    """Regular instance, which stores everything in its dictionary."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def build_legacy(cache_handler, type_ids):
+    """
+    Assemble objects the way cache handlers did it before cache
+    objects became compact.
+    """
+    modifiers = {}
+    effects = {}
+
+    def get_modifier(modifier_id):
+        try:
+            return modifiers[modifier_id]
+        except KeyError:
+            data = cache_handler._get_modifier_record(modifier_id)
+            modifier = modifiers[modifier_id] = LegacyObject(
+                id=modifier_id, state=data[0], scope=data[1], src_attr=data[2], operator=data[3],
+                tgt_attr=data[4], domain=data[5], filter_type=data[6], filter_value=data[7])
+            return modifier
+
+    def get_effect(effect_id):
+        try:
+            return effects[effect_id]
+        except KeyError:
+            data = cache_handler._get_effect_record(effect_id)
+            effect = effects[effect_id] = LegacyObject(
+                id=effect_id, category=data[0], is_offensive=data[1], is_assistance=data[2],
+                duration_attribute=data[3], discharge_attribute=data[4], range_attribute=data[5],
+                falloff_attribute=data[6], tracking_speed_attribute=data[7],
+                fitting_usage_chance_attribute=data[8], build_status=data[9],
+                modifiers=tuple(get_modifier(modifier_id) for modifier_id in data[10]))
+            return effect
+
+    types = []
+    for type_id in type_ids:
+        # Derived attributes were stored on instances as well, take
+        # their values from current model to keep logic the same
+        current = cache_handler.get_type(type_id)
+        data = cache_handler._get_type_record(type_id)
+        type_effects = tuple(get_effect(effect_id) for effect_id in data[3])
+        types.append(LegacyObject(
+            id=type_id, group=data[0], category=data[1],
+            attributes={attr_id: attr_val for attr_id, attr_val in data[2]},
+            effects=type_effects,
+            default_effect=None if data[4] is None else get_effect(data[4]),
+            required_skills=dict(current.required_skills),
+            max_state=current.max_state,
+            slots=set(current.slots)))
+    return types
+
+
+def build_current(cache_handler, type_ids):
+    types = []
+    for type_id in type_ids:
+        type_ = cache_handler.get_type(type_id)
+        # Touch derived attributes, as fits do
+        type_.required_skills
+        type_.max_state
+        type_.slots
+        types.append(type_)
+    return types
+
+
+def measure(model, cache_path, queue):
+    from eos.data.cache_handler import BinaryCacheHandler
+    cache_handler = BinaryCacheHandler(cache_path)
+    type_ids = cache_handler._reader.get_record_ids('types')
+    builder = {'legacy': build_legacy, 'current': build_current}[model]
+    rss_before = get_rss()
+    tracemalloc.start()
+    start = time.perf_counter()
+    types = builder(cache_handler, type_ids)
+    build_time = time.perf_counter() - start
+    # Legacy builder uses current objects as temporary source of
+    # derived attributes; make sure they are gone before measuring
+    if model == 'legacy':
+        cache_handler._clear_object_cache()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    queue.put((len(types), build_time, allocated / 1024 / 1024, get_rss() - rss_before))
+
+
+def run_measurement(model, cache_path):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(model, cache_path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark memory taken by assembled cache objects')
+    parser.add_argument(
+        '--binary-cache', type=str, default=None,
+        help='path to existing binary cache; if not specified, synthetic data is used')
+    parser.add_argument('--types', type=int, default=30000, help='amount of synthetic types')
+    args = parser.parse_args()
+
+    from eos.data.cache_handler import BinaryCacheHandler
+
+    with TemporaryDirectory() as tmp_dir:
+        if args.binary_cache is None:
+            cache_path = os.path.join(tmp_dir, 'cache.bin')
+            BinaryCacheHandler(cache_path).update_cache(make_cache_data(args.types), 'benchmark')
+        else:
+            cache_path = os.path.expanduser(args.binary_cache)
+        print('{:<8} {:>8} {:>10} {:>15} {:>9}'.format('model', 'types', 'build, s', 'allocated, MB', 'RSS, MB'))
+        for model in ('legacy', 'current'):
+            type_amount, build_time, allocated, rss = run_measurement(model, cache_path)
+            print('{:<8} {:>8} {:>10.3f} {:>15.1f} {:>9.1f}'.format(model, type_amount, build_time, allocated, rss))
+
+
+if __name__ == '__main__':
+    main()
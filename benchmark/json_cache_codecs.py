@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Compare compression codecs of JSON cache: file size, time it takes
+to load cache body and peak memory taken during load. Each load is
+measured in fresh process. For comparison, cache body written as
+single JSON object (format used before line-based one) is measured
+too; it's read the way it was read back then, as whole.
+"""
+
+
+import argparse
+import bz2
+import json
+import multiprocessing
+import os.path
+import sys
+import time
+from tempfile import TemporaryDirectory
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')))
+
+from eos.benchmark.util import get_peak_rss, get_rss, make_cache_data
+
+
+def read_single_object(cache_path):
+    with bz2.BZ2File(cache_path, 'r') as file:
+        json_data = file.read().decode('utf-8')
+        return json.loads(json_data)
+
+
+def measure(cache_path, single_object, queue):
+    from eos.data.cache_handler.json_cache_handler import read_json_cache
+    reader = read_single_object if single_object else read_json_cache
+    rss_before = get_rss()
+    start = time.perf_counter()
+    data = reader(cache_path)
+    load_time = time.perf_counter() - start
+    queue.put((load_time, get_peak_rss() - rss_before, get_rss() - rss_before, len(data['types'])))
+
+
+def run_measurement(cache_path, single_object):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(cache_path, single_object, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON cache compression codecs')
+    parser.add_argument('--types', type=int, default=30000, help='amount of synthetic types')
+    args = parser.parse_args()
+
+    from eos.data.cache_handler import JsonCacheHandler
+    from eos.data.cache_handler.json_cache_handler import CODECS
+    from eos.data.cache_handler.record_handler import strip_data
+
+    data = make_cache_data(args.types)
+    with TemporaryDirectory() as tmp_dir:
+        cases = []
+        for codec in CODECS:
+            cache_path = os.path.join(tmp_dir, 'cache_{}.json'.format(codec))
+            start = time.perf_counter()
+            JsonCacheHandler(cache_path, codec=codec).update_cache(data, 'benchmark')
+            cases.append((codec, cache_path, False, time.perf_counter() - start))
+        cache_path = os.path.join(tmp_dir, 'cache_single.json.bz2')
+        start = time.perf_counter()
+        single_data = strip_data(data)
+        single_data['fingerprint'] = 'benchmark'
+        with bz2.BZ2File(cache_path, 'w') as file:
+            file.write(json.dumps(single_data).encode('utf-8'))
+        cases.append(('bz2 (single object)', cache_path, True, time.perf_counter() - start))
+        print('{:<20} {:>10} {:>9} {:>8} {:>13} {:>12}'.format(
+            'codec', 'size, MB', 'write, s', 'load, s', 'peak RSS, MB', 'final RSS, MB'))
+        for name, cache_path, single_object, write_time in cases:
+            load_time, peak_rss, final_rss, _ = run_measurement(cache_path, single_object)
+            size = os.path.getsize(cache_path) / 1024 / 1024
+            print('{:<20} {:>10.2f} {:>9.2f} {:>8.2f} {:>13.1f} {:>12.1f}'.format(
+                name, size, write_time, load_time, peak_rss, final_rss))
+
+
+if __name__ == '__main__':
+    main()
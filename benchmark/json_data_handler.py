@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Measure time and peak memory JSON data handler takes to read
+Phobos dump tables, compared to loading whole files at once.
+"""
+
+
+import argparse
+import json
+import os.path
+import sys
+import time
+import tracemalloc
+from tempfile import TemporaryDirectory
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')))
+
+from eos.benchmark.cache_generation import write_phobos_dump
+from eos.benchmark.util import make_raw_data
+
+
+def measure(func):
+    """
+    Run function twice: to measure time it takes, and then
+    under memory tracing, which slows it down.
+
+    Return value:
+    Tuple with time in seconds and peak traced memory in MB
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming JSON data handler')
+    parser.add_argument(
+        '--phobos-dump', type=str, default=None,
+        help='path to existing Phobos JSON dump; if not specified, synthetic data is used')
+    parser.add_argument('--types', type=int, default=30000, help='amount of synthetic types')
+    parser.add_argument('--effects', type=int, default=4000, help='amount of synthetic effects')
+    args = parser.parse_args()
+
+    from eos.data.cache_generator.generator import TABLE_NAMES
+    from eos.data.data_handler import JsonDataHandler
+
+    with TemporaryDirectory() as tmp_dir:
+        if args.phobos_dump is None:
+            dump_path = tmp_dir
+            write_phobos_dump(make_raw_data(args.types, args.effects), dump_path)
+        else:
+            dump_path = os.path.expanduser(args.phobos_dump)
+        data_handler = JsonDataHandler(dump_path)
+        print('{:<16} {:>10} {:>10} {:>10} {:>10}'.format('table', 'stream, s', 'stream, MB', 'load, s', 'load, MB'))
+        for tablename in TABLE_NAMES:
+
+            def stream():
+                for _ in getattr(data_handler, 'get_{}'.format(tablename))():
+                    pass
+
+            def load():
+                with open(os.path.join(dump_path, '{}.json'.format(tablename)), encoding='utf8') as file:
+                    json.load(file)
+
+            print('{:<16} {:>10.3f} {:>10.1f} {:>10.3f} {:>10.1f}'.format(tablename, *measure(stream), *measure(load)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Compare per-worker memory use when pool of worker processes uses
+source data loaded from JSON cache by every worker, mapped from
+binary cache file, or attached from shared memory block published
+by parent process. All workers of a pool are measured at the same
+moment, so that PSS reflects pages shared between them.
+"""
+
+
+import argparse
+import multiprocessing
+import os.path
+import sys
+import time
+import uuid
+from tempfile import TemporaryDirectory
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')))
+
+from eos.benchmark.util import get_pss, get_rss, make_cache_data
+
+
+def work(mode, location, type_ids, barrier, queue):
+    from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler, SharedMemoryCacheHandler
+    handler_class = {
+        'json': JsonCacheHandler,
+        'binary': BinaryCacheHandler,
+        'shm': SharedMemoryCacheHandler
+    }[mode]
+    rss_before = get_rss()
+    start = time.perf_counter()
+    cache_handler = handler_class(location)
+    # Keep references to make sure objects stay in weakref cache
+    types = [cache_handler.get_type(type_id) for type_id in type_ids]
+    load_time = time.perf_counter() - start
+    # Measure when all workers have their data loaded
+    barrier.wait()
+    queue.put((load_time, get_rss() - rss_before, get_pss(), len(types)))
+    barrier.wait()
+
+
+def run_pool(mode, location, type_ids, worker_amount):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(worker_amount)
+    queue = context.Queue()
+    processes = []
+    for _ in range(worker_amount):
+        process = context.Process(target=work, args=(mode, location, type_ids, barrier, queue))
+        process.start()
+        processes.append(process)
+    results = [queue.get() for _ in range(worker_amount)]
+    for process in processes:
+        process.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark memory use of worker pool per cache handler')
+    parser.add_argument('--types', type=int, default=10000, help='amount of synthetic types')
+    parser.add_argument('--sample', type=int, default=1000, help='amount of types each worker fetches')
+    parser.add_argument(
+        '--workers', type=int, nargs='+', default=[1, 4, 16], help='pool sizes to measure')
+    args = parser.parse_args()
+
+    from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler, SharedMemoryCacheHandler
+
+    with TemporaryDirectory() as tmp_dir:
+        data = make_cache_data(args.types)
+        json_path = os.path.join(tmp_dir, 'cache.json.bz2')
+        JsonCacheHandler(json_path).update_cache(data, 'benchmark')
+        binary_path = os.path.join(tmp_dir, 'cache.bin')
+        BinaryCacheHandler(binary_path).update_cache(data, 'benchmark')
+        shm_name = 'eos_benchmark_{}'.format(uuid.uuid4().hex[:16])
+        publisher = SharedMemoryCacheHandler(shm_name)
+        publisher.import_binary_cache(binary_path)
+        type_ids = list(range(1, min(args.sample, args.types) + 1))
+        print('{:<8} {:>8} {:>8} {:>14} {:>14} {:>14}'.format(
+            'handler', 'workers', 'load, s', 'RSS/worker, MB', 'PSS/worker, MB', 'PSS total, MB'))
+        try:
+            for mode, location in (('json', json_path), ('binary', binary_path), ('shm', shm_name)):
+                for worker_amount in args.workers:
+                    results = run_pool(mode, location, type_ids, worker_amount)
+                    load_time = sum(r[0] for r in results) / worker_amount
+                    rss = sum(r[1] for r in results) / worker_amount
+                    if any(r[2] is None for r in results):
+                        pss = pss_total = float('nan')
+                    else:
+                        pss_total = sum(r[2] for r in results)
+                        pss = pss_total / worker_amount
+                    print('{:<8} {:>8} {:>8.3f} {:>14.1f} {:>14.1f} {:>14.1f}'.format(
+                        mode, worker_amount, load_time, rss, pss, pss_total))
+        finally:
+            publisher.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Measure how long cache generation out of SQLite database takes with
+and without filtering rows of types by SQLite, and with tables loaded
+in different amounts of threads, and check that all of them give the
+same result.
+"""
+
+
+import argparse
+import json
+import os.path
+import sqlite3
+import sys
+import time
+from tempfile import TemporaryDirectory
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')))
+
+from eos.benchmark.util import make_raw_data
+
+
+def write_sqlite_dump(raw_data, db_path):
+    """Write raw data into SQLite database, table per data handler table."""
+    conn = sqlite3.connect(db_path)
+    for table_name, rows in raw_data.items():
+        columns = []
+        for row in rows:
+            for column in row:
+                if column not in columns:
+                    columns.append(column)
+        conn.execute('CREATE TABLE {} ({})'.format(table_name, ', '.join('"{}"'.format(c) for c in columns)))
+        conn.executemany(
+            'INSERT INTO {} VALUES ({})'.format(table_name, ', '.join('?' for _ in columns)),
+            ([row.get(column) for column in columns] for row in rows))
+    conn.commit()
+    conn.close()
+
+
+class PlainDataHandler:
+    """
+    Data handler which passes calls to wrapped one. As it is not
+    based on BaseDataHandler, generator does not ask it to filter
+    rows.
+    """
+
+    def __init__(self, data_handler):
+        self.__data_handler = data_handler
+
+    def __getattr__(self, attr_name):
+        return getattr(self.__data_handler, attr_name)
+
+
+def make_counting_handler(db_path):
+    """
+    Make SQLite data handler which counts rows it provides.
+
+    Return value:
+    Tuple with data handler and dictionary in {table name: row
+    count} format, which is filled as rows are fetched
+    """
+    from eos.data.cache_generator.generator import TABLE_NAMES
+    from eos.data.data_handler import SQLiteDataHandler
+
+    row_counts = {}
+
+    def make_getter(table_name):
+        def getter(self, *args, **kwargs):
+            row_counts[table_name] = 0
+            for row in getattr(SQLiteDataHandler, 'get_{}'.format(table_name))(self, *args, **kwargs):
+                row_counts[table_name] += 1
+                yield row
+        return getter
+
+    handler_class = type('CountingSQLiteDataHandler', (SQLiteDataHandler,), {
+        'get_{}'.format(table_name): make_getter(table_name) for table_name in TABLE_NAMES})
+    return handler_class(db_path), row_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark filtering of rows by SQLite data handler')
+    parser.add_argument(
+        '--database', type=str, default=None,
+        help='path to existing Phobos-like SQLite database; if not specified, synthetic data is used')
+    parser.add_argument('--types', type=int, default=30000, help='amount of synthetic types')
+    parser.add_argument('--effects', type=int, default=4000, help='amount of synthetic effects')
+    parser.add_argument(
+        '--threads', type=int, nargs='+', default=[1, 4],
+        help='amounts of threads to measure filtered generation with')
+    args = parser.parse_args()
+
+    from eos.data.cache_generator import CacheGenerator
+
+    with TemporaryDirectory() as tmp_dir:
+        if args.database is None:
+            db_path = os.path.join(tmp_dir, 'eve.db')
+            write_sqlite_dump(make_raw_data(args.types, args.effects), db_path)
+        else:
+            db_path = os.path.expanduser(args.database)
+        reference = None
+        runs = [('unfiltered', False, 1)]
+        runs.extend(('filtered, {} threads'.format(threads), True, threads) for threads in args.threads)
+        for label, filtered, threads in runs:
+            data_handler, row_counts = make_counting_handler(db_path)
+            if not filtered:
+                data_handler = PlainDataHandler(data_handler)
+            generator = CacheGenerator(processes=threads)
+            start = time.perf_counter()
+            data = generator.run(data_handler)
+            elapsed = time.perf_counter() - start
+            serialized = json.dumps(data, sort_keys=True)
+            if reference is None:
+                reference = serialized
+            print('{}: generation {:.3f}s, fetch {:.3f}s, identical: {}'.format(
+                label, elapsed, generator.stage_timings['fetch'], 'yes' if serialized == reference else 'NO'))
+            print('  rows fetched: {}'.format(', '.join(
+                '{} {}'.format(table_name, count) for table_name, count in row_counts.items())))
+            print('  tables loaded: {}'.format(', '.join(
+                '{} {:.3f}s'.format(table_name, table_time)
+                for table_name, table_time in generator.table_timings.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Helpers shared by benchmark scripts.
+"""
+
+
+import random
+import resource
+
+
+def get_rss():
+    """
+    Get resident set size of current process.
+
+    Return value:
+    RSS in megabytes; peak RSS is returned on systems
+    where current one cannot be fetched
+    """
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_peak_rss():
+    """
+    Get peak resident set size of current process.
+
+    Return value:
+    Peak RSS in megabytes
+    """
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_pss():
+    """
+    Get proportional set size of current process, which splits
+    shared pages between processes which map them.
+
+    Return value:
+    PSS in megabytes, or None if system doesn't report it
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as file:
+            for line in file:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def make_cache_data(type_amount=30000, seed=1):
+    """
+    Compose synthetic data in the format returned by cache
+    generator. Proportions of tables roughly follow those of
+    actual EVE data.
+
+    Optional arguments:
+    type_amount -- amount of types to generate
+    seed -- seed for random generator, to make data reproducible
+    """
+    rng = random.Random(seed)
+    attr_amount = 2000
+    effect_amount = 4000
+    modifier_amount = 8000
+    modifiers = []
+    for modifier_id in range(1, modifier_amount + 1):
+        modifiers.append({
+            'modifier_id': modifier_id,
+            'state': rng.randint(1, 4),
+            'scope': rng.randint(1, 3),
+            'src_attr': rng.randint(1, attr_amount),
+            'operator': rng.randint(1, 9),
+            'tgt_attr': rng.randint(1, attr_amount),
+            'domain': rng.randint(1, 7),
+            'filter_type': rng.choice((None, 1, 2, 3)),
+            'filter_value': rng.choice((None, rng.randint(1, 5000)))
+        })
+    effects = []
+    for effect_id in range(1, effect_amount + 1):
+        effects.append({
+            'effect_id': effect_id,
+            'effect_category': rng.choice((0, 1, 2, 4, 5)),
+            'is_offensive': rng.choice((True, False)),
+            'is_assistance': rng.choice((True, False)),
+            'duration_attribute': rng.choice((None, 73)),
+            'discharge_attribute': rng.choice((None, 6)),
+            'range_attribute': rng.choice((None, 54)),
+            'falloff_attribute': rng.choice((None, 158)),
+            'tracking_speed_attribute': None,
+            'fitting_usage_chance_attribute': None,
+            'build_status': 4,
+            'modifiers': rng.sample(range(1, modifier_amount + 1), rng.randint(0, 3))
+        })
+    attributes = []
+    for attr_id in range(1, attr_amount + 1):
+        attributes.append({
+            'attribute_id': attr_id,
+            'max_attribute': rng.choice((None, rng.randint(1, attr_amount))),
+            'default_value': rng.random() * 100,
+            'high_is_good': rng.choice((True, False)),
+            'stackable': rng.choice((True, False))
+        })
+    # Types of the same group tend to have the same set of attributes
+    group_attrs = {}
+    types = []
+    for type_id in range(1, type_amount + 1):
+        type_effects = rng.sample(range(1, effect_amount + 1), rng.randint(0, 6))
+        group = rng.randint(1, 1500)
+        try:
+            type_attrs = group_attrs[group]
+        except KeyError:
+            type_attrs = group_attrs[group] = rng.sample(range(1, attr_amount + 1), rng.randint(5, 60))
+        types.append({
+            'type_id': type_id,
+            'group': group,
+            'category': rng.randint(1, 60),
+            'attributes': {
+                attr_id: rng.choice((rng.randint(0, 1000), rng.random() * 1000))
+                for attr_id in type_attrs},
+            'effects': type_effects,
+            'default_effect': rng.choice(type_effects) if type_effects else None
+        })
+    return {
+        'types': types,
+        'attributes': attributes,
+        'effects': effects,
+        'modifiers': modifiers
+    }
+
+
+def make_raw_data(type_amount=30000, effect_amount=4000, seed=1):
+    """
+    Compose synthetic data in the format returned by data handlers.
+    Most effects describe their modifiers via modifier info, few
+    use expression trees.
+
+    Optional arguments:
+    type_amount -- amount of types to generate
+    effect_amount -- amount of effects to generate
+    seed -- seed for random generator, to make data reproducible
+    """
+    rng = random.Random(seed)
+    attr_amount = 2000
+    evegroups = [
+        {'groupID': group_id, 'categoryID': rng.randint(1, 60), 'groupName_en-us': 'group{}'.format(group_id)}
+        for group_id in range(1, 1501)]
+    evetypes = [
+        {'typeID': type_id, 'groupID': rng.randint(1, 1500), 'typeName_en-us': 'type{}'.format(type_id)}
+        for type_id in range(1, type_amount + 1)]
+    dgmattribs = [
+        {
+            'attributeID': attr_id, 'attributeName': 'attr{}'.format(attr_id), 'maxAttributeID': None,
+            'defaultValue': rng.random() * 100, 'highIsGood': rng.choice((True, False)),
+            'stackable': rng.choice((True, False))}
+        for attr_id in range(1, attr_amount + 1)]
+    dgmtypeattribs = []
+    dgmtypeeffects = []
+    for type_row in evetypes:
+        for attr_id in rng.sample(range(1, attr_amount + 1), rng.randint(5, 40)):
+            dgmtypeattribs.append({'typeID': type_row['typeID'], 'attributeID': attr_id, 'value': rng.random()})
+        for effect_id in rng.sample(range(1, effect_amount + 1), rng.randint(0, 4)):
+            dgmtypeeffects.append({'typeID': type_row['typeID'], 'effectID': effect_id, 'isDefault': False})
+    # Expression tree which adds and removes ship modifier
+    dgmexpressions = []
+    for expression_id, operand_id, arg1, arg2, value, attr_id in (
+        (1, 24, None, None, 'Ship', None),
+        (2, 22, None, None, None, 9),
+        (3, 21, None, None, 'PostPercent', None),
+        (4, 22, None, None, None, 327),
+        (5, 12, 1, 2, None, None),
+        (6, 31, 3, 5, None, None),
+        (7, 6, 6, 4, None, None),
+        (8, 58, 6, 4, None, None)
+    ):
+        dgmexpressions.append({
+            'expressionID': expression_id, 'operandID': operand_id, 'arg1': arg1, 'arg2': arg2,
+            'expressionValue': value, 'expressionTypeID': None, 'expressionGroupID': None,
+            'expressionAttributeID': attr_id})
+    dgmeffects = []
+    for effect_id in range(1, effect_amount + 1):
+        effect_row = {'effectID': effect_id, 'effectCategory': 0, 'isOffensive': False, 'isAssistance': False}
+        if effect_id % 10 == 0:
+            effect_row.update({'preExpression': 7, 'postExpression': 8, 'modifierInfo': None})
+        else:
+            modifier_info = ''.join(
+                '- domain: shipID\n  func: ItemModifier\n  modifiedAttributeID: {}\n'
+                '  modifyingAttributeID: {}\n  operator: {}\n'.format(
+                    rng.randint(1, attr_amount), rng.randint(1, attr_amount), rng.choice((2, 4, 6)))
+                for _ in range(rng.randint(1, 4)))
+            effect_row.update({'preExpression': None, 'postExpression': None, 'modifierInfo': modifier_info})
+        dgmeffects.append(effect_row)
+    return {
+        'evetypes': evetypes,
+        'evegroups': evegroups,
+        'dgmattribs': dgmattribs,
+        'dgmtypeattribs': dgmtypeattribs,
+        'dgmeffects': dgmeffects,
+        'dgmtypeeffects': dgmtypeeffects,
+        'dgmexpressions': dgmexpressions
+    }
@@ -0,0 +1,111 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+"""
+Build cache out of data dump ahead of time, so that applications
+get ready cache instead of generating it when source is added:
+
+    python -m eos.data.cache_builder phobos_dump/ cache/eos_tq.bin
+
+Data handler is picked by dump path (directory with JSON files or
+SQLite database), cache handler by extension of cache path (.bin
+for binary cache, JSON cache otherwise). When cache path contains
+{fingerprint}, it's replaced by fingerprint of built cache.
+"""
+
+
+import argparse
+import os.path
+import sys
+from time import perf_counter
+
+from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler
+from eos.data.cache_handler.json_cache_handler import CODECS
+from eos.data.data_handler import JsonDataHandler, SQLiteDataHandler
+from .builder import CacheBuilder, make_fingerprint
+
+
+def make_data_handler(dump_path):
+    """Make data handler suitable for dump at passed path."""
+    if os.path.isdir(dump_path):
+        return JsonDataHandler(dump_path)
+    return SQLiteDataHandler(dump_path)
+
+
+def make_cache_handler(cache_path, codec):
+    """Make cache handler suitable for passed cache path."""
+    if cache_path.endswith('.bin'):
+        return BinaryCacheHandler(cache_path)
+    return JsonCacheHandler(cache_path, codec=codec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build Eos cache out of Phobos data dump')
+    parser.add_argument('dump', type=str, help='path to Phobos JSON dump folder or SQLite database')
+    parser.add_argument(
+        'cache', type=str,
+        help='path to cache file to write; .bin for binary cache, JSON cache otherwise; '
+        '{fingerprint} in it is replaced with fingerprint of cache')
+    parser.add_argument(
+        '--codec', type=str, default='bz2', choices=sorted(CODECS),
+        help='compression codec of JSON cache')
+    parser.add_argument(
+        '--processes', type=int, default=1,
+        help='amount of workers used to load data and build modifiers')
+    parser.add_argument(
+        '--build-cache', type=str, default=None,
+        help='path to file which keeps modifiers built by previous runs')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.dump):
+        print('data dump {} does not exist'.format(args.dump), file=sys.stderr)
+        return 1
+    data_handler = make_data_handler(args.dump)
+    data_version = data_handler.get_version()
+    # Cache without data version never matches
+    # data, thus it's of no use
+    if data_version is None:
+        print('unable to get version of data dump {}'.format(args.dump), file=sys.stderr)
+        return 1
+    fingerprint = make_fingerprint(data_version)
+    cache_path = args.cache.replace('{fingerprint}', fingerprint)
+    cache_handler = make_cache_handler(cache_path, args.codec)
+    builder = CacheBuilder(processes=args.processes, build_cache_path=args.build_cache)
+    start = perf_counter()
+    builder.build(data_handler, cache_handler, data_version)
+    elapsed = perf_counter() - start
+
+    print('cache: {}'.format(cache_path))
+    print('fingerprint: {}'.format(fingerprint))
+    print('build: {:.3f}s'.format(elapsed))
+    for stage_name, stage_time in builder.stage_timings.items():
+        print('  {:<12} {:>8.3f}s'.format(stage_name, stage_time))
+    print('rows fetched:')
+    for table_name, row_count in builder.table_row_counts.items():
+        print('  {:<14} {:>8} in {:.3f}s'.format(table_name, row_count, builder.table_timings[table_name]))
+    print('records written:')
+    for entity_type, record_count in builder.record_counts.items():
+        print('  {:<14} {:>8}'.format(entity_type, record_count))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
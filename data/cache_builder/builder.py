@@ -0,0 +1,127 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from logging import getLogger
+from time import perf_counter
+
+from eos import __version__ as eos_version
+from eos.data.cache_customizer import CacheCustomizer
+from eos.data.cache_generator import CacheGenerator, ModifierBuildCache
+
+
+logger = getLogger(__name__)
+
+
+def make_fingerprint(data_version):
+    """
+    Make fingerprint of cache built out of data
+    of passed version by this version of Eos.
+    """
+    return '{}_{}'.format(data_version, eos_version)
+
+
+def is_fingerprint_compatible(fingerprint):
+    """
+    Check if cache with passed fingerprint has been
+    built by this version of Eos.
+    """
+    if fingerprint is None:
+        return False
+    data_version, _, fp_eos_version = fingerprint.rpartition('_')
+    return bool(data_version) and fp_eos_version == eos_version
+
+
+class CacheBuilder:
+    """
+    Generate cache out of data, apply customizations to it
+    and write it via cache handler.
+
+    Optional arguments:
+    processes -- amount of workers cache generator uses
+    build_cache_path -- path to file where results of modifier
+    building are kept between builds; when specified, modifiers
+    are rebuilt only for effects whose data has changed
+
+    Attributes:
+    stage_timings -- dictionary in {stage name: seconds} format
+    with time stages of last build took, in order they were run;
+    these are stages of cache generator, customization and writing
+    table_timings -- dictionary in {table name: seconds} format
+    with time loading of each data table took during last build
+    table_row_counts -- dictionary in {table name: row count} format
+    with amount of rows fetched from data handler during last build
+    record_counts -- dictionary in {entity type: record count} format
+    with amount of records written to cache during last build
+    """
+
+    def __init__(self, processes=1, build_cache_path=None):
+        self._processes = processes
+        self._build_cache_path = build_cache_path
+        self.stage_timings = {}
+        self.table_timings = {}
+        self.table_row_counts = {}
+        self.record_counts = {}
+
+    def build(self, data_handler, cache_handler, data_version):
+        """
+        Build cache and write it.
+
+        Required arguments:
+        data_handler -- data handler to get data from
+        cache_handler -- cache handler to write cache with
+        data_version -- version of data, as provided by data handler
+
+        Return value:
+        Fingerprint of written cache
+        """
+        generator = CacheGenerator(processes=self._processes)
+        if self._build_cache_path is None:
+            cache_data = generator.run(data_handler)
+        else:
+            build_cache = ModifierBuildCache(self._build_cache_path)
+            cache_data = generator.run(data_handler, build_cache)
+            build_cache.save()
+            msg = 'modifiers reused for {} effects, built for {} effects'.format(
+                build_cache.reused, build_cache.built)
+            logger.info(msg)
+        self.stage_timings = dict(generator.stage_timings)
+        self.table_timings = generator.table_timings
+        self.table_row_counts = generator.table_row_counts
+        stage_start = perf_counter()
+        CacheCustomizer().run_builtin(cache_data)
+        stage_start = self._finish_stage('customize', stage_start)
+        self.record_counts = {entity_type: len(records) for entity_type, records in cache_data.items()}
+        fingerprint = make_fingerprint(data_version)
+        cache_handler.update_cache(cache_data, fingerprint)
+        self._finish_stage('write', stage_start)
+        return fingerprint
+
+    def _finish_stage(self, stage_name, stage_start):
+        """
+        Record time stage took.
+
+        Return value:
+        Time next stage starts at
+        """
+        now = perf_counter()
+        self.stage_timings[stage_name] = now - stage_start
+        return now
+
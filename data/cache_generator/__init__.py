@@ -19,4 +19,5 @@
 #===============================================================================
 
 
+from .build_cache import ModifierBuildCache
 from .generator import CacheGenerator
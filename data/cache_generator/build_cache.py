@@ -0,0 +1,196 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import bz2
+import hashlib
+import json
+import os.path
+from logging import getLogger
+
+from eos import __version__ as eos_version
+from eos.util.frozen_dict import FrozenDict
+
+
+logger = getLogger(__name__)
+# Version of format builds are stored in, builds
+# stored in other formats are ignored
+BUILD_FORMAT = 3
+
+
+class ModifierBuildCache:
+    """
+    Keeps results of modifier building from previous cache generations,
+    keyed by digest of data they were built from (effect fields used by
+    modifier builder and expression tree it refers). When data changes
+    only partially, generator takes modifiers of unchanged effects from
+    here instead of building them again. Along with modifiers, it keeps
+    what modifier builder logged about effect, so that reused builds
+    report the same problems as new ones.
+
+    Optional arguments:
+    path -- path to file where builds are stored between generations
+    (.json.bz2); if not specified, builds are kept only in memory
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        # Format: {digest: (frozen modifier rows, build status, log entries)}
+        self.__builds = {}
+        # Counters of effects whose modifiers were taken from
+        # cache and which had to be built during last generation
+        self.reused = 0
+        self.built = 0
+        if path is not None and os.path.exists(path):
+            self.__load()
+
+    def get(self, digest):
+        """
+        Get results of modifier build.
+
+        Required arguments:
+        digest -- digest of effect data, see get_effect_digest()
+
+        Return value:
+        Tuple with tuple of frozen modifier rows, build status and
+        tuple of log entries in (logger name, level, message) format
+
+        Possible exceptions:
+        KeyError -- raised when there's no build for passed digest
+        """
+        build = self.__builds[digest]
+        self.reused += 1
+        return build
+
+    def add(self, digest, modifier_rows, build_status, log_entries=()):
+        """
+        Store results of modifier build.
+
+        Required arguments:
+        digest -- digest of effect data, see get_effect_digest()
+        modifier_rows -- tuple with frozen modifier rows
+        build_status -- effect build status
+
+        Optional arguments:
+        log_entries -- iterable with (logger name, level, message
+        template) tuples, which were logged during the build
+        """
+        self.__builds[digest] = (modifier_rows, build_status, tuple(log_entries))
+        self.built += 1
+
+    def retain(self, digests):
+        """
+        Remove all builds besides those which were made out of
+        data with passed digests. Generator calls it after each
+        run, so that builds for data which doesn't exist anymore
+        do not pile up.
+
+        Required arguments:
+        digests -- iterable with digests to keep
+        """
+        digests = set(digests)
+        for digest in set(self.__builds).difference(digests):
+            del self.__builds[digest]
+
+    def reset_counters(self):
+        """Reset counters of reused and built effects."""
+        self.reused = 0
+        self.built = 0
+
+    def save(self):
+        """Write builds to file, if path was specified."""
+        if self._path is None:
+            return
+        folder = os.path.dirname(self._path)
+        if folder and os.path.isdir(folder) is not True:
+            os.makedirs(folder, mode=0o755)
+        builds = {
+            digest: [[dict(row) for row in modifier_rows], build_status, [list(entry) for entry in log_entries]]
+            for digest, (modifier_rows, build_status, log_entries) in self.__builds.items()
+        }
+        with bz2.BZ2File(self._path, 'w') as file:
+            json_data = json.dumps({'eos_version': eos_version, 'format': BUILD_FORMAT, 'builds': builds})
+            file.write(json_data.encode('utf-8'))
+
+    def __load(self):
+        try:
+            with bz2.BZ2File(self._path, 'r') as file:
+                data = json.loads(file.read().decode('utf-8'))
+            # Builds made by other versions of Eos are not reliable
+            if data['eos_version'] != eos_version or data.get('format') != BUILD_FORMAT:
+                return
+            builds = {}
+            for digest, (modifier_rows, build_status, log_entries) in data['builds'].items():
+                builds[digest] = (
+                    tuple(FrozenDict(row) for row in modifier_rows),
+                    build_status,
+                    tuple(tuple(entry) for entry in log_entries)
+                )
+        except KeyboardInterrupt:
+            raise
+        except:
+            logger.error('error during reading modifier build cache')
+            return
+        self.__builds = builds
+
+    def __len__(self):
+        return len(self.__builds)
+
+
+def get_effect_digest(effect_row, expressions_keyed):
+    """
+    Compose digest of all data modifier builder uses
+    to build modifiers for an effect.
+
+    Required arguments:
+    effect_row -- effect row in assembled form
+    expressions_keyed -- dictionary in {expression ID:
+    expression row} format
+
+    Return value:
+    Digest in the form of hex string
+    """
+    # Collect all expressions of effect's expression trees
+    expressions = {}
+    pending = [effect_row['pre_expression'], effect_row['post_expression']]
+    while pending:
+        expression_id = pending.pop()
+        if expression_id is None or expression_id in expressions:
+            continue
+        expression_row = expressions_keyed.get(expression_id)
+        expressions[expression_id] = expression_row
+        if expression_row is None:
+            continue
+        pending.append(expression_row.get('arg1'))
+        pending.append(expression_row.get('arg2'))
+    # Position of row in original table doesn't affect
+    # modifiers, but changes when unrelated rows change
+    expression_data = tuple(
+        None if row is None else tuple(sorted((k, v) for k, v in row.items() if k != 'table_pos'))
+        for _, row in sorted(expressions.items())
+    )
+    source = (
+        effect_row['effect_category'],
+        effect_row['pre_expression'],
+        effect_row['post_expression'],
+        effect_row['modifier_info'],
+        expression_data
+    )
+    return hashlib.sha1(repr(source).encode('utf-8')).hexdigest()
@@ -22,7 +22,6 @@
 from logging import getLogger
 
 from eos.const.eve import Effect
-from eos.util.frozen_dict import FrozenDict
 
 
 logger = getLogger(__name__)
@@ -81,8 +80,10 @@ class Checker:
         # Contains keys used in current table
         used_keys = set()
         # Storage for rows which should be removed
-        invalid_rows = set()
-        for datarow in sorted(table, key=lambda row: row['table_pos']):
+        invalid_rows = []
+        # Nothing has been moved around in tables yet, thus
+        # they are still ordered by position of rows
+        for datarow in table:
             self._row_pk(key_names, datarow, used_keys, invalid_rows)
         # If any invalid rows were detected, remove them and
         # write corresponding message to log
@@ -109,17 +110,17 @@ class Checker:
             # Invalidate row if it doesn't have any component
             # of primary key
             except KeyError:
-                invalid_rows.add(datarow)
+                invalid_rows.append(datarow)
                 return
             # If primary key is not an integer
             if not isinstance(key_value, int):
-                invalid_rows.add(datarow)
+                invalid_rows.append(datarow)
                 return
             row_key.append(key_value)
         row_key = tuple(row_key)
         # If specified key is already used
         if row_key in used_keys:
-            invalid_rows.add(datarow)
+            invalid_rows.append(datarow)
             return
         used_keys.add(row_key)
 
@@ -129,11 +130,11 @@ class Checker:
         Only ints and floats are considered as valid. Eos
         attribute calculation engine relies on this assumption.
         """
-        invalid_rows = set()
+        invalid_rows = []
         table = self.data['dgmtypeattribs']
         for row in table:
             if not isinstance(row.get('value'), (int, float)):
-                invalid_rows.add(row)
+                invalid_rows.append(row)
         if invalid_rows:
             msg = '{} attribute rows have non-numeric value, removing them'.format(
                 len(invalid_rows))
@@ -149,17 +150,15 @@ class Checker:
         # Set with IDs of types, which have default effect
         defeff = set()
         table = self.data['dgmtypeeffects']
-        invalid_rows = set()
-        for row in sorted(table, key=lambda r: r['table_pos']):
-            is_default = row.get('isDefault')
-            # We're interested only in default effects
-            if is_default is not True:
-                continue
+        invalid_rows = []
+        # We're interested only in default effects
+        default_rows = [row for row in table if row.get('isDefault') is True]
+        for row in sorted(default_rows, key=lambda r: r['table_pos']):
             type_id = row['typeID']
             # If we already saw default effect for given type ID,
             # invalidate current row
             if type_id in defeff:
-                invalid_rows.add(row)
+                invalid_rows.append(row)
             else:
                 defeff.add(type_id)
         # Process ivalid rows, if any
@@ -168,12 +167,8 @@ class Checker:
                 len(invalid_rows))
             logger.warning(msg)
             # Replace isDefault field value with False for invalid rows
-            table.difference_update(invalid_rows)
             for invalid_row in invalid_rows:
-                new_row = {}
-                for field, value in invalid_row.items():
-                    new_row[field] = False if field == 'isDefault' else value
-                table.add(FrozenDict(new_row))
+                table.set_field(invalid_row, 'isDefault', False)
 
     def _colliding_module_racks(self):
         """
@@ -188,16 +183,16 @@ class Checker:
         table = self.data['dgmtypeeffects']
         rack_effects = (Effect.hi_power, Effect.med_power, Effect.lo_power)
         racked_items = set()
-        invalid_rows = set()
-        for row in sorted(table, key=lambda r: r['table_pos']):
-            effect_id = row['effectID']
-            # We're not interested in anything besides
-            # rack effects
-            if effect_id not in rack_effects:
-                continue
+        invalid_rows = []
+        # We're not interested in anything besides
+        # rack effects
+        rack_rows = []
+        for effect_id in rack_effects:
+            rack_rows.extend(table.find('effectID', effect_id))
+        for row in sorted(rack_rows, key=lambda r: r['table_pos']):
             type_id = row['typeID']
             if type_id in racked_items:
-                invalid_rows.add(row)
+                invalid_rows.append(row)
             else:
                 racked_items.add(type_id)
         if invalid_rows:
@@ -19,12 +19,14 @@
 #===============================================================================
 
 
-import yaml
+import re
+from collections import deque
 from itertools import chain
 from logging import getLogger
 
-from eos.const.eve import Group, Category
+from eos.const.eve import Group, Category, Operand
 from eos.util.cached_property import CachedProperty
+from .modifier_info_cache import ModifierInfoCache
 
 
 logger = getLogger(__name__)
@@ -37,189 +39,165 @@ class Cleaner:
     pre-defined data relations.
     """
 
-    def clean(self, data):
+    def clean(self, data, modinfo_cache=None):
+        """
+        Remove data which is not needed.
+
+        Required arguments:
+        data -- data to clean
+
+        Optional arguments:
+        modinfo_cache -- ModifierInfoCache to take parsed
+        modifier info YAML from
+        """
         self.data = data
+        if modinfo_cache is None:
+            modinfo_cache = ModifierInfoCache()
+        self._modinfo_cache = modinfo_cache
         # Container to store signs of so-called strong data,
-        # such rows are immune to removal. Dictionary structure
-        # is the same as structure of general data container
+        # such rows are immune to removal
+        # Format: {table name: {row IDs}}
         self.strong_data = {}
         # Move some rows to strong data container
         self._pump_evetypes()
-        # Also contains data in the very same format, but tables/rows
-        # in this table are considered as pending for removal
+        # Contains data in the very same format as general data container,
+        # but tables/rows in this container are considered as pending
+        # for removal
         self.trashed_data = {}
         self._autocleanup()
         self._report_results()
 
+    def get_candidate_type_ids(self, data, modinfo_cache=None):
+        """
+        Get IDs of types which may be kept by cleanup. Only
+        evetypes, evegroups, dgmeffects and dgmexpressions
+        tables are needed for it, thus it can be used to avoid
+        fetching rows of other types from auxiliary tables.
+
+        Required arguments:
+        data -- data to inspect, it must not be normalized yet
+
+        Optional arguments:
+        modinfo_cache -- ModifierInfoCache to take parsed
+        modifier info YAML from
+
+        Return value:
+        Set with type IDs
+        """
+        if modinfo_cache is None:
+            modinfo_cache = ModifierInfoCache()
+        evetypes = data['evetypes']
+        type_ids = set(row['typeID'] for row in _get_strong_types(data))
+        # Expressions refer types either via IDs, or via names
+        symbolic_names = set()
+        for exp_row in data['dgmexpressions']:
+            type_id = exp_row.get('expressionTypeID')
+            if type_id is not None:
+                type_ids.add(type_id)
+            elif exp_row.get('operandID') == Operand.def_type:
+                symbolic_names.add(exp_row.get('expressionValue'))
+        if symbolic_names:
+            for row in evetypes:
+                type_name = row.get('typeName_en-us')
+                if not type_name:
+                    continue
+                if type_name in symbolic_names or re.sub(r'\s', '', type_name) in symbolic_names:
+                    type_ids.add(row['typeID'])
+        for effect_row in data['dgmeffects']:
+            relations = _get_modinfo_relations(effect_row, modinfo_cache)
+            if relations is not None:
+                type_ids.update(relations[0])
+        return type_ids
+
     def _pump_evetypes(self):
         """
         Mark some hardcoded evetypes as strong.
         """
-        # Tuple with categoryIDs of items we want to keep
-        strong_categories = (
-            Category.ship,
-            Category.module,
-            Category.charge,
-            Category.skill,
-            Category.drone,
-            Category.implant,
-            Category.subsystem
-        )
-        # Set with groupIDs of items we want to keep
-        # It is set because we will need to modify it
-        strong_groups = {Group.character, Group.effect_beacon}
-        # Go through table data, filling valid groups set according to valid categories
-        for datarow in self.data['evegroups']:
-            if datarow.get('categoryID') in strong_categories:
-                strong_groups.add(datarow['groupID'])
-        rows_to_pump = set()
-        for datarow in self.data['evetypes']:
-            if datarow.get('groupID') in strong_groups:
-                rows_to_pump.add(datarow)
-        self._pump_data('evetypes', rows_to_pump)
+        self._pump_data('evetypes', _get_strong_types(self.data))
 
     def _autocleanup(self):
         """
         Define auto-cleanup workflow.
         """
         self._kill_weak()
-        self._changed = True
-        # Cycle as long as we have changes during previous iteration.
-        # We need this because contents of even evetypes may change, which,
-        # by turn, will need to pull additional data into other tables
-        while self._changed is True:
-            self._changed = False
-            self._reanimate_auxiliary_friends()
-            self._reestablish_broken_relationships()
+        # Values of target columns which have already been
+        # requested by references, matching rows of trashed
+        # data are restored when value is requested first time
+        # Format: {(target table name, target column name): {values}}
+        requested = {}
+        # Rows which are in actual data and whose
+        # references are yet to be followed
+        # Format: deque([(table name, row)])
+        worklist = deque()
+        for table_name, table in self.data.items():
+            worklist.extend((table_name, row) for row in table)
+        # Each row is put into worklist once, when it's found to be
+        # needed, and each target value is looked up once, thus single
+        # pass is enough to restore everything actual data refers
+        while worklist:
+            table_name, row = worklist.popleft()
+            for tgt_table_name, tgt_column_name, tgt_value in self._get_references(table_name, row):
+                tgt_values = requested.setdefault((tgt_table_name, tgt_column_name), set())
+                if tgt_value in tgt_values:
+                    continue
+                tgt_values.add(tgt_value)
+                # All target columns are indexed
+                to_restore = self.trashed_data[tgt_table_name].find(tgt_column_name, tgt_value)
+                if to_restore:
+                    self._restore_data(tgt_table_name, to_restore)
+                    worklist.extend((tgt_table_name, tgt_row) for tgt_row in to_restore)
 
     def _kill_weak(self):
         """
         Trash all data which isn't marked as strong.
         """
         for table_name, table in self.data.items():
-            to_trash = set()
             strong_rows = self.strong_data.get(table_name, set())
-            to_trash.update(table.difference(strong_rows))
+            to_trash = [row for row in table if id(row) not in strong_rows]
             self._trash_data(table_name, to_trash)
 
-    def _reanimate_auxiliary_friends(self):
+    def _get_references(self, table_name, row):
         """
-        Restore rows in tables, which complement evetypes
-        or serve as m:n mapping between evetypes and other tables.
+        Get references to rows which should be kept when
+        passed row is kept.
+
+        Required arguments:
+        table_name -- name of table which row belongs to
+        row -- row whose references are requested
+
+        Return value:
+        Iterable with (target table name, target column name,
+        target value) tuples
         """
-        # As we filter whole database using evetypes table,
-        # gather evetype IDs we currently have in there
-        type_ids = set(row['typeID'] for row in self.data['evetypes'])
+        # References taken from data stored in relational format
+        for src_column_name, fk_target in FOREIGN_KEYS.get(table_name, {}).items():
+            fk_value = row.get(src_column_name)
+            # If there's no such field in a row or it is None,
+            # this is not a valid FK reference
+            if fk_value is None:
+                continue
+            tgt_table_name, tgt_column_name = fk_target
+            yield tgt_table_name, tgt_column_name, fk_value
         # Auxiliary tables are those which do not define
         # any entities, they just map one entities to others
-        # or complement entities with additional data
-        aux_tables = ('dgmtypeattribs', 'dgmtypeeffects')
-        for table_name in aux_tables:
-            to_restore = set()
-            # Restore rows which map other entities to types
-            for row in self.trashed_data[table_name]:
-                if row['typeID'] in type_ids:
-                    to_restore.add(row)
-            if to_restore:
-                self._changed = True
-                self._restore_data(table_name, to_restore)
-
-    def _reestablish_broken_relationships(self):
-        """
-        Restore all rows targeted by references of rows, which
-        exist in actual data.
-        """
-        # Container for 'target data', matches with which are
-        # going to be restored
-        # Format: {(target table name, target column name): {values to have}}}
-        tgt_data = {}
-        self._get_targets_relational(tgt_data)
-        self._get_targets_yaml(tgt_data)
-        # Now, when we have all the target data values, we may look for
-        # rows, which have matching values, and restore them
-        for tgt_spec, tgt_values in tgt_data.items():
-            tgt_table_name, tgt_column_name = tgt_spec
-            to_restore = set()
-            for row in self.trashed_data[tgt_table_name]:
-                if row.get(tgt_column_name) in tgt_values:
-                    to_restore.add(row)
-            if to_restore:
-                self._changed = True
-                self._restore_data(tgt_table_name, to_restore)
-
-    def _get_targets_relational(self, tgt_data):
-        """
-        Fill dictionary with target references taken from data
-        stored in relational format
-        """
-        # Format:
-        # {source table: {source column: (target table, target column)}}
-        foreign_keys = {
-            'dgmattribs': {
-                'maxAttributeID': ('dgmattribs', 'attributeID')
-            },
-            'dgmeffects': {
-                'preExpression': ('dgmexpressions', 'expressionID'),
-                'postExpression': ('dgmexpressions', 'expressionID'),
-                'durationAttributeID': ('dgmattribs', 'attributeID'),
-                'trackingSpeedAttributeID': ('dgmattribs', 'attributeID'),
-                'dischargeAttributeID': ('dgmattribs', 'attributeID'),
-                'rangeAttributeID': ('dgmattribs', 'attributeID'),
-                'falloffAttributeID': ('dgmattribs', 'attributeID'),
-                'fittingUsageChanceAttributeID': ('dgmattribs', 'attributeID')
-            },
-            'dgmexpressions': {
-                'arg1': ('dgmexpressions', 'expressionID'),
-                'arg2': ('dgmexpressions', 'expressionID'),
-                'expressionTypeID': ('evetypes', 'typeID'),
-                'expressionGroupID': ('evegroups', 'groupID'),
-                'expressionAttributeID': ('dgmattribs', 'attributeID')
-            },
-            'dgmtypeattribs': {
-                'typeID': ('evetypes', 'typeID'),
-                'attributeID': ('dgmattribs', 'attributeID')
-            },
-            'dgmtypeeffects': {
-                'typeID': ('evetypes', 'typeID'),
-                'effectID': ('dgmeffects', 'effectID')
-            },
-            'evetypes': {
-                'groupID': ('evegroups', 'groupID')
-            }
-        }
-        for src_table_name, table_fks in foreign_keys.items():
-            for src_column_name, fk_target in table_fks.items():
-                tgt_table_name, tgt_column_name = fk_target
-                for row in self.data[src_table_name]:
-                    fk_value = row.get(src_column_name)
-                    # If there's no such field in a row or it is None,
-                    # this is not a valid FK reference
-                    if fk_value is None:
-                        continue
-                    tgt_values = tgt_data.setdefault((tgt_table_name, tgt_column_name), set())
-                    tgt_values.add(fk_value)
-
-    def _get_targets_yaml(self, tgt_data):
-        """
-        Fill dictionary with target references taken from data
-        stored in YAML format
-        """
-        for effect_row in self.data['dgmeffects']:
-            effect_id = effect_row['effectID']
+        # or complement entities with additional data; their
+        # rows are needed for each type we have
+        if table_name == 'evetypes':
+            for aux_table_name in AUXILIARY_TABLES:
+                yield aux_table_name, 'typeID', row['typeID']
+        # References taken from data stored in YAML format
+        elif table_name == 'dgmeffects':
             try:
-                types, groups, attrs = self._yaml_modinfo_relations[effect_id]
+                types, groups, attrs = self._yaml_modinfo_relations[row['effectID']]
             except KeyError:
-                continue
+                return
             for references, tgt_table_name, tgt_column_name in (
                 (types, 'evetypes', 'typeID'),
                 (groups, 'evegroups', 'groupID'),
                 (attrs, 'dgmattribs', 'attributeID')
             ):
-                # If there're any references for given entity, add them to
-                # dictionary
-                if len(references) > 0:
-                    tgt_values = tgt_data.setdefault((tgt_table_name, tgt_column_name), set())
-                    tgt_values.update(references)
+                for reference in references:
+                    yield tgt_table_name, tgt_column_name, reference
 
     @CachedProperty
     def _yaml_modinfo_relations(self):
@@ -228,53 +206,15 @@ class Cleaner:
         on each cleanup cycle. It is used when collecting
         data about references from modifier info YAMLs.
         """
-
-        # Helper function to fetch actual attribute values
-        # from modinfo dicts
-        def add_item(modinfo, attr_name, items):
-            try:
-                item_id = modinfo[attr_name]
-            except KeyError:
-                pass
-            else:
-                items.add(item_id)
-
         # Format:
         # {effect ID: ({types}, {groups}, {attribs})}
         relations = {}
         # Cycle through both data and trashed data, to make sure all rows are
         # processed regardless of stage during which this property is accessed
         for effect_row in chain(self.data['dgmeffects'], self.trashed_data['dgmeffects']):
-            # We do not need anything here if modifier info is empty
-            modinfos_yaml = effect_row.get('modifierInfo')
-            if modinfos_yaml is None:
-                continue
-            # Skip row in case of any YAML parsing errors
-            try:
-                modinfos = yaml.safe_load(modinfos_yaml)
-            except KeyboardInterrupt:
-                raise
-            except:
-                continue
-            # Modinfos should be basic python iterable
-            if not isinstance(modinfos, (list, tuple, set)):
-                continue
-            types = set()
-            groups = set()
-            attrs = set()
-            # Fill in sets with IDs from each modifier info dict
-            for modinfo in modinfos:
-                add_item(modinfo, 'skillTypeID', types)
-                add_item(modinfo, 'groupID', groups)
-                add_item(modinfo, 'modifyingAttributeID', attrs)
-                add_item(modinfo, 'modifiedAttributeID', attrs)
-            # If all of the sets are empty, do not add anything to
-            # primary container
-            if len(types) == 0 and len(groups) == 0 and len(attrs) == 0:
-                continue
-            # Otherwise, add all the data we've gathered for current
-            # effect to container
-            relations[effect_row['effectID']] = (types, groups, attrs)
+            effect_relations = _get_modinfo_relations(effect_row, self._modinfo_cache)
+            if effect_relations is not None:
+                relations[effect_row['effectID']] = effect_relations
         return relations
 
     def _report_results(self):
@@ -302,10 +242,10 @@ class Cleaner:
 
         Required arguments:
         table_name -- name of table for which we're pumping data
-        datarows -- set with rows to pump
+        datarows -- iterable with rows to pump
         """
         strong_rows = self.strong_data.setdefault(table_name, set())
-        strong_rows.update(datarows)
+        strong_rows.update(id(row) for row in datarows)
 
     def _trash_data(self, table_name, datarows):
         """
@@ -313,10 +253,13 @@ class Cleaner:
 
         Required arguments:
         table_name -- name of table for which we're removing data
-        datarows -- set with rows to remove
+        datarows -- iterable with rows to remove
         """
         data_table = self.data[table_name]
-        trash_table = self.trashed_data.setdefault(table_name, set())
+        try:
+            trash_table = self.trashed_data[table_name]
+        except KeyError:
+            trash_table = self.trashed_data[table_name] = data_table.make_empty()
         # Update both trashed data and source data
         trash_table.update(datarows)
         data_table.difference_update(datarows)
@@ -328,10 +271,133 @@ class Cleaner:
 
         Required arguments:
         table_name -- name of table for which we're restoring data
-        datarows -- set with rows to restore
+        datarows -- iterable with rows to restore
         """
         data_table = self.data[table_name]
         trash_table = self.trashed_data[table_name]
         # Update both trashed data and source data
         data_table.update(datarows)
         trash_table.difference_update(datarows)
+
+
+# Relations between tables, which define which rows
+# are needed to keep data consistent
+# Format:
+# {source table: {source column: (target table, target column)}}
+FOREIGN_KEYS = {
+    'dgmattribs': {
+        'maxAttributeID': ('dgmattribs', 'attributeID')
+    },
+    'dgmeffects': {
+        'preExpression': ('dgmexpressions', 'expressionID'),
+        'postExpression': ('dgmexpressions', 'expressionID'),
+        'durationAttributeID': ('dgmattribs', 'attributeID'),
+        'trackingSpeedAttributeID': ('dgmattribs', 'attributeID'),
+        'dischargeAttributeID': ('dgmattribs', 'attributeID'),
+        'rangeAttributeID': ('dgmattribs', 'attributeID'),
+        'falloffAttributeID': ('dgmattribs', 'attributeID'),
+        'fittingUsageChanceAttributeID': ('dgmattribs', 'attributeID')
+    },
+    'dgmexpressions': {
+        'arg1': ('dgmexpressions', 'expressionID'),
+        'arg2': ('dgmexpressions', 'expressionID'),
+        'expressionTypeID': ('evetypes', 'typeID'),
+        'expressionGroupID': ('evegroups', 'groupID'),
+        'expressionAttributeID': ('dgmattribs', 'attributeID')
+    },
+    'dgmtypeattribs': {
+        'typeID': ('evetypes', 'typeID'),
+        'attributeID': ('dgmattribs', 'attributeID')
+    },
+    'dgmtypeeffects': {
+        'typeID': ('evetypes', 'typeID'),
+        'effectID': ('dgmeffects', 'effectID')
+    },
+    'evetypes': {
+        'groupID': ('evegroups', 'groupID')
+    }
+}
+
+# Tables whose rows complement types, rows are kept for all types
+# which are kept
+AUXILIARY_TABLES = ('dgmtypeattribs', 'dgmtypeeffects')
+
+# Categories and groups of types which are kept regardless
+# of references to them
+STRONG_CATEGORIES = (
+    Category.ship,
+    Category.module,
+    Category.charge,
+    Category.skill,
+    Category.drone,
+    Category.implant,
+    Category.subsystem
+)
+STRONG_GROUPS = (Group.character, Group.effect_beacon)
+
+
+def _get_strong_types(data):
+    """
+    Get evetypes rows which belong to strong groups and
+    categories.
+
+    Return value:
+    List with rows
+    """
+    strong_groups = set(STRONG_GROUPS)
+    # Fill valid groups set according to valid categories
+    for category_id in STRONG_CATEGORIES:
+        for datarow in data['evegroups'].find('categoryID', category_id):
+            strong_groups.add(datarow['groupID'])
+    strong_types = []
+    for group_id in strong_groups:
+        strong_types.extend(data['evetypes'].find('groupID', group_id))
+    return strong_types
+
+
+def _get_modinfo_relations(effect_row, modinfo_cache):
+    """
+    Get entities referenced by modifier info of an effect.
+
+    Return value:
+    Tuple with sets ({types}, {groups}, {attribs}), or None if
+    there're no references
+    """
+
+    # Helper function to fetch actual attribute values
+    # from modinfo dicts
+    def add_item(modinfo, attr_name, items):
+        try:
+            item_id = modinfo[attr_name]
+        except KeyError:
+            pass
+        else:
+            items.add(item_id)
+
+    # We do not need anything here if modifier info is empty
+    modinfos_yaml = effect_row.get('modifierInfo')
+    if modinfos_yaml is None:
+        return None
+    # Skip row in case of any YAML parsing errors
+    try:
+        modinfos = modinfo_cache.get(modinfos_yaml)
+    except KeyboardInterrupt:
+        raise
+    except:
+        return None
+    # Modinfos should be basic python iterable
+    if not isinstance(modinfos, (list, tuple, set)):
+        return None
+    types = set()
+    groups = set()
+    attrs = set()
+    # Fill in sets with IDs from each modifier info dict
+    for modinfo in modinfos:
+        add_item(modinfo, 'skillTypeID', types)
+        add_item(modinfo, 'groupID', groups)
+        add_item(modinfo, 'modifyingAttributeID', attrs)
+        add_item(modinfo, 'modifiedAttributeID', attrs)
+    # If all of the sets are empty, there're no references
+    if len(types) == 0 and len(groups) == 0 and len(attrs) == 0:
+        return None
+    return types, groups, attrs
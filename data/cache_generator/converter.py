@@ -20,14 +20,19 @@
 
 
 import re
-from logging import getLogger
+from concurrent.futures import ProcessPoolExecutor
+from logging import Handler, getLogger, DEBUG
 
 from eos.const.eve import Attribute, Operand
 from eos.util.frozen_dict import FrozenDict
+from .build_cache import get_effect_digest
 from .modifier_builder import ModifierBuilder
 
 
 logger = getLogger(__name__)
+# Logger of modifier builder package, what builder logs
+# about effects is collected from it for build cache
+builder_logger = getLogger(ModifierBuilder.__module__.rpartition('.')[0])
 
 
 class Converter:
@@ -55,46 +60,36 @@ class Converter:
             'volume': Attribute.volume,
             'capacity': Attribute.capacity
         }
-        attr_ids = tuple(atrrib_map.values())
         # Here we will store pairs (typeID, attrID) already
         # defined in table
         defined_pairs = set()
         dgmtypeattribs = self.data['dgmtypeattribs']
-        for row in dgmtypeattribs:
-            if row['attributeID'] not in attr_ids:
-                continue
-            defined_pairs.add((row['typeID'], row['attributeID']))
+        for attr_id in atrrib_map.values():
+            for row in dgmtypeattribs.find('attributeID', attr_id):
+                defined_pairs.add((row['typeID'], attr_id))
         attrs_skipped = 0
-        new_evetypes = set()
-        # Cycle through all evetypes, for each row moving each its field
-        # either to different table or container for updated rows
+        # Cycle through all evetypes, moving attribute fields
+        # of each row to attribute table
         for row in self.data['evetypes']:
             type_id = row['typeID']
-            new_row = {}
-            for field, value in row.items():
-                if field in atrrib_map:
-                    # If row didn't have such attribute defined, skip it
-                    if value is None:
-                        continue
-                    # If such attribute already exists in dgmtypeattribs,
-                    # do not modify it - values from dgmtypeattribs table
-                    # have priority
-                    attr_id = atrrib_map[field]
-                    if (type_id, attr_id) in defined_pairs:
-                        attrs_skipped += 1
-                        continue
-                    # Generate row and add it to proper attribute table
-                    dgmtypeattribs.add(FrozenDict({
-                        'typeID': type_id,
-                        'attributeID': attr_id,
-                        'value': value
-                    }))
-                else:
-                    new_row[field] = value
-            new_evetypes.add(FrozenDict(new_row))
-        # Update evetypes with rows which do not contain attributes
-        self.data['evetypes'].clear()
-        self.data['evetypes'].update(new_evetypes)
+            for field, attr_id in atrrib_map.items():
+                # Field is not indexed, thus it can be removed in place
+                value = row.pop(field, None)
+                # If row didn't have such attribute defined, skip it
+                if value is None:
+                    continue
+                # If such attribute already exists in dgmtypeattribs,
+                # do not modify it - values from dgmtypeattribs table
+                # have priority
+                if (type_id, attr_id) in defined_pairs:
+                    attrs_skipped += 1
+                    continue
+                # Generate row and add it to proper attribute table
+                dgmtypeattribs.add({
+                    'typeID': type_id,
+                    'attributeID': attr_id,
+                    'value': value
+                })
         if attrs_skipped > 0:
             msg = '{} built-in attributes already have had value in dgmtypeattribs and were skipped'.format(
                 attrs_skipped)
@@ -136,7 +131,7 @@ class Converter:
             # logged warnings
             warned_conflicts = set()
             # We're modifying only rows with specific operands
-            for exp_row in filter(lambda r: r['operandID'] == operand, dgmexpressions):
+            for exp_row in dgmexpressions.find('operandID', operand):
                 exp_entity_id = exp_row[tgt_column]
                 # If entity is already referenced via ID, nothing
                 # to do here
@@ -156,15 +151,8 @@ class Converter:
                             id_column, sym_name, ', '.join(str(i) for i in repl_ids), repl_id)
                         logger.warning(msg)
                         warned_conflicts.add(sym_name)
-                # As rows are frozen dicts, we compose new mutable dict, update
-                # data there, freeze it, and add to replacement maps
-                new_exp_row = {}
-                new_exp_row.update(exp_row)
-                new_exp_row['expressionValue'] = None
-                new_exp_row[tgt_column] = repl_id
-                new_exp_row = FrozenDict(new_exp_row)
-                dgmexpressions.remove(exp_row)
-                dgmexpressions.add(new_exp_row)
+                dgmexpressions.set_field(exp_row, 'expressionValue', None)
+                dgmexpressions.set_field(exp_row, tgt_column, repl_id)
                 successes += 1
         # Report results to log, it will help to indicate when CCP finally stops
         # using literal references, and we can get rid of this conversion
@@ -172,13 +160,22 @@ class Converter:
             successes, failures)
         logger.info(msg)
 
-    def convert(self, data):
+    def convert(self, data, build_cache=None, processes=1, modinfo_cache=None):
         """
         Convert database-like data structure to eos-
         specific one.
+
+        Optional arguments:
+        build_cache -- ModifierBuildCache instance; if passed,
+        modifiers of effects are taken from it when possible,
+        and it's updated with results of new builds
+        processes -- amount of processes which build modifiers;
+        result doesn't depend on it
+        modinfo_cache -- ModifierInfoCache to take parsed
+        modifier info YAML from
         """
         data = self._assemble(data)
-        self._build_modifiers(data)
+        self._build_modifiers(data, build_cache, processes, modinfo_cache)
         return data
 
     def _assemble(self, data):
@@ -186,46 +183,37 @@ class Converter:
         Use passed data to compose object-like data rows,
         as in, to 'assemble' objects.
         """
-        # Before actually generating rows, we need to collect
-        # some data in convenient form
-        # Format: {type ID: type row}
-        dgmeffects_keyed = {}
-        for row in data['dgmeffects']:
-            dgmeffects_keyed[row['effectID']] = row
-        # Format: {group ID: group row}
-        evegroups_keyed = {}
-        for row in data['evegroups']:
-            evegroups_keyed[row['groupID']] = row
-        # Format: {type ID: default effect ID}
-        type_defeff_map = {}
-        for row in data['dgmtypeeffects']:
-            if row.get('isDefault') is True:
-                type_defeff_map[row['typeID']] = row['effectID']
-        # Format: {type ID: [effect IDs]}
-        type_effects = {}
-        for row in data['dgmtypeeffects']:
-            type_effects_row = type_effects.setdefault(row['typeID'], [])
-            type_effects_row.append(row['effectID'])
-        # Format: {type ID: {attr ID: value}}
-        type_attribs = {}
-        for row in data['dgmtypeattribs']:
-            type_attribs_row = type_attribs.setdefault(row['typeID'], {})
-            type_attribs_row[row['attributeID']] = row['value']
-
         # We will build new data structure from scratch
         assembly = {}
 
+        # Rows which complement types are found via
+        # indexes, primary keys are unique at this point
+        evegroups = data['evegroups']
+        dgmtypeeffects = data['dgmtypeeffects']
+        dgmtypeattribs = data['dgmtypeattribs']
         types = []
         for row in data['evetypes']:
             type_id = row['typeID']
             group = row.get('groupID')
+            category = None
+            for group_row in evegroups.find('groupID', group):
+                category = group_row.get('categoryID')
+            effects = []
+            default_effect = None
+            for type_effect_row in dgmtypeeffects.find('typeID', type_id):
+                effects.append(type_effect_row['effectID'])
+                if type_effect_row.get('isDefault') is True:
+                    default_effect = type_effect_row['effectID']
+            attributes = {}
+            for type_attrib_row in dgmtypeattribs.find('typeID', type_id):
+                attributes[type_attrib_row['attributeID']] = type_attrib_row['value']
             type_ = {
                 'type_id': type_id,
                 'group': group,
-                'category': evegroups_keyed.get(group, {}).get('categoryID'),
-                'effects': type_effects.get(type_id, []),
-                'attributes': type_attribs.get(type_id, {}),
-                'default_effect': type_defeff_map.get(type_id)
+                'category': category,
+                'effects': effects,
+                'attributes': attributes,
+                'default_effect': default_effect
             }
             types.append(type_)
         assembly['types'] = types
@@ -267,53 +255,76 @@ class Converter:
 
         return assembly
 
-    def _build_modifiers(self, data):
+    def _build_modifiers(self, data, build_cache, processes=1, modinfo_cache=None):
         """
         Replace expressions with generated out of
         them modifiers.
         """
-        builder = ModifierBuilder(data['expressions'])
-        # Lists effects, which are using given modifier
-        # Format: {modifier row: [effect IDs]}
-        modifier_effect_map = {}
-        # Prepare to give each modifier unique ID
+        # Sort rows by ID so we numerate modifiers in deterministic way
+        effect_rows = sorted(data['effects'], key=lambda row: row['effect_id'])
+        # Format: {effect ID: (frozen modifiers, build status, log entries)}
+        build_results = {}
+        if build_cache is None:
+            pending_rows = effect_rows
+        else:
+            build_cache.reset_counters()
+            # Format: {expression ID: expression row}
+            expressions_keyed = {}
+            for row in data['expressions']:
+                expressions_keyed[row['expressionID']] = row
+            # Format: {effect ID: digest}
+            digests = {}
+            pending_rows = []
+            for effect_row in effect_rows:
+                effect_id = effect_row['effect_id']
+                digest = digests[effect_id] = get_effect_digest(effect_row, expressions_keyed)
+                try:
+                    build_results[effect_id] = build_cache.get(digest)
+                except KeyError:
+                    pending_rows.append(effect_row)
+        if processes > 1 and len(pending_rows) > 1:
+            results = self._build_parallel(data['expressions'], pending_rows, processes, modinfo_cache)
+        else:
+            builder = ModifierBuilder(data['expressions'], modinfo_cache)
+            # Without build cache, builder logs directly
+            if build_cache is None:
+                results = (
+                    self._build_effect_modifiers(builder, effect_row) + ((),)
+                    for effect_row in pending_rows)
+            else:
+                results = (
+                    self._build_effect_logged(builder, effect_row, builder_logger)
+                    for effect_row in pending_rows)
+        for effect_row, result in zip(pending_rows, results):
+            build_results[effect_row['effect_id']] = result
+            if build_cache is not None:
+                build_cache.add(digests[effect_row['effect_id']], *result)
+        if build_cache is not None:
+            build_cache.retain(digests.values())
+        # Pass what builder logged about effects to our loggers in
+        # the same order serial build would log it, regardless of
+        # whether effect was built now or taken from build cache
+        for effect_row in effect_rows:
+            _replay_log(build_results[effect_row['effect_id']][2], effect_row['effect_id'])
+
+        # Modifiers are deduplicated by contents, each unique modifier
+        # is stored once and effects refer it by ID
         # Format: {modifier row: modifier ID}
         modifier_id_map = {}
-        modifier_id = 1
-        # Sort rows by ID so we numerate modifiers in deterministic way
-        for effect_row in sorted(data['effects'], key=lambda row: row['effect_id']):
-            modifiers, build_status = builder.build(effect_row)
+        for effect_row in effect_rows:
+            frozen_modifiers, build_status, _ = build_results[effect_row['effect_id']]
             # Update effects: add modifier build status and remove
             # fields which we needed only for this process
             effect_row['build_status'] = build_status
             del effect_row['pre_expression']
             del effect_row['post_expression']
             del effect_row['modifier_info']
-            for modifier in modifiers:
-                # Convert modifiers into frozen datarows to use
-                # them in conversion process
-                frozen_modifier = self._freeze_modifier(modifier)
-                # Gather data about which effects use which modifier
-                used_by_effects = modifier_effect_map.setdefault(frozen_modifier, [])
-                used_by_effects.append(effect_row['effect_id'])
-                # Assign ID only to each unique modifier
-                if frozen_modifier not in modifier_id_map:
-                    modifier_id_map[frozen_modifier] = modifier_id
-                    modifier_id += 1
-
-        # Compose reverse to modifier_effect_map dictionary
-        # Format: {effect ID: [modifier rows]}
-        effect_modifier_map = {}
-        for frozen_modifier, effect_ids in modifier_effect_map.items():
-            for effect_id in effect_ids:
-                effect_modifiers = effect_modifier_map.setdefault(effect_id, [])
-                effect_modifiers.append(frozen_modifier)
-
-        # For each effect, add IDs of each modifiers it uses
-        for effect_row in data['effects']:
             modifier_ids = []
-            for frozen_modifier in effect_modifier_map.get(effect_row['effect_id'], ()):
-                modifier_ids.append(modifier_id_map[frozen_modifier])
+            for frozen_modifier in frozen_modifiers:
+                # Assign ID only to each unique modifier
+                modifier_id = modifier_id_map.setdefault(frozen_modifier, len(modifier_id_map) + 1)
+                modifier_ids.append(modifier_id)
+            modifier_ids.sort()
             effect_row['modifiers'] = modifier_ids
 
         # Replace expressions table with modifiers
@@ -326,6 +337,85 @@ class Converter:
             modifiers.append(modifier)
         data['modifiers'] = modifiers
 
+    def _build_parallel(self, expressions, effect_rows, processes, modinfo_cache):
+        """
+        Build modifiers for effects in pool of processes.
+
+        Return value:
+        Iterable with results for passed effect rows, in the same
+        order and form as _build_effect_logged() returns them
+        """
+        # Several chunks per process, so that processes
+        # which get cheap effects do not sit idle
+        chunk_size = -(-len(effect_rows) // (processes * 4))
+        chunks = [effect_rows[i:i + chunk_size] for i in range(0, len(effect_rows), chunk_size)]
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_build_worker, initargs=(expressions, modinfo_cache)
+        ) as executor:
+            for chunk_results in executor.map(_build_chunk, chunks):
+                yield from chunk_results
+
+    def _build_effect_logged(self, builder, effect_row, capture_logger):
+        """
+        Build modifiers for an effect, collecting what was
+        logged during the build instead of emitting it.
+
+        Required arguments:
+        builder -- modifier builder to use
+        effect_row -- effect row in assembled form
+        capture_logger -- logger whose records are collected;
+        they do not reach its handlers and parent loggers
+
+        Return value:
+        Tuple with tuple of frozen modifier rows, effect build
+        status and tuple of log entries in (logger name, level,
+        message template) format. Effects with the same data
+        share builds, thus templates do not mention effect ID,
+        it is substituted when log is replayed
+        """
+        collector = _RecordCollector()
+        old_handlers = capture_logger.handlers[:]
+        old_level = capture_logger.level
+        old_propagate = capture_logger.propagate
+        capture_logger.handlers[:] = [collector]
+        capture_logger.setLevel(DEBUG)
+        capture_logger.propagate = False
+        try:
+            result = self._build_effect_modifiers(builder, effect_row)
+        finally:
+            capture_logger.handlers[:] = old_handlers
+            capture_logger.setLevel(old_level)
+            capture_logger.propagate = old_propagate
+        effect_mention = re.compile(r'\beffect {}\b'.format(effect_row['effect_id']))
+        log_entries = tuple(
+            (record.name, record.levelno, effect_mention.sub(
+                'effect {effect_id}', record.msg.replace('{', '{{').replace('}', '}}')))
+            for record in collector.records)
+        return result + (log_entries,)
+
+    def _build_effect_modifiers(self, builder, effect_row):
+        """
+        Build modifiers for an effect.
+
+        Return value:
+        Tuple with tuple of frozen modifier rows and effect
+        build status. Rows are sorted, so that results do
+        not depend on order in which builder produced them
+        """
+        modifiers, build_status = builder.build(effect_row)
+        # Convert modifiers into frozen datarows to use
+        # them in conversion process
+        frozen_modifiers = tuple(sorted(
+            (self._freeze_modifier(modifier) for modifier in modifiers),
+            key=self._modifier_sort_key))
+        return frozen_modifiers, build_status
+
+    @staticmethod
+    def _modifier_sort_key(frozen_modifier):
+        return tuple(
+            (value is not None, value if value is not None else 0)
+            for _, value in sorted(frozen_modifier.items()))
+
     def _freeze_modifier(self, modifier):
         """
         Converts modifier into frozendict with its keys and
@@ -347,3 +437,57 @@ class Converter:
             modifier_row[field] = getattr(modifier, field)
         frozen_row = FrozenDict(modifier_row)
         return frozen_row
+
+
+# Modifier builder of build worker process
+_worker_builder = None
+
+
+class _RecordCollector(Handler):
+    """Logging handler which stores records in list."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # Make record safe to pickle
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+def _replay_log(log_entries, effect_id):
+    """
+    Pass log entries, collected during modifier build, to
+    loggers they were originally logged to.
+
+    Required arguments:
+    log_entries -- iterable with (logger name, level, message
+    template) tuples
+    effect_id -- ID of effect which is substituted into templates
+    """
+    for name, level, template in log_entries:
+        record_logger = getLogger(name)
+        if record_logger.isEnabledFor(level):
+            msg = template.format(effect_id=effect_id)
+            record = record_logger.makeRecord(name, level, '(modifier build)', 0, msg, None, None)
+            record_logger.handle(record)
+
+
+def _init_build_worker(expressions, modinfo_cache):
+    global _worker_builder
+    _worker_builder = ModifierBuilder(expressions, modinfo_cache)
+
+
+def _build_chunk(effect_rows):
+    """
+    Build modifiers for chunk of effects in build worker.
+
+    Return value:
+    List of build results, with what was logged during build
+    of each effect
+    """
+    converter = Converter()
+    return [converter._build_effect_logged(_worker_builder, effect_row, getLogger()) for effect_row in effect_rows]
@@ -19,84 +19,274 @@
 #===============================================================================
 
 
-from eos.util.frozen_dict import FrozenDict
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+
+from eos.data.data_handler.abc import BaseDataHandler
 from .checker import Checker
-from .cleaner import Cleaner
+from .cleaner import AUXILIARY_TABLES, Cleaner
 from .converter import Converter
+from .modifier_info_cache import ModifierInfoCache
+from .table import Table
 
 
 class CacheGenerator:
     """
     Refactors and optimizes data into format suitable
     for Eos.
+
+    Data handlers based on BaseDataHandler are asked only for
+    rows of types which may survive cleanup.
+
+    Optional arguments:
+    processes -- amount of workers which load data tables and
+    build modifiers. Tables are loaded in threads when data handler
+    is bound to I/O (its io_bound attribute is true), else in
+    processes when data handler can be pickled. Modifiers are built
+    in processes. Result doesn't depend on it
+
+    Attributes:
+    stage_timings -- dictionary in {stage name: seconds} format with
+    time stages of last generation took, in order they were run
+    modinfo_cache -- ModifierInfoCache used by last generation, its
+    counters tell how much YAML parsing was saved
+    table_timings -- dictionary in {table name: seconds} format with
+    time loading of each table took during last generation; when
+    tables are loaded in parallel, their times overlap
+    table_row_counts -- dictionary in {table name: row count} format
+    with amount of rows fetched from data handler during last
+    generation
     """
 
-    def __init__(self):
+    def __init__(self, processes=1):
         self._checker = Checker()
         self._cleaner = Cleaner()
         self._converter = Converter()
+        self._processes = processes
+        self.stage_timings = {}
+        self.modinfo_cache = None
+        self.table_timings = {}
+        self.table_row_counts = {}
 
-    def run(self, data_handler):
+    def run(self, data_handler, build_cache=None):
         """
         Generate cache out of passed data.
 
         Required arguments:
         data_handler - data handler to use for getting data
 
+        Optional arguments:
+        build_cache -- ModifierBuildCache instance; when passed,
+        modifiers are rebuilt only for effects whose data has
+        changed since previous generation which used it
+
         Return value:
         Dictionary in {entity type: [{field name: field value}]
         format
         """
-        # Put all the data we need into single dictionary
-        # Format, as usual, {table name: table}, where table
-        # is set of rows, which are represented by frozendicts
-        # {fieldName: fieldValue}. Combination of sets and
-        # frozendicts is used to speed up several stages of
-        # the generator.
-        data = {}
-        tables = {
-            'evetypes': data_handler.get_evetypes,
-            'evegroups': data_handler.get_evegroups,
-            'dgmattribs': data_handler.get_dgmattribs,
-            'dgmtypeattribs': data_handler.get_dgmtypeattribs,
-            'dgmeffects': data_handler.get_dgmeffects,
-            'dgmtypeeffects': data_handler.get_dgmtypeeffects,
-            'dgmexpressions': data_handler.get_dgmexpressions
-        }
-
-        for tablename, method in tables.items():
-            table_pos = 0
-            # For faster processing of various operations,
-            # freeze table rows and put them into set
-            table = set()
-            for row in method():
-                # During  further generator stages. some of rows
-                # may fall in risk groups, where all rows but one
-                # need to be removed. To deterministically remove rows
-                # based on position in original data, write position
-                # to each row
-                row['table_pos'] = table_pos
-                table_pos += 1
-                table.add(FrozenDict(row))
-            data[tablename] = table
+        self.stage_timings = {}
+        stage_start = perf_counter()
+        # Modifier info YAML is parsed once, and used
+        # by all stages which need it
+        modinfo_cache = self.modinfo_cache = ModifierInfoCache()
+        data = self._fetch_data(data_handler, modinfo_cache)
+        stage_start = self._finish_stage('fetch', stage_start)
 
         # Run pre-cleanup checks, as cleaning and further stages
         # rely on some assumptions about the data
         self._checker.pre_cleanup(data)
+        stage_start = self._finish_stage('pre_cleanup', stage_start)
 
         # Also normalize the data to make data structure
         # more consistent, and thus easier to clean properly
         self._converter.normalize(data)
+        stage_start = self._finish_stage('normalize', stage_start)
 
         # Clean our container out of unwanted data
-        self._cleaner.clean(data)
+        self._cleaner.clean(data, modinfo_cache)
+        stage_start = self._finish_stage('clean', stage_start)
 
         # Verify that our data is ready for conversion
         self._checker.pre_convert(data)
+        stage_start = self._finish_stage('pre_convert', stage_start)
 
         # Convert data into Eos-specific format. Here tables are
-        # no longer represented by sets of frozendicts, but by
-        # list of dicts
-        data = self._converter.convert(data)
+        # no longer represented by tables, but by list of dicts
+        data = self._converter.convert(data, build_cache, self._processes, modinfo_cache)
+        self._finish_stage('convert', stage_start)
 
         return data
+
+    def _finish_stage(self, stage_name, stage_start):
+        """
+        Record time stage took.
+
+        Return value:
+        Time next stage starts at
+        """
+        now = perf_counter()
+        self.stage_timings[stage_name] = now - stage_start
+        return now
+
+    def _fetch_data(self, data_handler, modinfo_cache):
+        """
+        Fetch data tables from data handler.
+
+        Return value:
+        Dictionary in {table name: table} format, where table
+        is Table with rows, which are represented by dicts
+        {fieldName: fieldValue}. Tables index fields which
+        refer other entities, to let generator stages look
+        rows up instead of scanning whole tables.
+        """
+        data = {}
+        self.table_timings = {}
+        executor = self._make_executor(data_handler)
+        try:
+            # Auxiliary tables, which describe types, are the largest
+            # ones; rows of types which are certain to be removed by
+            # cleanup are not requested from data handlers which
+            # are able to filter them out. For this, other tables
+            # are fetched first
+            if isinstance(data_handler, BaseDataHandler):
+                tablenames = [tablename for tablename in TABLE_NAMES if tablename not in AUXILIARY_TABLES]
+                self._fetch_tables(executor, data_handler, tablenames, data)
+                type_ids = self._cleaner.get_candidate_type_ids(data, modinfo_cache)
+                self._fetch_tables(executor, data_handler, AUXILIARY_TABLES, data, type_ids)
+            else:
+                self._fetch_tables(executor, data_handler, TABLE_NAMES, data)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.table_timings = {tablename: self.table_timings[tablename] for tablename in TABLE_NAMES}
+        self.table_row_counts = {tablename: len(data[tablename]) for tablename in TABLE_NAMES}
+        return {tablename: data[tablename] for tablename in TABLE_NAMES}
+
+    def _make_executor(self, data_handler):
+        """
+        Make executor to fetch tables in parallel with.
+
+        Return value:
+        Thread pool executor for data handlers which are
+        bound to I/O, process pool executor for other ones,
+        or None if tables should be fetched one by one
+        """
+        if self._processes <= 1:
+            return None
+        max_workers = min(self._processes, len(TABLE_NAMES))
+        # Such data handlers spend most of the time out of
+        # GIL, and are used in this process
+        if getattr(data_handler, 'io_bound', False):
+            return ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            pickle.dumps(data_handler)
+        # Data handlers which hold connections
+        # and such are used in this process only
+        except (TypeError, AttributeError, pickle.PicklingError):
+            return None
+        return ProcessPoolExecutor(max_workers=max_workers)
+
+    def _fetch_tables(self, executor, data_handler, tablenames, data, type_ids=None):
+        """
+        Fetch data tables from data handler, and put them into
+        data container. Time each table took to load is written
+        to table timings.
+
+        Required arguments:
+        executor -- executor to fetch tables with, or None to
+        fetch them one by one in this thread
+        data_handler -- data handler to fetch tables from
+        tablenames -- iterable with names of tables to fetch
+        data -- dictionary to put tables into
+
+        Optional arguments:
+        type_ids -- when passed, data handler is asked to
+        provide rows only of these types
+        """
+        # Each table is loaded as a whole by single worker, this
+        # way positions of rows in tables do not depend on it
+        if isinstance(executor, ProcessPoolExecutor):
+            futures = [
+                (tablename, executor.submit(_load_table, data_handler, tablename, type_ids))
+                for tablename in tablenames]
+            for tablename, future in futures:
+                rows, elapsed = future.result()
+                start = perf_counter()
+                data[tablename] = _make_table(tablename, rows)
+                self.table_timings[tablename] = elapsed + perf_counter() - start
+        elif isinstance(executor, ThreadPoolExecutor):
+            futures = [
+                (tablename, executor.submit(_build_table, data_handler, tablename, type_ids))
+                for tablename in tablenames]
+            for tablename, future in futures:
+                data[tablename], self.table_timings[tablename] = future.result()
+        else:
+            for tablename in tablenames:
+                data[tablename], self.table_timings[tablename] = _build_table(data_handler, tablename, type_ids)
+
+
+# Names of data tables generator needs, data handlers
+# provide them via get_<table name> methods
+TABLE_NAMES = (
+    'evetypes',
+    'evegroups',
+    'dgmattribs',
+    'dgmtypeattribs',
+    'dgmeffects',
+    'dgmtypeeffects',
+    'dgmexpressions'
+)
+
+
+# Fields indexed in each table, these are primary keys and
+# fields which stages of generator use to find rows
+# Format: {table name: (field names)}
+TABLE_INDEXES = {
+    'evetypes': ('typeID', 'groupID'),
+    'evegroups': ('groupID', 'categoryID'),
+    'dgmattribs': ('attributeID',),
+    'dgmtypeattribs': ('typeID', 'attributeID'),
+    'dgmeffects': ('effectID',),
+    'dgmtypeeffects': ('typeID', 'effectID'),
+    'dgmexpressions': ('expressionID', 'operandID')
+}
+
+
+def _fetch_table(data_handler, tablename, type_ids=None):
+    getter = getattr(data_handler, 'get_{}'.format(tablename))
+    if type_ids is None:
+        return getter()
+    return getter(type_ids=type_ids)
+
+
+def _load_table(data_handler, tablename, type_ids=None):
+    # Rows are sent from worker process as a whole,
+    # thus here streams have to be read completely
+    start = perf_counter()
+    rows = list(_fetch_table(data_handler, tablename, type_ids))
+    return rows, perf_counter() - start
+
+
+def _build_table(data_handler, tablename, type_ids=None):
+    start = perf_counter()
+    table = _make_table(tablename, _fetch_table(data_handler, tablename, type_ids))
+    return table, perf_counter() - start
+
+
+def _make_table(tablename, rows):
+    table_pos = 0
+    table = Table(TABLE_INDEXES[tablename])
+    for row in rows:
+        # Rows are changed during further stages, thus
+        # we work with copies of data handler's rows
+        row = dict(row)
+        # During  further generator stages. some of rows
+        # may fall in risk groups, where all rows but one
+        # need to be removed. To deterministically remove rows
+        # based on position in original data, write position
+        # to each row
+        row['table_pos'] = table_pos
+        table_pos += 1
+        table.add(row)
+    return table
@@ -27,11 +27,18 @@ class ModifierBuilder:
     """
     Class which is used for generating Eos modifiers out of
     effect data.
+
+    Required arguments:
+    expressions -- iterable with expression rows
+
+    Optional arguments:
+    modinfo_cache -- ModifierInfoCache to take parsed
+    modifier info YAML from
     """
 
-    def __init__(self, expressions):
+    def __init__(self, expressions, modinfo_cache=None):
         self._tree = Effect2Modifiers(expressions)
-        self._info = Info2Modifiers()
+        self._info = Info2Modifiers(modinfo_cache)
 
     def build(self, effect_row):
         """
@@ -18,6 +18,7 @@
 # along with Eos. If not, see <http://www.gnu.org/licenses/>.
 #===============================================================================
 
+from copy import copy
 
 from eos.const.eos import Domain, Operator
 from eos.const.eve import Operand
@@ -30,6 +31,14 @@ class ETree2Actions:
     """
     Class is responsible for converting tree of Expression objects (which
     aren't directly useful to us) into intermediate Action objects.
+
+    Expressions form DAG rather than set of separate trees, thus results of
+    subtree conversion are memoized by expression ID for the lifetime of the
+    object.
+
+    Attributes:
+    node_visits -- amount of expression nodes fetched during conversion
+    subtree_hits -- amount of times memoized subtree result has been reused
     """
 
     def __init__(self, expressions):
@@ -38,6 +47,10 @@ class ETree2Actions:
         self._expressions = {}
         for exp_row in expressions:
             self._expressions[exp_row['expressionID']] = exp_row
+        # Format: {expression ID: (actions, skipped data flag)}
+        self._subtrees = {}
+        self.node_visits = 0
+        self.subtree_hits = 0
 
     def convert(self, tree_root_id, effect_category_id):
         """
@@ -50,22 +63,41 @@ class ETree2Actions:
         into try-except block which catches all exceptions if you want to achieve
         at least basic level of stability
         """
-        # Set with already generated actions
-        self._actions = []
-        # Flag which indicates, did we have data which we
-        # have skipped or not
-        self._skipped_data = False
         # Run parsing process
         tree_root = self._get_exp(tree_root_id)
-        self._generic(tree_root)
-        # Validate generated actions
-        for action in self._actions:
+        actions, skipped_data = self._generic(tree_root)
+        # Memoized actions are shared between subtrees, thus
+        # give each tree its own copies
+        actions = [copy(action) for action in actions]
+        # Validate generated actions; it depends on effect category,
+        # thus is not memoized
+        for action in actions:
             if self.validate_action(action, effect_category_id) is not True:
                 raise ActionValidationError('failed to validate action')
-        return self._actions, self._skipped_data
+        return actions, skipped_data
 
     def _generic(self, expression):
-        """Generic entry point, used if we expect passed node to be meaningful"""
+        """
+        Generic entry point, used if we expect passed node to be meaningful.
+
+        Return value:
+        Tuple with actions generated out of subtree and flag which indicates
+        if subtree contains data which we have skipped
+        """
+        expression_id = expression.get('expressionID')
+        try:
+            result = self._subtrees[expression_id]
+        except KeyError:
+            pass
+        else:
+            self.subtree_hits += 1
+            return result
+        result = self._convert_subtree(expression)
+        self._subtrees[expression_id] = result
+        return result
+
+    def _convert_subtree(self, expression):
+        """Convert meaningful node which is not memoized yet"""
         operand_id = expression.get('operandID')
         try:
             operand_meta = operand_data[operand_id]
@@ -76,15 +108,15 @@ class ETree2Actions:
         # For nodes which describe apply/undo action,
         # call method which handles them
         if operand_enabled_flag is True:
-            self._make_action(expression)
+            return (self._make_action(expression),), False
         # Mark current effect as partially parsed if it contains
         # inactive operands
         elif operand_enabled_flag is False:
-            self._skipped_data = True
+            return (), True
         # If multiple actions are spliced here, handle it
         # appropriately
         elif expression.get('operandID') == Operand.splice:
-            self._splice(expression)
+            return self._splice(expression)
         # Process expressions with other operands using the map
         else:
             generic_opnds = {
@@ -96,13 +128,15 @@ class ETree2Actions:
             except KeyError as e:
                 raise ETree2ActionError('unknown generic operand {}'.format(operand_id)) from e
             method(expression)
+            return (), False
 
     def _splice(self, expression):
         """Reference two expressions from single one"""
         arg1 = self._get_exp(expression.get('arg1'))
-        self._generic(arg1)
+        actions1, skipped_data1 = self._generic(arg1)
         arg2 = self._get_exp(expression.get('arg2'))
-        self._generic(arg2)
+        actions2, skipped_data2 = self._generic(arg2)
+        return actions1 + actions2, skipped_data1 or skipped_data2
 
     def _make_action(self, expression):
         """Make action for expressions describing modifier"""
@@ -116,7 +150,7 @@ class ETree2Actions:
         # Write down source attribute from arg2
         arg2 = self._get_exp(expression.get('arg2'))
         action.src_attr = self._get_attribute(arg2)
-        self._actions.append(action)
+        return action
 
     def _optr_tgt(self, expression, action):
         """Get operator and handle target definition"""
@@ -258,6 +292,7 @@ class ETree2Actions:
         return boolean
 
     def _get_exp(self, expression_id):
+        self.node_visits += 1
         try:
             return self._expressions[expression_id]
         except KeyError:
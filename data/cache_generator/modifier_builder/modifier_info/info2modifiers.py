@@ -18,12 +18,12 @@
 #===============================================================================
 
 
-import yaml
 from logging import getLogger
 
 from eos.const.eos import State, Domain, EffectBuildStatus, Scope, FilterType, Operator
 from eos.const.eve import EffectCategory
 from eos.data.cache_object import Modifier
+from ...modifier_info_cache import ModifierInfoCache
 from .exception import *
 
 
@@ -123,8 +123,16 @@ state_map = {
 class Info2Modifiers:
     """
     Parse modifierInfos into actual Modifier objects.
+
+    Optional arguments:
+    modinfo_cache -- ModifierInfoCache to take parsed YAML from
     """
 
+    def __init__(self, modinfo_cache=None):
+        if modinfo_cache is None:
+            modinfo_cache = ModifierInfoCache()
+        self._modinfo_cache = modinfo_cache
+
     def convert(self, effect_row):
         """
         Parse YAML and handle overall workflow and error handling
@@ -136,7 +144,7 @@ class Info2Modifiers:
             # Parse modifierInfo field (which is actually YAML)
             modifier_infos_yaml = effect_row['modifier_info']
             try:
-                modifier_infos = yaml.safe_load(modifier_infos_yaml)
+                modifier_infos = self._modinfo_cache.get(modifier_infos_yaml)
             except KeyboardInterrupt:
                 raise
             except Exception:
@@ -0,0 +1,88 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from time import perf_counter
+
+import yaml
+
+# libyaml-based loader is much faster, but it's
+# not available when PyYAML is built without it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+class ModifierInfoCache:
+    """
+    Storage for parsed modifier info YAML, which is shared by all
+    stages of cache generation, so that each distinct YAML text is
+    parsed once per generation, even when many effects use it.
+    Parsed data is shared as well, thus it must not be modified.
+
+    Attributes:
+    hits -- amount of requests served with parsed data
+    misses -- amount of requests which needed parsing
+    parse_time -- total time spent on parsing, in seconds
+    """
+
+    def __init__(self):
+        # Format: {YAML text: (parsed data, parsing exception)}
+        self.__parsed = {}
+        self.hits = 0
+        self.misses = 0
+        self.parse_time = 0.0
+
+    def get(self, modinfo_yaml):
+        """
+        Get parsed modifier info.
+
+        Required arguments:
+        modinfo_yaml -- text with YAML
+
+        Return value:
+        Parsed data
+
+        Possible exceptions:
+        Any exception parser raised when YAML was parsed first
+        time, e.g. yaml.YAMLError for malformed YAML
+        """
+        try:
+            data, error = self.__parsed[modinfo_yaml]
+        except KeyError:
+            self.misses += 1
+            start = perf_counter()
+            try:
+                data, error = yaml.load(modinfo_yaml, Loader=SafeLoader), None
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                data, error = None, e
+            self.parse_time += perf_counter() - start
+            self.__parsed[modinfo_yaml] = (data, error)
+        else:
+            self.hits += 1
+        if error is not None:
+            raise error
+        return data
+
+    def __len__(self):
+        return len(self.__parsed)
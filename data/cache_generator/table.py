@@ -0,0 +1,160 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from eos.util.repr import make_repr_str
+
+
+class Table:
+    """
+    Container for rows of data table, used during cache generation.
+    Rows are plain dictionaries, they are identified by identity and
+    kept in order they were added in. Table maintains indexes over
+    some of fields, so that rows can be found by value of such field
+    without scanning whole table.
+
+    Optional arguments:
+    indexed_fields -- iterable with names of fields to index
+    """
+
+    def __init__(self, indexed_fields=()):
+        # Format: {row ID: row}
+        self.__rows = {}
+        # Format: {field name: {field value: {row ID: row}}}
+        self.__indexes = {field: {} for field in indexed_fields}
+
+    @property
+    def indexed_fields(self):
+        return tuple(self.__indexes)
+
+    def add(self, row):
+        """
+        Add row to table. Rows which are already
+        in table are not added again.
+
+        Required arguments:
+        row -- dictionary with row data
+        """
+        row_id = id(row)
+        if row_id in self.__rows:
+            return
+        self.__rows[row_id] = row
+        for field, index in self.__indexes.items():
+            value = row.get(field)
+            try:
+                index.setdefault(value, {})[row_id] = row
+            # Unhashable values cannot be looked up anyway
+            except TypeError:
+                pass
+
+    def update(self, rows):
+        """Add multiple rows to table."""
+        for row in rows:
+            self.add(row)
+
+    def remove(self, row):
+        """
+        Remove row from table.
+
+        Required arguments:
+        row -- row to remove
+
+        Possible exceptions:
+        KeyError -- raised when row is not in table
+        """
+        row_id = id(row)
+        del self.__rows[row_id]
+        for field, index in self.__indexes.items():
+            value = row.get(field)
+            try:
+                rows = index[value]
+            except (KeyError, TypeError):
+                continue
+            del rows[row_id]
+            if not rows:
+                del index[value]
+
+    def difference_update(self, rows):
+        """Remove multiple rows from table, skipping absent ones."""
+        for row in rows:
+            if row in self:
+                self.remove(row)
+
+    def set_field(self, row, field, value):
+        """
+        Change value of row field, updating indexes.
+
+        Required arguments:
+        row -- row which belongs to table
+        field -- name of field
+        value -- new value
+        """
+        if field in self.__indexes:
+            self.remove(row)
+            row[field] = value
+            self.add(row)
+        else:
+            row[field] = value
+
+    def find(self, field, value):
+        """
+        Find rows which have passed value of indexed field.
+
+        Required arguments:
+        field -- name of indexed field
+        value -- value to look for
+
+        Return value:
+        List with rows, in order they were added in
+        """
+        try:
+            return list(self.__indexes[field][value].values())
+        except (KeyError, TypeError):
+            return []
+
+    def get_values(self, field):
+        """
+        Get values of indexed field rows of table have.
+
+        Required arguments:
+        field -- name of indexed field
+
+        Return value:
+        Set-like view with values
+        """
+        return self.__indexes[field].keys()
+
+    def make_empty(self):
+        """Make empty table with the same indexes."""
+        return Table(self.__indexes)
+
+    def __contains__(self, row):
+        return id(row) in self.__rows
+
+    def __iter__(self):
+        # Table must not be changed while it's iterated over
+        return iter(self.__rows.values())
+
+    def __len__(self):
+        return len(self.__rows)
+
+    def __repr__(self):
+        spec = ['indexed_fields']
+        return make_repr_str(self, spec)
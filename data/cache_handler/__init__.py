@@ -19,9 +19,15 @@
 #===============================================================================
 
 
+from .binary_cache_handler import BinaryCacheHandler
+from .interner import CacheInterner
 from .json_cache_handler import JsonCacheHandler
+from .shared_memory_cache_handler import SharedMemoryCacheHandler
 
 
 __all__ = [
-    'JsonCacheHandler'
+    'BinaryCacheHandler',
+    'CacheInterner',
+    'JsonCacheHandler',
+    'SharedMemoryCacheHandler'
 ]
@@ -35,6 +35,19 @@ class BaseCacheHandler(metaclass=ABCMeta):
     def get_type(self, type_id):
         ...
 
+    def get_types(self, type_ids):
+        """
+        Get multiple types at once. Cache handlers may
+        override it to make bulk fetch cheaper.
+
+        Required arguments:
+        type_ids -- iterable with type IDs
+
+        Return value:
+        List with types, in the same order as IDs
+        """
+        return [self.get_type(type_id) for type_id in type_ids]
+
     @abstractmethod
     def get_attribute(self, attr_id):
         ...
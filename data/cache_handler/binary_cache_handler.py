@@ -0,0 +1,457 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import mmap
+import os
+import os.path
+from abc import abstractmethod
+from logging import getLogger
+from struct import Struct, unpack_from
+from weakref import ref
+
+from eos.util.repr import make_repr_str
+from .json_cache_handler import read_json_cache
+from .record_handler import INDEX_NAMES, RecordCacheHandler, make_record_indexes, strip_data
+
+
+logger = getLogger(__name__)
+
+
+# Sign of Eos binary cache and version of its layout; files with
+# different sign or version are considered as invalid
+MAGIC = b'EOSB'
+FORMAT_VERSION = 1
+
+# Layout of file:
+# header -- magic, format version, amount of tables, fingerprint length
+# fingerprint -- UTF-8 encoded fingerprint string
+# table directory -- name, record amount and offset of index for each table
+# records -- encoded records of all tables
+# indices -- for each table, array of (record ID, record offset) pairs
+# sorted by ID, which allows to find record without decoding anything else
+header_struct = Struct('<4sHHi')
+table_struct = Struct('<16sIQ')
+index_struct = Struct('<qQ')
+
+# Order in which tables are written into file
+TABLE_NAMES = ('types', 'attributes', 'effects', 'modifiers')
+
+# Record values are stored as tag byte, optionally followed by value
+# payload; sequences store amount of their elements as payload and
+# are followed by them
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_FLOAT = 4
+TAG_SEQUENCE = 5
+# Sequence which contains only integers, stored as plain array
+TAG_INT_ARRAY = 6
+
+tag_struct = Struct('<B')
+int_struct = Struct('<q')
+float_struct = Struct('<d')
+length_struct = Struct('<I')
+
+
+class BufferCacheHandler(RecordCacheHandler):
+    """
+    Base class for cache handlers which serve records out of buffer
+    with binary cache layout. Records are decoded only when object
+    they describe is requested. Child classes are responsible for
+    storing packed data and switching reader to buffer with it.
+    """
+
+    def __init__(self, object_cache_size=0, interner=None):
+        super().__init__(object_cache_size, interner)
+        self._reader = BinaryCacheReader(None)
+        # Indexes rebuilt for cache which has been written without
+        # them, with weak reference to reader they were built for
+        # Format: (reader ref, {index name: {key: type IDs}})
+        self.__rebuilt_indexes = None
+
+    def _get_type_ids(self):
+        return self._reader.get_record_ids('types')
+
+    def _get_type_record(self, type_id):
+        return self._reader.get_record('types', type_id)
+
+    def _get_index_record(self, index_name, key):
+        reader = self._reader
+        if reader.has_table(index_name):
+            return reader.get_record(index_name, key)
+        # Caches written by older versions of Eos have no indexes,
+        # they're rebuilt out of types when requested for the first time
+        rebuilt_indexes = self.__rebuilt_indexes
+        if rebuilt_indexes is None or rebuilt_indexes[0]() is not reader:
+            type_records = {
+                type_id: reader.get_record('types', type_id)
+                for type_id in reader.get_record_ids('types')}
+            rebuilt_indexes = self.__rebuilt_indexes = (ref(reader), make_record_indexes(type_records))
+        return rebuilt_indexes[1][index_name][key]
+
+    def _get_attribute_record(self, attr_id):
+        return self._reader.get_record('attributes', attr_id)
+
+    def _get_effect_record(self, effect_id):
+        return self._reader.get_record('effects', effect_id)
+
+    def _get_modifier_record(self, modifier_id):
+        return self._reader.get_record('modifiers', modifier_id)
+
+    def get_fingerprint(self):
+        return self._reader.fingerprint
+
+    def get_record_counts(self):
+        """
+        Get amount of records stored in cache.
+
+        Return value:
+        Dictionary in {entity type: record count} format;
+        reverse indexes are not counted
+        """
+        record_counts = self._reader.get_record_counts()
+        return {table_name: record_counts.get(table_name, 0) for table_name in TABLE_NAMES}
+
+    def update_cache(self, data, fingerprint):
+        packed_data = pack_cache(strip_data(data), fingerprint)
+        with self._lock:
+            self._store(packed_data)
+            self._clear_object_cache()
+
+    def import_json_cache(self, json_cache_path):
+        """
+        Convert cache stored by JSON cache handler into binary
+        cache of this handler.
+
+        Required arguments:
+        json_cache_path -- path to JSON cache file
+        """
+        json_data = read_json_cache(json_cache_path)
+        fingerprint = json_data.pop('fingerprint')
+        # JSON stores keys as strings, convert them back
+        slim_data = {}
+        for table_name, table in json_data.items():
+            slim_data[table_name] = {int(k): v for k, v in table.items()}
+        # Caches written by older versions of Eos have no indexes
+        if not all(index_name in slim_data for index_name in INDEX_NAMES):
+            slim_data.update(make_record_indexes(slim_data['types']))
+        packed_data = pack_cache(slim_data, fingerprint)
+        with self._lock:
+            self._store(packed_data)
+            self._clear_object_cache()
+
+    @abstractmethod
+    def _store(self, packed_data):
+        """
+        Store packed data and switch reader to it. Called
+        with lock held. Records are read without lock, thus
+        buffer of old reader should stay valid for as long
+        as reader is referenced.
+
+        Required arguments:
+        packed_data -- bytes in binary cache layout
+        """
+        ...
+
+
+class BinaryCacheHandler(BufferCacheHandler):
+    """
+    This cache handler implements on-disk cache store in the form
+    of binary file with fixed layout. File is memory-mapped, and
+    records are decoded only when object they describe is requested,
+    thus handler initialization is cheap, and pages of the file are
+    shared between all processes which use the same cache via OS
+    page cache. Assembled objects are stored in object cache.
+
+    Required arguments:
+    cache_path -- file name where on-disk cache will be stored (.bin)
+
+    Optional arguments:
+    object_cache_size -- amount of most recently used objects of each
+    kind kept alive by object cache, see RecordCacheHandler
+    interner -- CacheInterner, through which cache objects
+    are shared with other handlers which use it
+    """
+
+    def __init__(self, cache_path, object_cache_size=0, interner=None):
+        super().__init__(object_cache_size, interner)
+        self._cache_path = cache_path
+        self.__mmap = None
+        # If cache doesn't exist, silently finish initialization
+        if not os.path.exists(self._cache_path):
+            return
+        try:
+            self.__open()
+        except KeyboardInterrupt:
+            raise
+        # If file is corrupted or anything else bad happens,
+        # act as if there's no cache at all
+        except:
+            msg = 'error during reading cache'
+            logger.error(msg)
+            self.__close()
+
+    def _store(self, packed_data):
+        cache_folder = os.path.dirname(self._cache_path)
+        if cache_folder and os.path.isdir(cache_folder) is not True:
+            os.makedirs(cache_folder, mode=0o755)
+        # Write into temporary file and replace actual cache with it
+        # afterwards, so that other processes which have old file mapped
+        # keep using it safely
+        tmp_path = '{}.tmp{}'.format(self._cache_path, os.getpid())
+        with open(tmp_path, 'wb') as file:
+            file.write(packed_data)
+        os.replace(tmp_path, self._cache_path)
+        self.__open()
+
+    def __open(self):
+        with open(self._cache_path, 'rb') as file:
+            self.__mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Old map is not closed, as other threads may be reading
+        # records from it; it's unmapped when its reader is gone
+        self._reader = BinaryCacheReader(self.__mmap)
+
+    def __close(self):
+        self._reader = BinaryCacheReader(None)
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
+
+    def __repr__(self):
+        spec = [['cache_path', '_cache_path']]
+        return make_repr_str(self, spec)
+
+
+class BinaryCacheReader:
+    """
+    Access records stored in buffer with binary cache layout.
+
+    Required arguments:
+    buffer -- object which supports buffer protocol (e.g. mmap),
+    or None if there's no data
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self.fingerprint = None
+        # Format: {table name: (record amount, index offset)}
+        self._tables = {}
+        if buffer is None:
+            return
+        magic, version, table_amount, fp_len = header_struct.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('unexpected binary cache format')
+        offset = header_struct.size
+        if fp_len >= 0:
+            self.fingerprint = bytes(buffer[offset:offset + fp_len]).decode('utf-8')
+            offset += fp_len
+        for _ in range(table_amount):
+            name, amount, index_offset = table_struct.unpack_from(buffer, offset)
+            self._tables[name.rstrip(b'\0').decode('ascii')] = (amount, index_offset)
+            offset += table_struct.size
+
+    def get_record(self, table_name, record_id):
+        """
+        Find and decode record.
+
+        Required arguments:
+        table_name -- name of table which contains record
+        record_id -- ID of record, integer
+
+        Return value:
+        Record tuple
+
+        Possible exceptions:
+        KeyError -- raised when there's no such record
+        """
+        try:
+            amount, index_offset = self._tables[table_name]
+        except KeyError as e:
+            raise KeyError(record_id) from e
+        buffer = self._buffer
+        unpack_key = int_struct.unpack_from
+        entry_size = index_struct.size
+        # Binary search over sorted index
+        low = 0
+        high = amount
+        while low < high:
+            middle = (low + high) // 2
+            key, = unpack_key(buffer, index_offset + middle * entry_size)
+            if key < record_id:
+                low = middle + 1
+            elif key > record_id:
+                high = middle
+            else:
+                _, record_offset = index_struct.unpack_from(buffer, index_offset + middle * entry_size)
+                record, _ = unpack_value(buffer, record_offset)
+                return record
+        raise KeyError(record_id)
+
+    def get_record_counts(self):
+        """
+        Get amount of records in each table.
+
+        Return value:
+        Dictionary in {table name: record count} format
+        """
+        return {table_name: amount for table_name, (amount, _) in self._tables.items()}
+
+    def has_table(self, table_name):
+        """
+        Check if there's table with passed name.
+
+        Required arguments:
+        table_name -- name of table
+        """
+        return table_name in self._tables
+
+    def get_record_ids(self, table_name):
+        """
+        Get IDs of all records in table, in ascending order.
+
+        Required arguments:
+        table_name -- name of table
+        """
+        try:
+            amount, index_offset = self._tables[table_name]
+        except KeyError:
+            return ()
+        entry_size = index_struct.size
+        return tuple(
+            int_struct.unpack_from(self._buffer, index_offset + i * entry_size)[0]
+            for i in range(amount))
+
+
+def pack_cache(slim_data, fingerprint):
+    """
+    Encode data into binary cache layout.
+
+    Required arguments:
+    slim_data -- data in {table name: {record ID: record}} format;
+    tables listed in TABLE_NAMES are written first, others follow
+    in sorted order
+    fingerprint -- unique ID of data in the form of string
+
+    Return value:
+    Bytes with binary cache contents
+    """
+    table_names = [n for n in TABLE_NAMES if n in slim_data]
+    table_names.extend(sorted(n for n in slim_data if n not in TABLE_NAMES))
+    if fingerprint is None:
+        fp_bytes = b''
+        fp_len = -1
+    else:
+        fp_bytes = fingerprint.encode('utf-8')
+        fp_len = len(fp_bytes)
+    records_offset = header_struct.size + len(fp_bytes) + table_struct.size * len(table_names)
+    records = bytearray()
+    # Format: {table name: [(record ID, record offset)]}
+    indices = {}
+    for table_name in table_names:
+        index = indices[table_name] = []
+        for record_id, record in sorted(slim_data[table_name].items()):
+            index.append((record_id, records_offset + len(records)))
+            pack_value(record, records)
+    directory = bytearray()
+    index_data = bytearray()
+    index_offset = records_offset + len(records)
+    for table_name in table_names:
+        index = indices[table_name]
+        directory += table_struct.pack(
+            table_name.encode('ascii'), len(index), index_offset + len(index_data))
+        for record_id, record_offset in index:
+            index_data += index_struct.pack(record_id, record_offset)
+    header = header_struct.pack(MAGIC, FORMAT_VERSION, len(table_names), fp_len)
+    return b''.join((header, fp_bytes, directory, records, index_data))
+
+
+def pack_value(value, buffer):
+    """
+    Encode value and append it to buffer.
+
+    Required arguments:
+    value -- None, boolean, integer, float or sequence of them
+    buffer -- bytearray to which encoded data is written
+    """
+    if value is None:
+        buffer += tag_struct.pack(TAG_NONE)
+    elif value is True:
+        buffer += tag_struct.pack(TAG_TRUE)
+    elif value is False:
+        buffer += tag_struct.pack(TAG_FALSE)
+    elif isinstance(value, int):
+        buffer += tag_struct.pack(TAG_INT)
+        buffer += int_struct.pack(value)
+    elif isinstance(value, float):
+        buffer += tag_struct.pack(TAG_FLOAT)
+        buffer += float_struct.pack(value)
+    elif isinstance(value, (tuple, list)):
+        if all(type(element) is int for element in value):
+            buffer += tag_struct.pack(TAG_INT_ARRAY)
+            buffer += length_struct.pack(len(value))
+            buffer += Struct('<{}q'.format(len(value))).pack(*value)
+        else:
+            buffer += tag_struct.pack(TAG_SEQUENCE)
+            buffer += length_struct.pack(len(value))
+            for element in value:
+                pack_value(element, buffer)
+    else:
+        raise TypeError('unable to pack value of type {}'.format(type(value)))
+
+
+def unpack_value(buffer, offset):
+    """
+    Decode value from buffer.
+
+    Required arguments:
+    buffer -- object with encoded data
+    offset -- position of value in buffer
+
+    Return value:
+    (value, offset of next value) tuple; sequences
+    are decoded as tuples
+    """
+    tag = buffer[offset]
+    offset += 1
+    if tag == TAG_INT:
+        return int_struct.unpack_from(buffer, offset)[0], offset + 8
+    if tag == TAG_FLOAT:
+        return float_struct.unpack_from(buffer, offset)[0], offset + 8
+    if tag == TAG_NONE:
+        return None, offset
+    if tag == TAG_TRUE:
+        return True, offset
+    if tag == TAG_FALSE:
+        return False, offset
+    if tag == TAG_INT_ARRAY:
+        length, = length_struct.unpack_from(buffer, offset)
+        offset += 4
+        return unpack_from('<{}q'.format(length), buffer, offset), offset + length * 8
+    if tag == TAG_SEQUENCE:
+        length, = length_struct.unpack_from(buffer, offset)
+        offset += 4
+        elements = []
+        for _ in range(length):
+            element, offset = unpack_value(buffer, offset)
+            elements.append(element)
+        return tuple(elements), offset
+    raise ValueError('unknown value tag {}'.format(tag))
@@ -0,0 +1,267 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import marshal
+from collections import namedtuple
+from threading import Lock
+from weakref import KeyedRef, WeakSet, WeakValueDictionary
+
+
+# Kinds of cache objects interner stores
+ENTITY_TYPES = ('types', 'attributes', 'effects', 'modifiers')
+
+InternerStats = namedtuple('InternerStats', ('hits', 'misses', 'objects', 'records'))
+
+
+class CacheInterner:
+    """
+    Content-addressed storage which lets several cache handlers share
+    identical data, e.g. when sources for different servers, which
+    differ only slightly, are registered side by side. Handlers which
+    are given the same interner store each distinct record once, and
+    assemble each distinct cache object once, thus memory taken by
+    extra source grows with the size of its difference from sources
+    which are already there.
+
+    Cache objects are keyed by their ID, field values and cache objects
+    they refer to, and are held weakly. Records are kept while any
+    handler uses them: handlers register tables with records they
+    have taken, and records which are not in any of them are removed
+    when handler replaces its data or goes away. Attribute layouts
+    are kept while interner is alive.
+
+    Values are considered to be the same only when they are equal and
+    have the same type, thus e.g. 1, 1.0 and True are never merged.
+    Types are compared only when equal value is found, as it's costly.
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        # References to objects keep keys objects are stored under
+        # Format: {entity type: {content key: KeyedRef to cache object}}
+        self.__objects = {entity_type: {} for entity_type in ENTITY_TYPES}
+        # Weak reference callbacks which remove references to dead
+        # objects from dictionaries above
+        self.__object_removers = {
+            entity_type: make_object_remover(objects) for entity_type, objects in self.__objects.items()}
+        # Objects whose keys are equal to keys of objects stored
+        # above, but have values of different types
+        # Format: {entity type: {typed content key: cache object}}
+        self.__typed_objects = {entity_type: WeakValueDictionary() for entity_type in ENTITY_TYPES}
+        # Format: {record: record}
+        self.__records = {}
+        # Records which are equal to records stored above,
+        # but have values of different types
+        # Format: {serialized record: record}
+        self.__typed_records = {}
+        # Record tables of handlers which take records from interner
+        self.__record_tables = WeakSet()
+        # Attribute layouts shared by attribute maps of all handlers
+        # Format: {layout bytes: layout}
+        self.attribute_layouts = {}
+        self.__hits = 0
+        self.__misses = 0
+
+    def get_object(self, entity_type, key, build):
+        """
+        Get cache object with passed content, assembling it if
+        there's none yet.
+
+        Required arguments:
+        entity_type -- types, attributes, effects or modifiers
+        key -- hashable key which describes full content of object;
+        cache objects which are part of it are compared by identity
+        build -- callable which assembles object when it's not found
+
+        Return value:
+        Cache object
+        """
+        with self.__lock:
+            obj = self.__find_object(entity_type, key)
+            if obj is not None:
+                self.__hits += 1
+                return obj
+        # Object is assembled outside of lock, as assembly
+        # requests objects it refers to; if other handler
+        # managed to assemble it meanwhile, its object wins
+        obj = build()
+        with self.__lock:
+            self.__misses += 1
+            existing = self.__find_object(entity_type, key)
+            if existing is not None:
+                return existing
+            objects = self.__objects[entity_type]
+            obj_ref = objects.get(key)
+            # Object with equal key, but different types of values
+            if obj_ref is not None and obj_ref() is not None:
+                self.__typed_objects[entity_type][make_typed_key(key)] = obj
+            else:
+                objects[key] = KeyedRef(obj, self.__object_removers[entity_type], key)
+            return obj
+
+    def __find_object(self, entity_type, key):
+        """
+        Find stored cache object with passed content, or
+        return None if there's none. Should be called with
+        lock acquired.
+        """
+        obj_ref = self.__objects[entity_type].get(key)
+        if obj_ref is None:
+            return None
+        obj = obj_ref()
+        if obj is None:
+            return None
+        if obj_ref.key is key or make_typed_key(obj_ref.key) == make_typed_key(key):
+            return obj
+        return self.__typed_objects[entity_type].get(make_typed_key(key))
+
+    def intern_record(self, record):
+        """
+        Get shared copy of record.
+
+        Required arguments:
+        record -- record, where sequences can be
+        represented by lists or tuples
+
+        Return value:
+        Record with all sequences converted to tuples; it's kept in
+        interner while it's in any of tables registered via
+        track_records()
+        """
+        record = freeze(record)
+        with self.__lock:
+            stored = self.__records.setdefault(record, record)
+            # Equal record is stored already; types of values are
+            # checked only in this case, as it's costly, and unique
+            # records do not need it
+            if stored is not record and serialize(stored) != serialize(record):
+                stored = self.__typed_records.setdefault(serialize(record), record)
+            return stored
+
+    def track_records(self, record_tables):
+        """
+        Register tables with records taken from interner. Tables
+        are referenced weakly.
+
+        Required arguments:
+        record_tables -- RecordTables instance; its tables can be
+        replaced, prune() has to be called after that
+        """
+        with self.__lock:
+            self.__record_tables.add(record_tables)
+
+    def prune(self):
+        """
+        Remove records which are not in any of registered tables.
+        Records which are being interned for tables which haven't
+        been filled yet are removed too, they just aren't shared
+        with records interned later.
+        """
+        with self.__lock:
+            used = set()
+            for record_tables in list(self.__record_tables):
+                for table in record_tables.tables:
+                    used.update(map(id, table.values()))
+            self.__records = {k: v for k, v in self.__records.items() if id(v) in used}
+            self.__typed_records = {k: v for k, v in self.__typed_records.items() if id(v) in used}
+
+    def get_stats(self):
+        """
+        Get interner usage statistics.
+
+        Return value:
+        InternerStats named tuple; hits and misses are counted
+        for cache object requests, objects is amount of alive
+        interned cache objects, records is amount of stored records
+        """
+        with self.__lock:
+            return InternerStats(
+                hits=self.__hits,
+                misses=self.__misses,
+                objects=sum(
+                    # Copy, as dead references are removed without lock
+                    sum(1 for obj_ref in list(objects.values()) if obj_ref() is not None)
+                    for objects in self.__objects.values()
+                ) + sum(len(objects) for objects in self.__typed_objects.values()),
+                records=len(self.__records) + len(self.__typed_records)
+            )
+
+
+def make_object_remover(objects):
+    """
+    Make weak reference callback, which removes reference
+    to garbage-collected object from passed dictionary.
+    """
+    def remove(obj_ref):
+        # Callback can be called at any moment, thus lock is
+        # not used; reference is removed only if it's still there
+        key = obj_ref.key
+        if objects.get(key) is obj_ref:
+            objects.pop(key, None)
+    return remove
+
+
+class RecordTables:
+    """
+    Container for tables of handler which hold records taken from
+    interner. Its tables attribute is list with dictionaries in
+    {record ID: record} format; list is replaced rather than
+    modified, and dictionaries are not modified after they have
+    been added to it.
+    """
+
+    __slots__ = ('tables', '__weakref__')
+
+    def __init__(self):
+        self.tables = []
+
+
+def serialize(record):
+    """
+    Serialize record into bytes, which are equal only for
+    records with equal values of the same types.
+    """
+    # Version 2 doesn't use references to repeated
+    # objects, which would depend on object identity
+    return marshal.dumps(record, 2)
+
+
+def make_typed_key(key):
+    """
+    Convert elements of object key, which do not contain cache
+    objects, into their serialized form, which is equal only for
+    elements with equal values of the same types.
+    """
+    typed_key = []
+    for element in key:
+        try:
+            typed_key.append(serialize(element))
+        # Cache objects are compared by identity
+        except ValueError:
+            typed_key.append(element)
+    return tuple(typed_key)
+
+
+def freeze(value):
+    """Convert lists in passed value to tuples, recursively."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(element) for element in value)
+    return value
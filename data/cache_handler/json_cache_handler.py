@@ -20,53 +20,147 @@
 
 
 import bz2
+import gzip
 import json
+import lzma
 import os.path
+import sys
+from io import TextIOWrapper
 from logging import getLogger
-from weakref import WeakValueDictionary
+from weakref import finalize
 
-from eos.data.cache_object import *
 from eos.util.repr import make_repr_str
-from .abc import BaseCacheHandler
-from .exception import TypeFetchError, AttributeFetchError, EffectFetchError, ModifierFetchError
+from .interner import RecordTables
+from .record_handler import INDEX_NAMES, RecordCacheHandler, make_record_indexes, strip_data
 
 
 logger = getLogger(__name__)
 
 
-class JsonCacheHandler(BaseCacheHandler):
+# Functions which open file through compression codec
+# Format: {codec name: function}
+CODECS = {
+    'none': open,
+    'gzip': gzip.open,
+    'lzma': lzma.open,
+    'bz2': bz2.open
+}
+
+# Leading bytes of files written by compression codecs,
+# uncompressed cache starts with JSON object instead
+# Format: ((magic bytes, codec name), ...)
+CODEC_MAGICS = (
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'lzma'),
+    (b'\x1f\x8b', 'gzip')
+)
+
+# Cache body consists of header line, which is JSON object with
+# format name and fingerprint, and lines with single record each,
+# which are JSON arrays [entity type, record ID, record]
+LINES_FORMAT = 'lines'
+
+
+class JsonCacheHandler(RecordCacheHandler):
     """
     This cache handler implements on-disk cache store in the form
-    of compressed JSON. To improve performance further, it also
-    keeps loads data from on-disk cache to memory, and uses weakref
-    object cache for assembled objects.
+    of compressed JSON, one record per line, so that it's parsed while
+    it's being decompressed. This keeps peak memory usage low at the
+    cost of load time, as parsing many small JSON documents is slower
+    than parsing a single big one. Compression codec used for writing
+    cache is configurable, reading detects it. To improve performance
+    further, handler keeps data loaded from on-disk cache in memory,
+    and uses two-tier object cache for assembled objects. Fingerprint
+    and record counts are also written into small uncompressed
+    metadata file next to cache, so that they can be checked without
+    loading the cache body, which is deferred until data is requested
+    for the first time. Metadata also has size and modification time
+    of the body, and is ignored if body has been replaced; body which
+    doesn't match its metadata once loaded is not used, and handler
+    reports no fingerprint for it.
 
     Required arguments:
     cache_path -- file name where on-disk cache will be stored (.json.bz2)
+
+    Optional arguments:
+    object_cache_size -- amount of most recently used objects of each
+    kind kept alive by object cache, see RecordCacheHandler
+    codec -- name of compression codec used for writing cache: none,
+    gzip, lzma or bz2 (default)
+    interner -- CacheInterner, through which records and cache
+    objects are shared with other handlers which use it
     """
 
-    def __init__(self, cache_path):
+    def __init__(self, cache_path, object_cache_size=0, codec='bz2', interner=None):
+        super().__init__(object_cache_size, interner)
+        if codec not in CODECS:
+            raise ValueError('unknown codec {}'.format(codec))
         self._cache_path = cache_path
+        self._codec = codec
+        self.__interner = interner
+        # Tables with records taken from interner, they're released
+        # when data is replaced or handler is garbage-collected
+        self.__interned_tables = RecordTables()
+        if interner is not None:
+            interner.track_records(self.__interned_tables)
+            finalize(self, release_tables, interner, self.__interned_tables)
+        # Small uncompressed file with fingerprint and record counts,
+        # which is stored alongside with cache
+        self._meta_path = '{}.meta'.format(cache_path)
         # Initialize memory data cache
         self.__type_data_cache = {}
         self.__attribute_data_cache = {}
         self.__effect_data_cache = {}
         self.__modifier_data_cache = {}
+        # Format: {index name: {key: type IDs}}
+        self.__index_data_cache = {}
         self.__fingerprint = None
-        # Initialize weakref object cache
-        self.__type_obj_cache = WeakValueDictionary()
-        self.__attribute_obj_cache = WeakValueDictionary()
-        self.__effect_obj_cache = WeakValueDictionary()
-        self.__modifier_obj_cache = WeakValueDictionary()
+        self.__record_counts = None
+        # Body of cache is loaded only when data is requested
+        # for the first time, this flag tells if it's still needed
+        self.__load_pending = False
 
         # If cache doesn't exist, silently finish initialization
         if not os.path.exists(self._cache_path):
             return
+        self.__load_pending = True
+        # Take fingerprint from metadata file, if it's available;
+        # otherwise, it will be taken from cache body
+        try:
+            with open(self._meta_path, mode='r', encoding='utf-8') as file:
+                meta = json.load(file)
+            fingerprint = meta['fingerprint']
+            record_counts = meta['counts']
+            body_stamp = meta['body']
+        except KeyboardInterrupt:
+            raise
+        except:
+            pass
+        else:
+            # Metadata is trusted only when it has been written
+            # for cache body which is next to it
+            if body_stamp == get_body_stamp(self._cache_path):
+                self.__fingerprint = fingerprint
+                self.__record_counts = record_counts
+
+    def __load(self):
+        """Load body of on-disk cache into memory."""
+        with self._lock:
+            # Other thread could have loaded it meanwhile
+            if not self.__load_pending:
+                return
+            try:
+                self.__load_body()
+            # Flag is cleared only when loading is over, as records
+            # are read without lock as long as it's not set
+            finally:
+                self.__load_pending = False
+
+    def __load_body(self):
+        """Read body of on-disk cache, called with lock held."""
         # Read JSON into local variable
         try:
-            with bz2.BZ2File(self._cache_path, 'r') as file:
-                json_data = file.read().decode('utf-8')
-                data = json.loads(json_data)
+            data = read_json_cache(self._cache_path)
         except KeyboardInterrupt:
             raise
         # If file doesn't exist, JSON load errors occur, or
@@ -75,204 +169,115 @@ class JsonCacheHandler(BaseCacheHandler):
         except:
             msg = 'error during reading cache'
             logger.error(msg)
+            # Metadata doesn't describe anything we have anymore
+            self.__fingerprint = None
+            self.__record_counts = None
         # Load data into data cache, if no errors occurred
         # during JSON reading/parsing
         else:
-            self.__update_mem_cache(data)
+            # If body doesn't match metadata, fingerprint which
+            # has been provided is wrong; such cache is not used,
+            # and no fingerprint makes sure it's regenerated
+            if self.__record_counts is not None and (
+                self.__fingerprint != data['fingerprint'] or
+                self.__record_counts != get_record_counts(data)
+            ):
+                msg = 'cache body does not match its metadata'
+                logger.warning(msg)
+                self.__fingerprint = None
+                self.__record_counts = None
+            else:
+                self.__update_mem_cache(data)
 
-    def get_type(self, type_id):
-        try:
-            type_id = int(type_id)
-        except TypeError as e:
-            raise TypeFetchError(type_id) from e
-        try:
-            type_ = self.__type_obj_cache[type_id]
-        except KeyError:
-            # We do str(int(id)) here because JSON dictionaries
-            # always have strings as key
-            json_type_id = str(type_id)
-            try:
-                type_data = self.__type_data_cache[json_type_id]
-            except KeyError as e:
-                raise TypeFetchError(type_id) from e
-            type_ = Type(
-                type_id=type_id,
-                group=type_data[0],
-                category=type_data[1],
-                attributes={attr_id: attr_val for attr_id, attr_val in type_data[2]},
-                effects=tuple(self.get_effect(effect_id) for effect_id in type_data[3]),
-                default_effect=None if type_data[4] is None else self.get_effect(type_data[4])
-            )
-            self.__type_obj_cache[type_id] = type_
-        return type_
-
-    def get_attribute(self, attr_id):
-        try:
-            attr_id = int(attr_id)
-        except TypeError as e:
-            raise AttributeFetchError(attr_id) from e
-        try:
-            attribute = self.__attribute_obj_cache[attr_id]
-        except KeyError:
-            json_attr_id = str(attr_id)
-            try:
-                attr_data = self.__attribute_data_cache[json_attr_id]
-            except KeyError as e:
-                raise AttributeFetchError(attr_id) from e
-            attribute = Attribute(
-                attribute_id=attr_id,
-                max_attribute=attr_data[0],
-                default_value=attr_data[1],
-                high_is_good=attr_data[2],
-                stackable=attr_data[3]
-            )
-            self.__attribute_obj_cache[attr_id] = attribute
-        return attribute
-
-    def get_effect(self, effect_id):
-        try:
-            effect_id = int(effect_id)
-        except TypeError as e:
-            raise EffectFetchError(effect_id) from e
-        try:
-            effect = self.__effect_obj_cache[effect_id]
-        except KeyError:
-            json_effect_id = str(effect_id)
-            try:
-                effect_data = self.__effect_data_cache[json_effect_id]
-            except KeyError as e:
-                raise EffectFetchError(effect_id) from e
-            effect = Effect(
-                effect_id=effect_id,
-                category=effect_data[0],
-                is_offensive=effect_data[1],
-                is_assistance=effect_data[2],
-                duration_attribute=effect_data[3],
-                discharge_attribute=effect_data[4],
-                range_attribute=effect_data[5],
-                falloff_attribute=effect_data[6],
-                tracking_speed_attribute=effect_data[7],
-                fitting_usage_chance_attribute=effect_data[8],
-                build_status=effect_data[9],
-                modifiers=tuple(self.get_modifier(modifier_id) for modifier_id in effect_data[10])
-            )
-            self.__effect_obj_cache[effect_id] = effect
-        return effect
-
-    def get_modifier(self, modifier_id):
-        try:
-            modifier_id = int(modifier_id)
-        except TypeError as e:
-            raise ModifierFetchError(modifier_id) from e
-        try:
-            modifier = self.__modifier_obj_cache[modifier_id]
-        except KeyError:
-            json_modifier_id = str(modifier_id)
-            try:
-                modifier_data = self.__modifier_data_cache[json_modifier_id]
-            except KeyError as e:
-                raise ModifierFetchError(modifier_id) from e
-            modifier = Modifier(
-                modifier_id=modifier_id,
-                state=modifier_data[0],
-                scope=modifier_data[1],
-                src_attr=modifier_data[2],
-                operator=modifier_data[3],
-                tgt_attr=modifier_data[4],
-                domain=modifier_data[5],
-                filter_type=modifier_data[6],
-                filter_value=modifier_data[7]
-            )
-            self.__modifier_obj_cache[modifier_id] = modifier
-        return modifier
+    def _get_type_ids(self):
+        if self.__load_pending:
+            self.__load()
+        return (int(type_id) for type_id in self.__type_data_cache)
+
+    # We do str(int(id)) in record getters because JSON
+    # dictionaries always have strings as key
+    def _get_type_record(self, type_id):
+        if self.__load_pending:
+            self.__load()
+        return self.__type_data_cache[str(type_id)]
+
+    def _get_index_record(self, index_name, key):
+        if self.__load_pending:
+            self.__load()
+        return self.__index_data_cache[index_name][str(key)]
+
+    def _get_attribute_record(self, attr_id):
+        if self.__load_pending:
+            self.__load()
+        return self.__attribute_data_cache[str(attr_id)]
+
+    def _get_effect_record(self, effect_id):
+        if self.__load_pending:
+            self.__load()
+        return self.__effect_data_cache[str(effect_id)]
+
+    def _get_modifier_record(self, modifier_id):
+        if self.__load_pending:
+            self.__load()
+        return self.__modifier_data_cache[str(modifier_id)]
 
     def get_fingerprint(self):
-        return self.__fingerprint
+        # Fields are changed together by loading and
+        # updating, thus they are read under lock
+        with self._lock:
+            # Cache without metadata file has fingerprint
+            # only in its body
+            if self.__load_pending and self.__record_counts is None:
+                self.__load()
+            return self.__fingerprint
+
+    def get_record_counts(self):
+        """
+        Get amount of records stored in cache.
+
+        Return value:
+        Dictionary in {entity type: record count} format
+        """
+        with self._lock:
+            if self.__load_pending and self.__record_counts is None:
+                self.__load()
+            return dict(self.__record_counts or {})
 
     def update_cache(self, data, fingerprint):
-        # Make light version of data and add fingerprint
-        # to it
-        data = self.__strip_data(data)
-        data['fingerprint'] = fingerprint
-        # Update disk cache
+        # Make light version of data
+        slim_data = strip_data(data)
+        # Update disk cache; metadata is removed before writing
+        # body and written after it, thus it's never left
+        # describing some other body
         cache_folder = os.path.dirname(self._cache_path)
         if os.path.isdir(cache_folder) is not True:
             os.makedirs(cache_folder, mode=0o755)
-        with bz2.BZ2File(self._cache_path, 'w') as file:
-            json_data = json.dumps(data)
-            file.write(json_data.encode('utf-8'))
-        # Update data cache; encode to JSON and decode back
-        # to make sure form of data is the same as after
+        if os.path.exists(self._meta_path):
+            os.remove(self._meta_path)
+        # Data cache is filled with records decoded back from
+        # JSON, to make sure form of data is the same as after
         # loading it from cache (e.g. dictionary keys are
         # stored as strings in JSON)
-        data = json.loads(json_data)
+        data = {'fingerprint': fingerprint}
+        with CODECS[self._codec](self._cache_path, 'wt', encoding='utf-8') as file:
+            file.write(json.dumps({'format': LINES_FORMAT, 'fingerprint': fingerprint}))
+            file.write('\n')
+            for table_name, table in slim_data.items():
+                table_data = data[table_name] = {}
+                for record_id, record in table.items():
+                    line = json.dumps([table_name, str(record_id), record])
+                    file.write(line)
+                    file.write('\n')
+                    table_data[str(record_id)] = json.loads(line)[2]
+        meta = {
+            'fingerprint': fingerprint,
+            'counts': get_record_counts(data),
+            'body': get_body_stamp(self._cache_path)
+        }
+        with open(self._meta_path, mode='w', encoding='utf-8') as file:
+            json.dump(meta, file)
         self.__update_mem_cache(data)
 
-    def __strip_data(self, data):
-        """
-        Rework passed data, keying it and stripping dictionary
-        keys from rows for performance.
-        """
-        slim_data = {}
-
-        slim_types = {}
-        for type_row in data['types']:
-            type_id = type_row['type_id']
-            slim_types[type_id] = (
-                type_row['group'],
-                type_row['category'],
-                tuple(type_row['attributes'].items()),  # Dictionary -> tuple
-                tuple(type_row['effects']),  # List -> tuple
-                type_row['default_effect']
-            )
-        slim_data['types'] = slim_types
-
-        slim_attribs = {}
-        for attr_row in data['attributes']:
-            attribute_id = attr_row['attribute_id']
-            slim_attribs[attribute_id] = (
-                attr_row['max_attribute'],
-                attr_row['default_value'],
-                attr_row['high_is_good'],
-                attr_row['stackable']
-            )
-        slim_data['attributes'] = slim_attribs
-
-        slim_effects = {}
-        for effect_row in data['effects']:
-            effect_id = effect_row['effect_id']
-            slim_effects[effect_id] = (
-                effect_row['effect_category'],
-                effect_row['is_offensive'],
-                effect_row['is_assistance'],
-                effect_row['duration_attribute'],
-                effect_row['discharge_attribute'],
-                effect_row['range_attribute'],
-                effect_row['falloff_attribute'],
-                effect_row['tracking_speed_attribute'],
-                effect_row['fitting_usage_chance_attribute'],
-                effect_row['build_status'],
-                tuple(effect_row['modifiers'])  # List -> tuple
-            )
-        slim_data['effects'] = slim_effects
-
-        slim_modifiers = {}
-        for modifier_row in data['modifiers']:
-            modifier_id = modifier_row['modifier_id']
-            slim_modifiers[modifier_id] = (
-                modifier_row['state'],
-                modifier_row['scope'],
-                modifier_row['src_attr'],
-                modifier_row['operator'],
-                modifier_row['tgt_attr'],
-                modifier_row['domain'],
-                modifier_row['filter_type'],
-                modifier_row['filter_value']
-            )
-        slim_data['modifiers'] = slim_modifiers
-
-        return slim_data
-
     def __update_mem_cache(self, data):
         """
         Loads data into memory data cache.
@@ -280,18 +285,143 @@ class JsonCacheHandler(BaseCacheHandler):
         Required arguments:
         data -- dictionary with data to load
         """
-        self.__type_data_cache = data['types']
-        self.__attribute_data_cache = data['attributes']
-        self.__effect_data_cache = data['effects']
-        self.__modifier_data_cache = data['modifiers']
-        self.__fingerprint = data['fingerprint']
-        # Also clear object cache to make sure objects composed
-        # from old data are gone
-        self.__type_obj_cache.clear()
-        self.__attribute_obj_cache.clear()
-        self.__effect_obj_cache.clear()
-        self.__modifier_obj_cache.clear()
+        intern_table = self.__intern_table
+        type_data = intern_table(data['types'])
+        attribute_data = intern_table(data['attributes'])
+        effect_data = intern_table(data['effects'])
+        modifier_data = intern_table(data['modifiers'])
+        # Caches written by older versions of Eos have no indexes,
+        # they're rebuilt out of types in the form JSON gives them
+        if not all(index_name in data for index_name in INDEX_NAMES):
+            data = dict(data)
+            for index_name, index in make_record_indexes(data['types']).items():
+                data[index_name] = {str(key): list(type_ids) for key, type_ids in index.items()}
+        index_data = {index_name: intern_table(data[index_name]) for index_name in INDEX_NAMES}
+        record_counts = get_record_counts(data)
+        new_tables = [type_data, attribute_data, effect_data, modifier_data] + list(index_data.values())
+        # Data is replaced at once, getters read records which
+        # were being read meanwhile again
+        with self._lock:
+            self.__type_data_cache = type_data
+            self.__attribute_data_cache = attribute_data
+            self.__effect_data_cache = effect_data
+            self.__modifier_data_cache = modifier_data
+            self.__index_data_cache = index_data
+            self.__fingerprint = data['fingerprint']
+            self.__record_counts = record_counts
+            self.__load_pending = False
+            self._clear_object_cache()
+            if self.__interner is not None:
+                self.__interned_tables.tables = new_tables
+        # Records of old data are not needed anymore,
+        # unless other handlers use them
+        if self.__interner is not None:
+            self.__interner.prune()
+
+    def __intern_table(self, table):
+        """Replace records of table with ones shared via interner."""
+        interner = self.__interner
+        if interner is None:
+            return table
+        intern_record = interner.intern_record
+        return {sys.intern(record_id): intern_record(record) for record_id, record in table.items()}
 
     def __repr__(self):
-        spec = [['cache_path', '_cache_path']]
+        spec = [['cache_path', '_cache_path'], ['codec', '_codec']]
         return make_repr_str(self, spec)
+
+
+def release_tables(interner, record_tables):
+    """
+    Release records of tables which have been taken from interner.
+
+    Required arguments:
+    interner -- CacheInterner records have been taken from
+    record_tables -- RecordTables with tables to release
+    """
+    record_tables.tables = []
+    interner.prune()
+
+
+def get_body_stamp(cache_path):
+    """
+    Get stamp of cache body, which changes when body is replaced.
+
+    Required arguments:
+    cache_path -- path to cache file
+
+    Return value:
+    Dictionary with size and modification time of file
+    """
+    stat = os.stat(cache_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_json_cache(cache_path):
+    """
+    Read on-disk JSON cache.
+
+    Required arguments:
+    cache_path -- path to cache file
+
+    Return value:
+    Dictionary with slim data and fingerprint, keyed by
+    strings, as JSON stores them
+    """
+    with open(cache_path, 'rb') as file:
+        magic = file.read(8)
+    codec = 'none'
+    for codec_magic, codec_name in CODEC_MAGICS:
+        if magic.startswith(codec_magic):
+            codec = codec_name
+            break
+    with CODECS[codec](cache_path, 'rb') as file:
+        lines = TextIOWrapper(file, encoding='utf-8')
+        header = json.loads(lines.readline())
+        # Caches written before line format was introduced
+        # contain whole data as single JSON object
+        if header.get('format') != LINES_FORMAT:
+            return header
+        data = {'fingerprint': header['fingerprint']}
+        for table_name in ('types', 'attributes', 'effects', 'modifiers'):
+            data[table_name] = {}
+        # Lines are parsed in batches, as parsing each line separately
+        # has noticeable overhead, while memory taken by batch is small
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= 1000:
+                load_record_lines(batch, data)
+                batch.clear()
+        load_record_lines(batch, data)
+        return data
+
+
+def load_record_lines(lines, data):
+    """
+    Parse record lines of cache body.
+
+    Required arguments:
+    lines -- list with lines
+    data -- dictionary with slim data, where records are put
+    """
+    if not lines:
+        return
+    for table_name, record_id, record in json.loads('[{}]'.format(','.join(lines))):
+        data.setdefault(table_name, {})[record_id] = record
+
+
+def get_record_counts(data):
+    """
+    Count records in slim data.
+
+    Required arguments:
+    data -- dictionary with slim data
+
+    Return value:
+    Dictionary in {entity type: record count} format
+    """
+    return {
+        table_name: len(data[table_name])
+        for table_name in ('types', 'attributes', 'effects', 'modifiers')
+    }
@@ -0,0 +1,159 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from collections import OrderedDict, deque, namedtuple
+from weakref import WeakValueDictionary
+
+
+ObjectCacheStats = namedtuple('ObjectCacheStats', ('hits', 'misses', 'evictions', 'build_time', 'size'))
+
+
+class ObjectCache:
+    """
+    Two-tier storage for assembled cache objects. All objects are
+    kept in weakref tier, thus the same object is returned while
+    anything references it; optionally, most recently used objects
+    are also kept alive by bounded strong LRU tier, so that hot
+    objects are not rebuilt when last fit referencing them is gone.
+
+    get() doesn't modify tiers, thus it can be called without locking
+    concurrently with other methods; recency of objects it returns is
+    recorded in small buffer, and strong tier is updated from it when
+    object is added. Other methods should not be called concurrently.
+    Under concurrent access, hit and miss counters are approximate.
+
+    Optional arguments:
+    strong_size -- max amount of objects strong tier keeps alive,
+    0 disables it
+    """
+
+    def __init__(self, strong_size=0):
+        self.__weak = WeakValueDictionary()
+        self.__strong = OrderedDict()
+        self.__strong_size = strong_size
+        # Objects returned by get(), which are yet to be marked
+        # as recently used in strong tier
+        # Format: (key, object)
+        self.__recent = deque(maxlen=max(strong_size, 1))
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__build_time = 0.0
+
+    def get(self, key):
+        """
+        Get object from cache.
+
+        Required arguments:
+        key -- key of object
+
+        Return value:
+        Cached object
+
+        Possible exceptions:
+        KeyError -- raised when object is not in cache
+        """
+        try:
+            obj = self.__weak[key]
+        except KeyError:
+            self.__misses += 1
+            raise
+        self.__hits += 1
+        if self.__strong_size > 0:
+            self.__recent.append((key, obj))
+        return obj
+
+    def peek(self, key):
+        """
+        Get object from cache, without updating counters
+        and recency of object.
+
+        Required arguments:
+        key -- key of object
+
+        Return value:
+        Cached object
+
+        Possible exceptions:
+        KeyError -- raised when object is not in cache
+        """
+        return self.__weak[key]
+
+    def add(self, key, obj, build_time):
+        """
+        Put object into cache.
+
+        Required arguments:
+        key -- key of object
+        obj -- object to store
+        build_time -- time it took to assemble object, in seconds
+        """
+        self.__apply_recent()
+        self.__weak[key] = obj
+        self.__build_time += build_time
+        self.__keep(key, obj)
+
+    def clear(self):
+        """Remove all objects from cache, keeping statistics."""
+        self.__recent.clear()
+        self.__weak.clear()
+        self.__strong.clear()
+
+    def get_stats(self):
+        """
+        Get cache usage statistics.
+
+        Return value:
+        ObjectCacheStats named tuple; build time is total
+        time spent on assembling objects on cache misses
+        (in seconds), size is amount of objects in strong tier
+        """
+        return ObjectCacheStats(
+            hits=self.__hits,
+            misses=self.__misses,
+            evictions=self.__evictions,
+            build_time=self.__build_time,
+            size=len(self.__strong)
+        )
+
+    def __apply_recent(self):
+        """Mark objects returned by get() as recently used."""
+        recent = self.__recent
+        while True:
+            try:
+                key, obj = recent.popleft()
+            except IndexError:
+                return
+            # Object could be removed from cache meanwhile
+            if self.__weak.get(key) is obj:
+                self.__keep(key, obj)
+
+    def __keep(self, key, obj):
+        strong = self.__strong
+        if self.__strong_size <= 0:
+            return
+        if key in strong:
+            strong.move_to_end(key)
+            return
+        strong[key] = obj
+        if len(strong) > self.__strong_size:
+            strong.popitem(last=False)
+            self.__evictions += 1
@@ -0,0 +1,619 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock
+from time import perf_counter
+
+from eos.data.cache_object import *
+from eos.data.cache_object.attribute_map import compose_attribute_map
+from .abc import BaseCacheHandler
+from .exception import TypeFetchError, AttributeFetchError, EffectFetchError, ModifierFetchError
+from .object_cache import ObjectCache
+
+
+class RecordCacheHandler(BaseCacheHandler):
+    """
+    Base class for cache handlers which keep data as slim records
+    (tuples with field values, see strip_data() for their layout)
+    and assemble cache objects out of them on demand. Assembled
+    objects are stored in object cache, see ObjectCache.
+
+    Child classes have to provide record getters, which return
+    record for passed ID or raise KeyError if there's no such
+    record. Record getters are called both with and without lock
+    held, thus they have to be safe to call while data is being
+    replaced; child classes have to replace their data under the
+    lock, clearing object cache before releasing it.
+
+    Handlers are thread-safe: getters take objects which are in
+    object cache and read records without locking, while objects
+    are assembled and data is replaced under lock. Records read
+    while data was being replaced are read again under lock, thus
+    objects are never composed out of records of different data,
+    and once cache update is finished, getters return only objects
+    of new data.
+
+    Optional arguments:
+    object_cache_size -- amount of most recently used objects of
+    each kind which are kept alive even when nothing references
+    them, 0 disables it
+    interner -- CacheInterner, which lets handlers share identical
+    cache objects; if passed, records have to be hashable
+    """
+
+    def __init__(self, object_cache_size=0, interner=None):
+        # Guards building of objects and clearing of object cache;
+        # child classes replace their data under it too. Reentrant,
+        # as assembling an object involves fetching objects it
+        # refers to
+        self._lock = RLock()
+        # Incremented whenever data is replaced, tells records read
+        # without locking if they might belong to old data
+        self.__generation = 0
+        # Types kept alive by warm()
+        # Format: {type ID: type}
+        self.__warmed_types = {}
+        self.__type_obj_cache = ObjectCache(object_cache_size)
+        self.__attribute_obj_cache = ObjectCache(object_cache_size)
+        self.__effect_obj_cache = ObjectCache(object_cache_size)
+        self.__modifier_obj_cache = ObjectCache(object_cache_size)
+        self.__interner = interner
+        # Attribute layouts shared by attribute maps of types
+        # Format: {layout bytes: layout}
+        if interner is None:
+            self.__attribute_layouts = {}
+        else:
+            self.__attribute_layouts = interner.attribute_layouts
+        # Modifier tuples, shared by effects with the same modifiers;
+        # modifiers are small and few, thus keeping them alive here
+        # until object cache is cleared is cheap
+        # Format: {modifier IDs: tuple with modifiers}
+        self.__modifier_tuples = {}
+
+    @abstractmethod
+    def _get_type_ids(self):
+        """Return iterable with IDs of all types."""
+        ...
+
+    @abstractmethod
+    def _get_type_record(self, type_id):
+        ...
+
+    @abstractmethod
+    def _get_index_record(self, index_name, key):
+        """
+        Return tuple with type IDs stored in reverse index
+        against passed key, or raise KeyError if there's none.
+        """
+        ...
+
+    @abstractmethod
+    def _get_attribute_record(self, attr_id):
+        ...
+
+    @abstractmethod
+    def _get_effect_record(self, effect_id):
+        ...
+
+    @abstractmethod
+    def _get_modifier_record(self, modifier_id):
+        ...
+
+    def get_type(self, type_id):
+        try:
+            type_id = int(type_id)
+        except TypeError as e:
+            raise TypeFetchError(type_id) from e
+
+        def read():
+            type_data = self._get_type_record(type_id)
+            effects = tuple(self.get_effect(effect_id) for effect_id in type_data[3])
+            default_effect = None if type_data[4] is None else self.get_effect(type_data[4])
+            return type_data, effects, default_effect
+
+        def assemble(parts):
+            type_data, effects, default_effect = parts
+            return self.__assemble(
+                'types',
+                (type_id, type_data[0], type_data[1], type_data[2], effects, default_effect),
+                lambda: Type(
+                    type_id=type_id,
+                    group=type_data[0],
+                    category=type_data[1],
+                    attributes=compose_attribute_map(type_data[2], self.__attribute_layouts),
+                    effects=effects,
+                    default_effect=default_effect
+                )
+            )
+
+        try:
+            return self.__fetch(self.__type_obj_cache, type_id, read, assemble)
+        except KeyError as e:
+            raise TypeFetchError(type_id) from e
+
+    def get_types(self, type_ids):
+        # Each type is looked up only once
+        fetched = {}
+        types = []
+        for type_id in type_ids:
+            try:
+                type_ = fetched[type_id]
+            except KeyError:
+                type_ = fetched[type_id] = self.get_type(type_id)
+            types.append(type_)
+        return types
+
+    def get_type_ids(self):
+        """
+        Get IDs of all types cache handler has.
+
+        Return value:
+        Tuple with type IDs
+        """
+        with self._lock:
+            return tuple(self._get_type_ids())
+
+    def get_group_type_ids(self, group_id):
+        """
+        Get IDs of types which belong to group.
+
+        Required arguments:
+        group_id -- ID of group
+
+        Return value:
+        Tuple with type IDs, in ascending order
+        """
+        return self.__get_index_entry('group_types', group_id)
+
+    def get_category_type_ids(self, category_id):
+        """
+        Get IDs of types which belong to category.
+
+        Required arguments:
+        category_id -- ID of category
+
+        Return value:
+        Tuple with type IDs, in ascending order
+        """
+        return self.__get_index_entry('category_types', category_id)
+
+    def get_attribute_type_ids(self, attr_id):
+        """
+        Get IDs of types which have base value of attribute.
+
+        Required arguments:
+        attr_id -- ID of attribute
+
+        Return value:
+        Tuple with type IDs, in ascending order
+        """
+        return self.__get_index_entry('attribute_types', attr_id)
+
+    def get_effect_type_ids(self, effect_id):
+        """
+        Get IDs of types which have effect.
+
+        Required arguments:
+        effect_id -- ID of effect
+
+        Return value:
+        Tuple with type IDs, in ascending order
+        """
+        return self.__get_index_entry('effect_types', effect_id)
+
+    def __get_index_entry(self, index_name, key):
+        try:
+            key = int(key)
+        except TypeError:
+            return ()
+        with self._lock:
+            try:
+                return tuple(self._get_index_record(index_name, key))
+            except KeyError:
+                return ()
+
+    def warm(self, type_ids=None, threads=1, progress=None):
+        """
+        Assemble types and everything they refer to up front, and keep
+        them alive until object cache is cleared or unwarm() is called,
+        so that first requests which need them do not pay for assembly.
+
+        Optional arguments:
+        type_ids -- iterable with IDs of types to assemble; if None,
+        all types are assembled
+        threads -- amount of threads which assemble types; records
+        are read without locking, while only publishing assembled
+        objects is serialized, thus it helps mostly when reading
+        records is blocking (e.g. cache pages are read from disk)
+        progress -- callable, which is called with amount of processed
+        types and total amount of types after each batch of types
+
+        Return value:
+        Amount of assembled types
+
+        Possible exceptions:
+        TypeFetchError -- raised when any of requested types is missing
+        """
+        if type_ids is None:
+            type_ids = self.get_type_ids()
+        # Remove duplicates, keeping order
+        type_ids = tuple(dict.fromkeys(type_ids))
+        batch_size = 500
+        batches = [type_ids[i:i + batch_size] for i in range(0, len(type_ids), batch_size)]
+        done = 0
+
+        def warm_batch(batch):
+            types = self.get_types(batch)
+            with self._lock:
+                self.__warmed_types.update((type_.id, type_) for type_ in types)
+            return len(batch)
+
+        with ThreadPoolExecutor(max_workers=max(threads, 1)) as executor:
+            for batch_amount in executor.map(warm_batch, batches):
+                done += batch_amount
+                if progress is not None:
+                    progress(done, len(type_ids))
+        return len(type_ids)
+
+    def unwarm(self):
+        """Stop keeping alive types assembled by warm()."""
+        with self._lock:
+            self.__warmed_types.clear()
+
+    def get_attribute(self, attr_id):
+        try:
+            attr_id = int(attr_id)
+        except TypeError as e:
+            raise AttributeFetchError(attr_id) from e
+
+        def read():
+            return self._get_attribute_record(attr_id)
+
+        def assemble(attr_data):
+            return self.__assemble(
+                'attributes',
+                (attr_id, attr_data),
+                lambda: Attribute(
+                    attribute_id=attr_id,
+                    max_attribute=attr_data[0],
+                    default_value=attr_data[1],
+                    high_is_good=attr_data[2],
+                    stackable=attr_data[3]
+                )
+            )
+
+        try:
+            return self.__fetch(self.__attribute_obj_cache, attr_id, read, assemble)
+        except KeyError as e:
+            raise AttributeFetchError(attr_id) from e
+
+    def get_effect(self, effect_id):
+        try:
+            effect_id = int(effect_id)
+        except TypeError as e:
+            raise EffectFetchError(effect_id) from e
+
+        def read():
+            effect_data = self._get_effect_record(effect_id)
+            modifier_ids = tuple(effect_data[10])
+            try:
+                modifiers = self.__modifier_tuples[modifier_ids]
+            except KeyError:
+                modifiers = tuple(self.get_modifier(modifier_id) for modifier_id in modifier_ids)
+            return effect_data, modifier_ids, modifiers
+
+        def assemble(parts):
+            effect_data, modifier_ids, modifiers = parts
+            # Effects with the same modifiers share modifier tuple
+            modifiers = self.__modifier_tuples.setdefault(modifier_ids, modifiers)
+            return self.__assemble(
+                'effects',
+                (effect_id, effect_data[:10], modifiers),
+                lambda: Effect(
+                    effect_id=effect_id,
+                    category=effect_data[0],
+                    is_offensive=effect_data[1],
+                    is_assistance=effect_data[2],
+                    duration_attribute=effect_data[3],
+                    discharge_attribute=effect_data[4],
+                    range_attribute=effect_data[5],
+                    falloff_attribute=effect_data[6],
+                    tracking_speed_attribute=effect_data[7],
+                    fitting_usage_chance_attribute=effect_data[8],
+                    build_status=effect_data[9],
+                    modifiers=modifiers
+                )
+            )
+
+        try:
+            return self.__fetch(self.__effect_obj_cache, effect_id, read, assemble)
+        except KeyError as e:
+            raise EffectFetchError(effect_id) from e
+
+    def get_modifier(self, modifier_id):
+        try:
+            modifier_id = int(modifier_id)
+        except TypeError as e:
+            raise ModifierFetchError(modifier_id) from e
+
+        def read():
+            return self._get_modifier_record(modifier_id)
+
+        def assemble(modifier_data):
+            return self.__assemble(
+                'modifiers',
+                (modifier_id, modifier_data),
+                lambda: Modifier(
+                    modifier_id=modifier_id,
+                    state=modifier_data[0],
+                    scope=modifier_data[1],
+                    src_attr=modifier_data[2],
+                    operator=modifier_data[3],
+                    tgt_attr=modifier_data[4],
+                    domain=modifier_data[5],
+                    filter_type=modifier_data[6],
+                    filter_value=modifier_data[7]
+                )
+            )
+
+        try:
+            return self.__fetch(self.__modifier_obj_cache, modifier_id, read, assemble)
+        except KeyError as e:
+            raise ModifierFetchError(modifier_id) from e
+
+    def __fetch(self, obj_cache, key, read, assemble):
+        """
+        Take object from object cache, or build it and add it there.
+
+        Objects which are in object cache are returned without locking.
+        Records of other objects are read, and objects they refer to are
+        fetched, without locking too, so that threads which wait for
+        records (e.g. cache pages read from disk) do not block each
+        other; lock is taken only to assemble object and publish it.
+        If data has been replaced while records were being read, they
+        are read again under lock, thus objects are never composed out
+        of records of different data.
+
+        Required arguments:
+        obj_cache -- object cache of requested kind of objects
+        key -- ID of requested object
+        read -- callable which reads records needed to assemble object
+        and fetches objects it refers to
+        assemble -- callable which assembles object out of what read
+        returned; called with lock held
+
+        Return value:
+        Requested object
+
+        Possible exceptions:
+        KeyError -- raised when there's no record for requested object
+        or any of objects it refers to
+        """
+        try:
+            return obj_cache.get(key)
+        except KeyError:
+            pass
+        start = perf_counter()
+        generation = self.__generation
+        try:
+            parts = read()
+        # Missing record, possibly because data has been replaced
+        # while records were being read; the definitive answer
+        # is given by reading records again under lock
+        except KeyError:
+            parts = None
+        with self._lock:
+            # Other thread could have published it meanwhile
+            try:
+                return obj_cache.peek(key)
+            except KeyError:
+                pass
+            if parts is None or generation != self.__generation:
+                parts = read()
+            obj = assemble(parts)
+            obj_cache.add(key, obj, perf_counter() - start)
+            return obj
+
+    def __assemble(self, entity_type, key, build):
+        """
+        Assemble cache object, or take identical one
+        from interner if handler has it.
+        """
+        if self.__interner is None:
+            return build()
+        return self.__interner.get_object(entity_type, key, build)
+
+    def get_object_cache_stats(self):
+        """
+        Get usage statistics of object cache.
+
+        Return value:
+        Dictionary in {entity type: ObjectCacheStats} format.
+        Build time of types and effects includes time spent
+        on building objects they refer to
+        """
+        return {
+            'types': self.__type_obj_cache.get_stats(),
+            'attributes': self.__attribute_obj_cache.get_stats(),
+            'effects': self.__effect_obj_cache.get_stats(),
+            'modifiers': self.__modifier_obj_cache.get_stats()
+        }
+
+    def _clear_object_cache(self):
+        """
+        Clear object cache to make sure objects composed
+        from old data are gone.
+        """
+        with self._lock:
+            self.__type_obj_cache.clear()
+            self.__attribute_obj_cache.clear()
+            self.__effect_obj_cache.clear()
+            self.__modifier_obj_cache.clear()
+            # Layouts shared via interner may be used by other handlers
+            if self.__interner is None:
+                self.__attribute_layouts.clear()
+            self.__modifier_tuples.clear()
+            self.__warmed_types.clear()
+            # Bumped only once everything is cleared, so that reads which
+            # start with new generation can't get objects of old data
+            self.__generation += 1
+
+
+def strip_data(data):
+    """
+    Rework passed data, keying it and stripping dictionary
+    keys from rows for performance.
+
+    Required arguments:
+    data -- data in format cache generator returns it
+
+    Return value:
+    Dictionary in {entity type: {entity ID: record}} format
+    """
+    slim_data = {}
+
+    slim_types = {}
+    for type_row in data['types']:
+        type_id = type_row['type_id']
+        slim_types[type_id] = (
+            type_row['group'],
+            type_row['category'],
+            tuple(type_row['attributes'].items()),  # Dictionary -> tuple
+            tuple(type_row['effects']),  # List -> tuple
+            type_row['default_effect']
+        )
+    slim_data['types'] = slim_types
+
+    slim_attribs = {}
+    for attr_row in data['attributes']:
+        attribute_id = attr_row['attribute_id']
+        slim_attribs[attribute_id] = (
+            attr_row['max_attribute'],
+            attr_row['default_value'],
+            attr_row['high_is_good'],
+            attr_row['stackable']
+        )
+    slim_data['attributes'] = slim_attribs
+
+    slim_effects = {}
+    for effect_row in data['effects']:
+        effect_id = effect_row['effect_id']
+        slim_effects[effect_id] = (
+            effect_row['effect_category'],
+            effect_row['is_offensive'],
+            effect_row['is_assistance'],
+            effect_row['duration_attribute'],
+            effect_row['discharge_attribute'],
+            effect_row['range_attribute'],
+            effect_row['falloff_attribute'],
+            effect_row['tracking_speed_attribute'],
+            effect_row['fitting_usage_chance_attribute'],
+            effect_row['build_status'],
+            tuple(effect_row['modifiers'])  # List -> tuple
+        )
+    slim_data['effects'] = slim_effects
+
+    slim_modifiers = {}
+    for modifier_row in data['modifiers']:
+        modifier_id = modifier_row['modifier_id']
+        slim_modifiers[modifier_id] = (
+            modifier_row['state'],
+            modifier_row['scope'],
+            modifier_row['src_attr'],
+            modifier_row['operator'],
+            modifier_row['tgt_attr'],
+            modifier_row['domain'],
+            modifier_row['filter_type'],
+            modifier_row['filter_value']
+        )
+    slim_data['modifiers'] = slim_modifiers
+
+    slim_data.update(make_type_indexes(data['types']))
+
+    return slim_data
+
+
+# Names of tables with reverse indexes, which map
+# ID of entity to IDs of types which refer it
+INDEX_NAMES = ('group_types', 'category_types', 'attribute_types', 'effect_types')
+
+
+def make_type_indexes(type_rows):
+    """
+    Compose reverse indexes for types.
+
+    Required arguments:
+    type_rows -- iterable with type rows in format
+    cache generator returns them
+
+    Return value:
+    Dictionary in {index name: {entity ID: (type IDs)}}
+    format, type IDs are sorted
+    """
+    return _compose_type_indexes(
+        (type_row['type_id'], type_row['group'], type_row['category'], type_row['attributes'], type_row['effects'])
+        for type_row in type_rows)
+
+
+def make_record_indexes(type_records):
+    """
+    Compose reverse indexes for types out of their slim records,
+    for caches which have been written without indexes.
+
+    Required arguments:
+    type_records -- dictionary in {type ID: type record} format,
+    type IDs can be strings
+
+    Return value:
+    Dictionary in {index name: {entity ID: (type IDs)}}
+    format, type IDs are sorted integers
+    """
+    return _compose_type_indexes(
+        (int(type_id), record[0], record[1], (attr_id for attr_id, _ in record[2]), record[3])
+        for type_id, record in type_records.items())
+
+
+def _compose_type_indexes(type_entries):
+    """
+    Compose reverse indexes out of (type ID, group ID, category ID,
+    iterable with attribute IDs, iterable with effect IDs) tuples.
+    """
+    indexes = {index_name: {} for index_name in INDEX_NAMES}
+    group_types = indexes['group_types']
+    category_types = indexes['category_types']
+    attribute_types = indexes['attribute_types']
+    effect_types = indexes['effect_types']
+    for type_id, group_id, category_id, attr_ids, effect_ids in type_entries:
+        if group_id is not None:
+            group_types.setdefault(group_id, []).append(type_id)
+        if category_id is not None:
+            category_types.setdefault(category_id, []).append(type_id)
+        for attr_id in attr_ids:
+            attribute_types.setdefault(attr_id, []).append(type_id)
+        # Default effect is always among type effects
+        for effect_id in set(effect_ids):
+            effect_types.setdefault(effect_id, []).append(type_id)
+    for index in indexes.values():
+        for key, type_ids in index.items():
+            index[key] = tuple(sorted(type_ids))
+    return indexes
@@ -0,0 +1,192 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from logging import getLogger
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from weakref import finalize
+
+from eos.util.repr import make_repr_str
+from .binary_cache_handler import BufferCacheHandler, BinaryCacheReader
+
+
+logger = getLogger(__name__)
+
+
+class SharedMemoryCacheHandler(BufferCacheHandler):
+    """
+    This cache handler keeps data in shared memory block, in the same
+    compact layout binary cache handler uses. Parent process publishes
+    data once (by updating cache or importing it from on-disk cache),
+    and worker processes attach to the block by its name read-only, so
+    memory taken by source data doesn't grow with amount of workers.
+    Workers forked after data has been published can use inherited
+    handler as-is. Assembled objects are stored in per-process object
+    cache. Handler destroys only block it has created itself, thus
+    data can be published only by handler which has created block
+    or when there's no block with such name.
+
+    Required arguments:
+    name -- name of shared memory block. If block with such name
+    exists, handler attaches to it; otherwise, handler has no data
+    until it's published via one of update methods
+
+    Optional arguments:
+    object_cache_size -- amount of most recently used objects of each
+    kind kept alive by object cache, see RecordCacheHandler
+    interner -- CacheInterner, through which cache objects
+    are shared with other handlers which use it
+    """
+
+    def __init__(self, name, object_cache_size=0, interner=None):
+        super().__init__(object_cache_size, interner)
+        self._name = name
+        # Block created by this handler, if any
+        self.__owned_shm = None
+        try:
+            shm = attach_shared_memory(name)
+        # If there's no block, silently finish initialization
+        except FileNotFoundError:
+            return
+        try:
+            self.__switch(shm)
+        except KeyboardInterrupt:
+            raise
+        except:
+            msg = 'error during reading shared memory cache'
+            logger.error(msg)
+
+    def import_binary_cache(self, binary_cache_path):
+        """
+        Publish cache stored by binary cache handler.
+
+        Required arguments:
+        binary_cache_path -- path to binary cache file
+        """
+        with open(binary_cache_path, 'rb') as file:
+            packed_data = file.read()
+        with self._lock:
+            self._store(packed_data)
+            self._clear_object_cache()
+
+    def _store(self, packed_data):
+        # Block cannot be resized, thus we replace it with new one;
+        # processes which have old block attached keep using it
+        # until they attach again
+        # Blocks published by other handlers are never destroyed,
+        # thus publishing over them fails with FileExistsError
+        self.unlink()
+        shm = SharedMemory(name=self._name, create=True, size=len(packed_data))
+        shm.buf[:len(packed_data)] = packed_data
+        self.__owned_shm = shm
+        _created_names.add(shm._name)
+        self.__switch(shm)
+
+    def close(self):
+        """
+        Detach from shared memory block. Block stays
+        available for other processes. Threads which are
+        reading records from the block at the moment keep
+        it attached until they're done.
+        """
+        with self._lock:
+            self._reader = BinaryCacheReader(None)
+
+    def unlink(self):
+        """
+        Detach from shared memory block and destroy it, if it has
+        been created by this handler. Should be called by handler
+        which has published data, when nothing else is going to
+        use it. Blocks this handler only attached to are left to
+        handlers which have created them.
+        """
+        self.close()
+        if self.__owned_shm is not None:
+            # Block could have been destroyed by someone else
+            try:
+                self.__owned_shm.unlink()
+            except FileNotFoundError:
+                pass
+            _created_names.discard(self.__owned_shm._name)
+            self.__owned_shm = None
+
+    def __del__(self):
+        # Block is detached once its reader is gone; if
+        # initialization failed, there's nothing to detach
+        try:
+            self._reader
+        except AttributeError:
+            return
+        self.close()
+
+    def __switch(self, shm):
+        # Workers should not be able to modify shared data
+        view = shm.buf.toreadonly()
+        try:
+            reader = BinaryCacheReader(view)
+        except:
+            _detach(view, shm)
+            raise
+        # Records are read without lock, thus block is detached
+        # only when its reader is not used by any thread anymore
+        finalize(reader, _detach, view, shm)
+        self._reader = reader
+
+    def __repr__(self):
+        spec = [['name', '_name']]
+        return make_repr_str(self, spec)
+
+
+def _detach(view, shm):
+    # Views into block have to be released
+    # before block itself can be closed
+    view.release()
+    shm.close()
+
+
+def attach_shared_memory(name):
+    """
+    Attach to existing shared memory block without letting
+    resource tracker of current process destroy it on exit.
+
+    Required arguments:
+    name -- name of shared memory block
+
+    Possible exceptions:
+    FileNotFoundError -- raised when there's no such block
+    """
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Before python 3.13 there's no way to disable tracking, thus block
+    # is unregistered right after attaching. Blocks created in this
+    # process (or its parent, for forked processes, which share
+    # resource tracker with it) are left registered, as registration
+    # belongs to their creator
+    shm = SharedMemory(name=name)
+    if shm._name not in _created_names:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+# Names of blocks created by handlers of this process
+_created_names = set()
@@ -27,6 +27,7 @@ to not store any fit-specific data on them.
 
 
 from .attribute import Attribute
+from .attribute_map import AttributeMap
 from .effect import Effect
 from .modifier import Modifier
 from .type import Type
@@ -34,6 +35,7 @@ from .type import Type
 
 __all__ = [
     'Attribute',
+    'AttributeMap',
     'Effect',
     'Modifier',
     'Type'
@@ -22,6 +22,8 @@
 class Attribute:
     """Class-holder for attribute metadata"""
 
+    __slots__ = ('id', 'max_attribute', 'default_value', 'high_is_good', 'stackable', '__weakref__')
+
     def __init__(
         self,
         attribute_id=None,
@@ -0,0 +1,121 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+
+# Integers which are bigger than this cannot be
+# represented exactly by double-precision floats
+MAX_EXACT_INT = 2 ** 53
+
+
+class AttributeMap(Mapping):
+    """
+    Read-only mapping of attribute IDs to their values, which stores
+    values in typed array. Attribute IDs are kept in sorted typed array
+    as well; it describes layout of value array and is shared between
+    all maps with the same set of attributes, which is common among
+    types of the same kind.
+
+    Required arguments:
+    layout -- sorted array of 64-bit integers with attribute IDs
+    values -- array of doubles or 64-bit integers with values, ordered
+    as layout
+
+    Optional arguments:
+    int_mask -- when values are doubles, bytes object which has non-zero
+    byte at positions of values which should be returned as integers
+    """
+
+    __slots__ = ('__layout', '__values', '__int_mask')
+
+    def __init__(self, layout, values, int_mask=None):
+        self.__layout = layout
+        self.__values = values
+        self.__int_mask = int_mask
+
+    def __getitem__(self, attr_id):
+        layout = self.__layout
+        try:
+            position = bisect_left(layout, attr_id)
+        # Attribute IDs are integers, anything
+        # incomparable to them is just not there
+        except TypeError as e:
+            raise KeyError(attr_id) from e
+        if position == len(layout) or layout[position] != attr_id:
+            raise KeyError(attr_id)
+        value = self.__values[position]
+        int_mask = self.__int_mask
+        if int_mask is not None and int_mask[position]:
+            return int(value)
+        return value
+
+    def __contains__(self, attr_id):
+        try:
+            self[attr_id]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.__layout)
+
+    def __len__(self):
+        return len(self.__layout)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, dict(self.items()))
+
+
+def compose_attribute_map(attr_pairs, layouts):
+    """
+    Compose mapping with attribute values.
+
+    Required arguments:
+    attr_pairs -- iterable with (attribute ID, value) pairs
+    layouts -- dictionary in {layout bytes: layout} format, which is
+    used to share layouts between maps and is updated with new layouts
+    when needed; integer masks of maps are shared via it as well, keyed
+    by ('ints', mask bytes) tuples
+
+    Return value:
+    AttributeMap, or regular dictionary if some of values cannot be
+    stored in typed array without losing data. Types of values are
+    preserved: integers are returned as integers, floats as floats
+    """
+    attr_pairs = sorted(attr_pairs)
+    for _, value in attr_pairs:
+        if type(value) is float:
+            continue
+        if type(value) is int and -MAX_EXACT_INT <= value <= MAX_EXACT_INT:
+            continue
+        return dict(attr_pairs)
+    layout = array('q', (attr_id for attr_id, _ in attr_pairs))
+    layout = layouts.setdefault(layout.tobytes(), layout)
+    int_mask = bytes(type(value) is int for _, value in attr_pairs)
+    if not any(int_mask):
+        return AttributeMap(layout, array('d', (value for _, value in attr_pairs)))
+    if all(int_mask):
+        return AttributeMap(layout, array('q', (value for _, value in attr_pairs)))
+    int_mask = layouts.setdefault(('ints', int_mask), int_mask)
+    return AttributeMap(layout, array('d', (value for _, value in attr_pairs)), int_mask)
@@ -21,7 +21,7 @@
 
 from eos.const.eos import State
 from eos.const.eve import EffectCategory
-from eos.util.cached_property import CachedProperty
+from eos.util.cached_property import CachedSlotProperty
 
 
 class Effect:
@@ -30,6 +30,13 @@ class Effect:
     does with other items.
     """
 
+    __slots__ = (
+        'id', 'category', 'is_offensive', 'is_assistance', 'duration_attribute',
+        'discharge_attribute', 'range_attribute', 'falloff_attribute',
+        'tracking_speed_attribute', 'fitting_usage_chance_attribute',
+        'build_status', 'modifiers', '_cached__state', '__weakref__'
+    )
+
     def __init__(
         self,
         effect_id=None,
@@ -97,7 +104,7 @@ class Effect:
         EffectCategory.system: State.offline
     }
 
-    @CachedProperty
+    @CachedSlotProperty
     def _state(self):
         """
         Return state of effect - if holder takes this state or
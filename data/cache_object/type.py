@@ -21,7 +21,8 @@
 
 from eos.const.eos import Slot, State
 from eos.const.eve import Attribute, Effect, EffectCategory
-from eos.util.cached_property import CachedProperty
+from eos.util.cached_property import CachedSlotProperty
+from eos.util.frozen_dict import FrozenDict
 
 
 class Type:
@@ -30,6 +31,13 @@ class Type:
     incursion system-wide effects are actually items.
     """
 
+    __slots__ = (
+        'id', 'group', 'category', 'attributes', 'effects', 'default_effect',
+        '_cached_required_skills', '_cached_max_state', '_cached_is_targeted',
+        '_cached_slots', '_cached_modifiers_by_state_scope',
+        '_cached_modifiers_by_src_attr', '__weakref__'
+    )
+
     def __init__(
         self,
         type_id=None,
@@ -48,7 +56,8 @@ class Type:
         self.category = category
 
         # The attributes of this type, used as base for calculation of modified
-        # attributes, thus they should stay immutable
+        # attributes, thus they should stay immutable. Can be any mapping, cache
+        # handlers use compact read-only AttributeMap
         # Format: {attributeId: attributeValue}
         self.attributes = attributes if attributes is not None else {}
 
@@ -68,6 +77,37 @@ class Type:
                 modifiers.append(modifier)
         return modifiers
 
+    @CachedSlotProperty
+    def modifiers_by_state_scope(self):
+        """
+        Get modifiers spawned by item effects, grouped by state
+        and scope they need.
+
+        Return value:
+        Immutable dictionary in {(state, scope): (modifiers)} format
+        """
+        index = {}
+        for modifier in self.modifiers:
+            index.setdefault((modifier.state, modifier.scope), []).append(modifier)
+        return FrozenDict((key, tuple(modifiers)) for key, modifiers in index.items())
+
+    @CachedSlotProperty
+    def modifiers_by_src_attr(self):
+        """
+        Get modifiers spawned by item effects, grouped by
+        attribute they take source value from.
+
+        Return value:
+        Immutable dictionary in {attribute ID: (modifiers)} format;
+        modifier shared by several effects is listed once
+        """
+        index = {}
+        for modifier in self.modifiers:
+            modifiers = index.setdefault(modifier.src_attr, [])
+            if modifier not in modifiers:
+                modifiers.append(modifier)
+        return FrozenDict((key, tuple(modifiers)) for key, modifiers in index.items())
+
     # Define attributes which describe item skill requirement details
     # Format: {item attribute ID: level attribute ID}
     __skillrq_attrs = {
@@ -79,7 +119,7 @@ class Type:
         Attribute.required_skill_6: Attribute.required_skill_6_level
     }
 
-    @CachedProperty
+    @CachedSlotProperty
     def required_skills(self):
         """
         Get skill requirements.
@@ -103,7 +143,7 @@ class Type:
             required_skills[int(srq)] = int(srq_lvl)
         return required_skills
 
-    @CachedProperty
+    @CachedSlotProperty
     def max_state(self):
         """
         Get highest state this type is allowed to take.
@@ -121,7 +161,7 @@ class Type:
             max_state = max(max_state, effect._state)
         return max_state
 
-    @CachedProperty
+    @CachedSlotProperty
     def is_targeted(self):
         """
         Report if type is targeted or not. Targeted types cannot be
@@ -150,7 +190,7 @@ class Type:
         Effect.subsystem: Slot.subsystem
     }
 
-    @CachedProperty
+    @CachedSlotProperty
     def slots(self):
         """
         Get types of slots this type occupies.
@@ -29,8 +29,20 @@ class BaseDataHandler(metaclass=ABCMeta):
     data structures (usually tables) they request, returning
     iterable with rows, each row being dictionary in
     {field name: field value} format.
+
+    Methods which fetch rows describing types accept set of
+    type IDs; when it is passed, rows of other types may be
+    omitted. Cache generator uses it for data handlers based
+    on this class.
+
+    Data handlers which spend most of the time waiting for I/O,
+    rather than parsing data in Python, should set io_bound
+    attribute to True; cache generator loads tables of such
+    data handlers in threads instead of processes.
     """
 
+    io_bound = False
+
     @abstractmethod
     def get_evetypes(self):
         ...
@@ -44,7 +56,7 @@ class BaseDataHandler(metaclass=ABCMeta):
         ...
 
     @abstractmethod
-    def get_dgmtypeattribs(self):
+    def get_dgmtypeattribs(self, type_ids=None):
         ...
 
     @abstractmethod
@@ -52,7 +64,7 @@ class BaseDataHandler(metaclass=ABCMeta):
         ...
 
     @abstractmethod
-    def get_dgmtypeeffects(self):
+    def get_dgmtypeeffects(self, type_ids=None):
         ...
 
     @abstractmethod
@@ -18,9 +18,10 @@
 #===============================================================================
 
 
-import json
 import os.path
+from contextlib import closing
 
+from eos.util.json_stream import iter_json_stream
 from eos.util.repr import make_repr_str
 from .abc import BaseDataHandler
 
@@ -29,6 +30,9 @@ class JsonDataHandler(BaseDataHandler):
     """
     Implements loading of raw data from JSON files produced by Phobos script, which can be found at
     https://github.com/pyfa-org/Phobos.
+
+    Files are parsed incrementally, and rows are yielded as they are parsed,
+    thus whole files are never kept in memory.
     """
 
     def __init__(self, basepath):
@@ -43,32 +47,38 @@ class JsonDataHandler(BaseDataHandler):
     def get_dgmattribs(self):
         return self.__fetch_file('dgmattribs')
 
-    def get_dgmtypeattribs(self):
-        return self.__fetch_file('dgmtypeattribs')
+    def get_dgmtypeattribs(self, type_ids=None):
+        return self.__fetch_file('dgmtypeattribs', type_ids=type_ids)
 
     def get_dgmeffects(self):
         return self.__fetch_file('dgmeffects')
 
-    def get_dgmtypeeffects(self):
-        return self.__fetch_file('dgmtypeeffects')
+    def get_dgmtypeeffects(self, type_ids=None):
+        return self.__fetch_file('dgmtypeeffects', type_ids=type_ids)
 
     def get_dgmexpressions(self):
         return self.__fetch_file('dgmexpressions')
 
-    def __fetch_file(self, filename, values_only=False):
+    def __fetch_file(self, filename, values_only=False, type_ids=None):
         with open(os.path.join(self.basepath, '{}.json'.format(filename)), mode='r', encoding='utf8') as file:
-            data = json.load(file)
-        if values_only:
-           data = list(data.values())
-        return data
+            rows = iter_json_stream(file, values_only=values_only)
+            if type_ids is None:
+                yield from rows
+            else:
+                # Rows of other types are dropped right after parsing
+                for row in rows:
+                    if row.get('typeID') in type_ids:
+                        yield row
 
     def get_version(self):
-        metadata = self.__fetch_file('phbmetadata')
-        for row in metadata:
-            if row['field_name'] == 'client_build':
-                return row['field_value']
-        else:
-            return None
+        # Generator is closed explicitly, so that file it
+        # reads is closed even if we stop iterating early
+        with closing(self.__fetch_file('phbmetadata')) as metadata:
+            for row in metadata:
+                if row['field_name'] == 'client_build':
+                    return row['field_value']
+            else:
+                return None
 
     def __repr__(self):
         spec = ['basepath']
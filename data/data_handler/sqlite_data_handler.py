@@ -18,12 +18,18 @@
 #===============================================================================
 
 
+import json
 import sqlite3
+import threading
+from logging import getLogger
 
 from eos.util.repr import make_repr_str
 from .abc import BaseDataHandler
 
 
+logger = getLogger(__name__)
+
+
 # SQLite stores bools as 0 or 1, convert them to python bool
 sqlite3.register_converter('BOOLEAN', lambda v: int(v) == 1)
 
@@ -32,12 +38,24 @@ class SQLiteDataHandler(BaseDataHandler):
     """
     Handler for loading data from SQLite database. Data should be in Phobos-like
     format, for details on it refer to JSON data handler doc string.
+
+    Rows are fetched lazily, each table via its own cursor. When type IDs are
+    passed, filtering is done by SQLite, using index on type ID column, which
+    is created on first use if database doesn't have it. Data handler can be
+    used from multiple threads, each thread gets its own connection.
     """
 
+    # SQLite does its work without holding GIL
+    io_bound = True
+
     def __init__(self, dbpath):
-        conn = sqlite3.connect(dbpath, detect_types=sqlite3.PARSE_DECLTYPES)
-        conn.row_factory = sqlite3.Row
-        self.cursor = conn.cursor()
+        self.dbpath = dbpath
+        self.__local = threading.local()
+        # Names of tables whose type ID column we've ensured index for
+        self.__indexed_tables = set()
+        # Connect right away, to report issues with
+        # database as early as possible
+        self.__get_connection()
 
     def get_evetypes(self):
         return self.__fetch_table('evetypes')
@@ -48,28 +66,64 @@ class SQLiteDataHandler(BaseDataHandler):
     def get_dgmattribs(self):
         return self.__fetch_table('dgmattribs')
 
-    def get_dgmtypeattribs(self):
-        return self.__fetch_table('dgmtypeattribs')
+    def get_dgmtypeattribs(self, type_ids=None):
+        return self.__fetch_table('dgmtypeattribs', type_ids=type_ids)
 
     def get_dgmeffects(self):
         return self.__fetch_table('dgmeffects')
 
-    def get_dgmtypeeffects(self):
-        return self.__fetch_table('dgmtypeeffects')
+    def get_dgmtypeeffects(self, type_ids=None):
+        return self.__fetch_table('dgmtypeeffects', type_ids=type_ids)
 
     def get_dgmexpressions(self):
         return self.__fetch_table('dgmexpressions')
 
-    def __fetch_table(self, tablename):
-        self.cursor.execute('SELECT * FROM {}'.format(tablename))
-        return [dict(row) for row in self.cursor]
+    def __get_connection(self):
+        try:
+            return self.__local.conn
+        except AttributeError:
+            conn = sqlite3.connect(self.dbpath, detect_types=sqlite3.PARSE_DECLTYPES)
+            conn.row_factory = sqlite3.Row
+            self.__local.conn = conn
+            return conn
+
+    def __fetch_table(self, tablename, type_ids=None):
+        conn = self.__get_connection()
+        cursor = None
+        if type_ids is not None:
+            # Index has to be created before we start reading,
+            # as it's impossible while statement is in progress
+            self.__ensure_type_index(tablename)
+            try:
+                cursor = conn.execute(
+                    'SELECT * FROM {} WHERE typeID IN (SELECT value FROM json_each(?))'.format(tablename),
+                    (json.dumps([type_id for type_id in type_ids if isinstance(type_id, int)]),))
+            # SQLite may be built without JSON support, rows
+            # of all types are fine too
+            except sqlite3.OperationalError as e:
+                logger.warning('unable to filter rows of table {}: {}'.format(tablename, e))
+        if cursor is None:
+            cursor = conn.execute('SELECT * FROM {}'.format(tablename))
+        return (dict(row) for row in cursor)
+
+    def __ensure_type_index(self, tablename):
+        if tablename in self.__indexed_tables:
+            return
+        self.__indexed_tables.add(tablename)
+        try:
+            self.__get_connection().execute('CREATE INDEX IF NOT EXISTS {0}_typeID ON {0} (typeID)'.format(tablename))
+        # Database may be read-only, rows can be
+        # fetched without index as well
+        except sqlite3.OperationalError as e:
+            logger.warning('unable to create index on table {}: {}'.format(tablename, e))
 
     def get_version(self):
-        self.cursor.execute('SELECT field_value FROM phbmetadata WHERE field_name = "client_build"')
-        for row in self.cursor:
+        cursor = self.__get_connection().execute(
+            'SELECT field_value FROM phbmetadata WHERE field_name = "client_build"')
+        for row in cursor:
             return row[0]
         else:
             return None
 
     def __repr__(self):
-        return make_repr_str(self, ())
+        return make_repr_str(self, ('dbpath',))
@@ -37,3 +37,12 @@ class ExistingSourceError(EosError):
     already exists.
     """
     pass
+
+
+class IncompatibleCacheError(EosError):
+    """
+    Raised on attempt to add source without data handler,
+    when its cache doesn't exist or has been built by
+    other version of Eos.
+    """
+    pass
@@ -19,38 +19,126 @@
 #===============================================================================
 
 
-from logging import getLogger
+import asyncio
 from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import getLogger
+from threading import Lock
+from time import monotonic, perf_counter
+from weakref import ref
 
-from eos import __version__ as eos_version
 from eos.util.repr import make_repr_str
-from .cache_customizer import CacheCustomizer
-from .cache_generator import CacheGenerator
-from .exception import ExistingSourceError, UnknownSourceError
+from .cache_builder import CacheBuilder, is_fingerprint_compatible, make_fingerprint
+from .exception import ExistingSourceError, IncompatibleCacheError, UnknownSourceError
 
 
 logger = getLogger(__name__)
 
 
 Source = namedtuple('Source', ('alias', 'cache_handler'))
+LazySource = namedtuple('LazySource', ('data_handler_factory', 'cache_handler_factory', 'build_cache_path'))
+LazySourceStats = namedtuple('LazySourceStats', ('loads', 'evictions', 'load_time', 'loaded', 'size'))
 
 
-class SourceManager:
+class SourceManagerMeta(type):
+    """
+    Metaclass of source manager, which provides its default source.
+    Default source is always Source instance or None: lazy source
+    which has been made default is loaded when default source is
+    requested.
+    """
+
+    @property
+    def default(cls):
+        alias = cls._default_alias
+        if alias is None:
+            return cls._default
+        return cls.get(alias)
+
+    @default.setter
+    def default(cls, source):
+        cls._default = source
+        cls._default_alias = None
+
+
+class SourceManager(metaclass=SourceManagerMeta):
     """
     Handle and access different sources in an easy way. Useful for cases
     when you want to work with, for example, Tranquility and Singularity
     data at the same time.
+
+    Sources added via add_lazy() are loaded when they are requested
+    for the first time, and can be evicted when they are not used by
+    any fit. Eviction is controlled by class attributes:
+
+    idle_time -- when set, only sources not used by any fit for
+    this amount of seconds are evicted
+    record_budget -- when set, sources are evicted only while
+    lazy sources in memory have more cache records (as counted
+    by get_record_counts() of their cache handlers) than this
+    amount, least recently used first
+
+    When neither is set, sources are never evicted.
+
+    Source manager is thread-safe. Registries of sources are never
+    modified in place: under lock, they are replaced by modified
+    copies, thus lookups of sources which are ready do not take
+    any locks.
     """
 
     # Format:
     # {literal alias: Source}
     _sources = {}
 
-    # Default source, will be used implicitly when instantiating fit
-    default = None
+    # Sources which are being prepared in background
+    # Format: {literal alias: Future}
+    _pending = {}
+
+    # Guards source registration
+    _lock = Lock()
+
+    # Executor for background source preparation, created on demand
+    _executor = None
+
+    # Sources which are loaded on first request
+    # Format: {literal alias: LazySource}
+    _lazy = {}
+
+    # Fits which use loaded lazy sources, referenced weakly
+    # Format: {literal alias: {fit ID: weak reference to fit}}
+    _fit_refs = {}
+
+    # Loaded lazy sources without fits, candidates for eviction
+    # Format: {literal alias: time since which source is not used}
+    _idle_since = {}
+
+    # Amount of cache records of loaded lazy sources
+    # Format: {literal alias: record count}
+    _sizes = {}
+
+    # Serialize loading of lazy sources, so that each of
+    # them is loaded once, while other sources are loaded
+    # in parallel
+    # Format: {literal alias: lock}
+    _load_locks = {}
+
+    # Counters for lazy sources
+    _loads = 0
+    _evictions = 0
+    _load_time = 0
+
+    # Eviction settings for lazy sources
+    idle_time = None
+    record_budget = None
+
+    # Default source, will be used implicitly when instantiating
+    # fit; it's accessed via default attribute, see SourceManagerMeta
+    _default = None
+    # Alias of lazy source which is default
+    _default_alias = None
 
     @classmethod
-    def add(cls, alias, data_handler, cache_handler, make_default=False):
+    def add(cls, alias, data_handler, cache_handler, make_default=False, build_cache_path=None):
         """
         Add source to source manager - this includes initializing
         all facilities hidden behind name 'source'. After source
@@ -60,20 +148,376 @@ class SourceManager:
         alias -- alias under which source will be accessible
         data_handler -- object which implements standard data interface
         (returns data rows for several tables as dicts and is able to
-        get data version)
+        get data version); if None, cache is used as is, without
+        checking if it corresponds to data, and thus it should be
+        prebuilt
         cache_handler -- cache handler implementation
 
         Optional arguments:
         make_default -- marks passed source default; it will be used
         by default for instantiating new fits
+        build_cache_path -- path to file where results of modifier
+        building are kept between cache generations; when specified,
+        modifiers are rebuilt only for effects whose data has changed
+
+        Possible exceptions:
+        ExistingSourceError -- raised when source with such alias has
+        already been added or is being added
+        IncompatibleCacheError -- raised when no data handler is passed,
+        and cache is missing or has been built by other version of Eos
         """
         logger.info('adding source with alias "{}"'.format(alias))
-        if alias in cls._sources:
+        # Alias is reserved while cache is being prepared, so that
+        # concurrent additions with the same alias fail right away
+        future = Future()
+        with cls._lock:
+            cls.__check_alias(alias)
+            cls._pending[alias] = future
+        cls.__prepare_pending(alias, future, data_handler, cache_handler, make_default, build_cache_path)
+        future.result()
+
+    @classmethod
+    def add_future(
+        cls, alias, data_handler, cache_handler, make_default=False,
+        build_cache_path=None, executor=None
+    ):
+        """
+        Add source in background thread. Arguments are the same as for
+        add() method; source becomes accessible when it's ready. Until
+        then, get() raises UnknownSourceError for it, while get_async()
+        waits for it.
+
+        Optional arguments:
+        executor -- concurrent.futures executor which runs preparation;
+        if not specified, shared thread pool of source manager is used
+
+        Return value:
+        concurrent.futures.Future, which resolves to added source
+
+        Possible exceptions:
+        ExistingSourceError -- raised when source with such alias has
+        already been added or is being added
+        """
+        logger.info('adding source with alias "{}" in background'.format(alias))
+        future = Future()
+        with cls._lock:
+            cls.__check_alias(alias)
+            cls._pending[alias] = future
+            if executor is None:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(thread_name_prefix='eos-source')
+                executor = cls._executor
+
+        try:
+            executor.submit(
+                cls.__prepare_pending, alias, future, data_handler,
+                cache_handler, make_default, build_cache_path)
+        except BaseException:
+            with cls._lock:
+                del cls._pending[alias]
+            raise
+        return future
+
+    @classmethod
+    async def add_async(cls, alias, data_handler, cache_handler, make_default=False, build_cache_path=None):
+        """
+        Add source without blocking event loop. Arguments are the same
+        as for add() method; cache is checked and generated in shared
+        thread pool of source manager.
+
+        Return value:
+        Added source
+        """
+        future = cls.add_future(
+            alias, data_handler, cache_handler, make_default=make_default,
+            build_cache_path=build_cache_path)
+        return await asyncio.wrap_future(future)
+
+    @classmethod
+    def add_lazy(
+        cls, alias, data_handler_factory, cache_handler_factory,
+        make_default=False, build_cache_path=None
+    ):
+        """
+        Add source which is loaded only when it's requested
+        for the first time, e.g. by fit which uses it. Source
+        which has been evicted is loaded again on next request.
+
+        Required arguments:
+        alias -- alias under which source will be accessible
+        data_handler_factory -- callable which returns data handler,
+        or None to use prebuilt cache without data handler
+        cache_handler_factory -- callable which returns cache handler;
+        handlers are made anew on each load, thus memory they take is
+        freed when source is evicted
+
+        Optional arguments:
+        make_default -- marks passed source default; it will be used
+        by default for instantiating new fits
+        build_cache_path -- path to file where results of modifier
+        building are kept between cache generations
+
+        Possible exceptions:
+        ExistingSourceError -- raised when source with such alias has
+        already been added or is being added
+        """
+        logger.info('adding lazy source with alias "{}"'.format(alias))
+        with cls._lock:
+            cls.__check_alias(alias)
+            cls._lazy = {**cls._lazy, alias: LazySource(
+                data_handler_factory=data_handler_factory,
+                cache_handler_factory=cache_handler_factory,
+                build_cache_path=build_cache_path)}
+            if make_default is True:
+                cls._default = None
+                cls._default_alias = alias
+
+    @classmethod
+    def evict(cls):
+        """
+        Evict lazy sources which are not used by any fit,
+        according to eviction settings.
+
+        Return value:
+        List with aliases of evicted sources
+        """
+        with cls._lock:
+            return cls.__evict_unused()
+
+    @classmethod
+    def get_lazy_stats(cls):
+        """
+        Get statistics of lazy sources.
+
+        Return value:
+        LazySourceStats named tuple; load time is total time spent
+        on loading sources (in seconds), loaded is amount of lazy
+        sources in memory, size is amount of cache records they have
+        """
+        with cls._lock:
+            return LazySourceStats(
+                loads=cls._loads,
+                evictions=cls._evictions,
+                load_time=cls._load_time,
+                loaded=len(cls._sizes),
+                size=sum(cls._sizes.values()))
+
+    @classmethod
+    def _track_fit(cls, fit, old_source, new_source):
+        """
+        Keep track of fits which use lazy sources, called
+        by fit when its source changes.
+        """
+        if old_source is None and new_source is None:
+            return
+        with cls._lock:
+            if old_source is not None:
+                fit_refs = cls._fit_refs.get(old_source.alias)
+                if fit_refs is not None and fit_refs.pop(id(fit), None) is not None and not fit_refs:
+                    cls._idle_since[old_source.alias] = monotonic()
+            if new_source is not None:
+                cls.__use(fit, new_source)
+
+    @classmethod
+    def _get_for_fit(cls, fit, alias):
+        """
+        Using source alias, return source for fit. Unlike get(),
+        it marks lazy source as used by the fit right away, so that
+        it's not evicted before fit starts using it.
+        """
+        return cls.__get(alias, fit)
+
+    @classmethod
+    def __use(cls, fit, source):
+        """
+        Mark lazy source as used by fit, if it's loaded.
+        Should be called with lock acquired.
+        """
+        alias = source.alias
+        fit_refs = cls._fit_refs.get(alias)
+        if fit_refs is None or cls._sources.get(alias) is not source:
+            return
+        fit_id = id(fit)
+        all_fit_refs = cls._fit_refs
+        idle_since = cls._idle_since
+
+        # Fit may be garbage collected at any moment, even
+        # while lock is held, thus lock is not used here
+        def release(_):
+            if fit_refs.pop(fit_id, None) is not None and not fit_refs and all_fit_refs.get(alias) is fit_refs:
+                idle_since[alias] = monotonic()
+
+        fit_refs[fit_id] = ref(fit, release)
+        idle_since.pop(alias, None)
+
+    @classmethod
+    def __prepare_pending(cls, alias, future, data_handler, cache_handler, make_default, build_cache_path):
+        """
+        Prepare cache of source whose alias has been reserved with
+        passed future, then register source and resolve the future.
+        """
+        try:
+            cls.__prepare_cache(data_handler, cache_handler, build_cache_path)
+        except BaseException as e:
+            with cls._lock:
+                del cls._pending[alias]
+            future.set_exception(e)
+            return
+        source = Source(alias=alias, cache_handler=cache_handler)
+        with cls._lock:
+            del cls._pending[alias]
+            cls.__register(source, make_default)
+        future.set_result(source)
+
+    @classmethod
+    def __check_alias(cls, alias):
+        if alias in cls._sources or alias in cls._pending or alias in cls._lazy:
             raise ExistingSourceError(alias)
+
+    @classmethod
+    def __load(cls, alias, fit=None):
+        """
+        Load lazy source, or return it if it's loaded already.
+
+        Optional arguments:
+        fit -- fit which is going to use the source; source is
+        marked as used by it before other threads can evict it
+
+        Possible exceptions:
+        UnknownSourceError -- raised when there's no lazy
+        source with such alias
+        """
+        with cls._lock:
+            if alias not in cls._lazy:
+                raise UnknownSourceError(alias)
+            load_lock = cls._load_locks.setdefault(alias, Lock())
+        with load_lock:
+            with cls._lock:
+                try:
+                    source = cls._sources[alias]
+                except KeyError:
+                    pass
+                else:
+                    if fit is not None:
+                        cls.__use(fit, source)
+                    return source
+                try:
+                    lazy = cls._lazy[alias]
+                except KeyError:
+                    raise UnknownSourceError(alias)
+            logger.info('loading source with alias "{}"'.format(alias))
+            start = perf_counter()
+            if lazy.data_handler_factory is None:
+                data_handler = None
+            else:
+                data_handler = lazy.data_handler_factory()
+            cache_handler = lazy.cache_handler_factory()
+            cls.__prepare_cache(data_handler, cache_handler, lazy.build_cache_path)
+            source = Source(alias=alias, cache_handler=cache_handler)
+            try:
+                get_record_counts = cache_handler.get_record_counts
+            except AttributeError:
+                msg = (
+                    'cache handler of source with alias "{}" does not report record counts, '
+                    'record budget does not account for it').format(alias)
+                logger.warning(msg)
+                size = 0
+            else:
+                size = sum(get_record_counts().values())
+            with cls._lock:
+                # Source could be removed while it was loading
+                if cls._lazy.get(alias) is not lazy:
+                    raise UnknownSourceError(alias)
+                cls._sources = {**cls._sources, alias: source}
+                cls._fit_refs[alias] = {}
+                cls._idle_since[alias] = monotonic()
+                cls._sizes[alias] = size
+                cls._loads += 1
+                cls._load_time += perf_counter() - start
+                if fit is not None:
+                    cls.__use(fit, source)
+                cls.__evict_unused(exclude=alias)
+            return source
+
+    @classmethod
+    def __evict_unused(cls, exclude=None):
+        """
+        Evict lazy sources which are not used by any fit,
+        according to eviction settings. Should be called
+        with lock acquired.
+
+        Optional arguments:
+        exclude -- alias of source which shouldn't be evicted
+
+        Return value:
+        List with aliases of evicted sources
+        """
+        if cls.idle_time is None and cls.record_budget is None:
+            return []
+        now = monotonic()
+        # Fits released by garbage collector update idle times without
+        # lock, thus snapshot is used; they may also mark source which
+        # has just been unloaded, such entries are dropped
+        idle_since = cls._idle_since.copy()
+        for alias in idle_since.keys() - cls._sizes.keys():
+            cls._idle_since.pop(alias, None)
+            del idle_since[alias]
+        # Least recently used sources go first
+        candidates = sorted(
+            (since, alias) for alias, since in idle_since.items()
+            if alias != exclude and not cls._fit_refs.get(alias))
+        if cls.idle_time is not None:
+            candidates = [(since, alias) for since, alias in candidates if now - since >= cls.idle_time]
+        evicted = []
+        size = sum(cls._sizes.values())
+        for _, alias in candidates:
+            if cls.record_budget is not None and size <= cls.record_budget:
+                break
+            size -= cls._sizes[alias]
+            cls.__unload(alias)
+            cls._evictions += 1
+            evicted.append(alias)
+            logger.info('evicted source with alias "{}"'.format(alias))
+        return evicted
+
+    @classmethod
+    def __unload(cls, alias):
+        """Forget loaded data of lazy source."""
+        if alias in cls._sources:
+            cls.__discard_source(alias)
+        cls._fit_refs.pop(alias, None)
+        cls._idle_since.pop(alias, None)
+        cls._sizes.pop(alias, None)
+
+    @classmethod
+    def __discard_source(cls, alias):
+        sources = dict(cls._sources)
+        del sources[alias]
+        cls._sources = sources
+
+    @classmethod
+    def __register(cls, source, make_default):
+        cls._sources = {**cls._sources, source.alias: source}
+        if make_default is True:
+            cls.default = source
+
+    @staticmethod
+    def __prepare_cache(data_handler, cache_handler, build_cache_path):
+        """
+        Make sure cache handler has data which corresponds
+        to data handler, regenerating it if needed. Without
+        data handler, just make sure cache can be used.
+        """
+        if data_handler is None:
+            cache_fp = cache_handler.get_fingerprint()
+            if not is_fingerprint_compatible(cache_fp):
+                raise IncompatibleCacheError(cache_fp)
+            logger.info('using prebuilt cache with fingerprint "{}"'.format(cache_fp))
+            return
         # Compare fingerprints from data and cache
         cache_fp = cache_handler.get_fingerprint()
         data_version = data_handler.get_version()
-        current_fp = '{}_{}'.format(data_version, eos_version)
+        current_fp = make_fingerprint(data_version)
         # If data version is corrupt or fingerprints mismatch, update cache
         if data_version is None or cache_fp != current_fp:
             if data_version is None:
@@ -83,19 +527,13 @@ class SourceManager:
                     cache_fp, current_fp)
                 logger.info(msg)
             # Generate cache, apply customizations and write it
-            cache_data = CacheGenerator().run(data_handler)
-            CacheCustomizer().run_builtin(cache_data)
-            cache_handler.update_cache(cache_data, current_fp)
-        # Finally, add record to list of sources
-        source = Source(alias=alias, cache_handler=cache_handler)
-        cls._sources[alias] = source
-        if make_default is True:
-            cls.default = source
+            CacheBuilder(build_cache_path=build_cache_path).build(data_handler, cache_handler, data_version)
 
     @classmethod
     def get(cls, alias):
         """
-        Using source alias, return source data.
+        Using source alias, return source data. Lazy source
+        is loaded if needed.
 
         Required arguments:
         alias -- alias of source to return
@@ -104,11 +542,79 @@ class SourceManager:
         (alias, edb, eos) named tuple with alias,
         SQL Alchemy database session and Eos instance for requested
         source
+
+        Possible exceptions:
+        UnknownSourceError -- raised when there's no source
+        with such alias
         """
-        try:
-            return cls._sources[alias]
-        except KeyError:
+        return cls.__get(alias)
+
+    @classmethod
+    def __get(cls, alias, fit=None):
+        # Unused sources are evicted by the way, unless some
+        # other thread is busy with sources at the moment
+        if (
+            cls._idle_since and (cls.idle_time is not None or cls.record_budget is not None) and
+            cls._lock.acquire(blocking=False)
+        ):
+            try:
+                cls.__evict_unused(exclude=alias)
+            finally:
+                cls._lock.release()
+        if fit is None:
+            try:
+                return cls._sources[alias]
+            except KeyError:
+                pass
+        # Source is looked up and marked as used by fit at once
+        else:
+            with cls._lock:
+                try:
+                    source = cls._sources[alias]
+                except KeyError:
+                    pass
+                else:
+                    cls.__use(fit, source)
+                    return source
+        if alias not in cls._lazy:
             raise UnknownSourceError(alias)
+        return cls.__load(alias, fit)
+
+    @classmethod
+    async def get_async(cls, alias):
+        """
+        Using source alias, return source data; if source is
+        being added in background, wait until it's ready.
+
+        Required arguments:
+        alias -- alias of source to return
+
+        Return value:
+        Source named tuple
+        """
+        with cls._lock:
+            try:
+                return cls._sources[alias]
+            except KeyError:
+                pass
+            try:
+                future = cls._pending[alias]
+            except KeyError:
+                if alias not in cls._lazy:
+                    raise UnknownSourceError(alias)
+                future = None
+        # Lazy source is loaded in shared thread pool
+        if future is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(thread_name_prefix='eos-source')
+                executor = cls._executor
+            return await asyncio.get_running_loop().run_in_executor(executor, cls.get, alias)
+        try:
+            return await asyncio.wrap_future(future)
+        # Failed background addition means there's no such source
+        except Exception as e:
+            raise UnknownSourceError(alias) from e
 
     @classmethod
     def remove(cls, alias):
@@ -119,14 +625,25 @@ class SourceManager:
         alias -- alias of source to remove
         """
         logger.info('removing source with alias "{}"'.format(alias))
-        try:
-            del cls._sources[alias]
-        except KeyError:
-            raise UnknownSourceError(alias)
+        with cls._lock:
+            if alias in cls._lazy:
+                lazy = dict(cls._lazy)
+                del lazy[alias]
+                cls._lazy = lazy
+                cls.__unload(alias)
+                cls._load_locks.pop(alias, None)
+                if cls._default_alias == alias:
+                    cls._default_alias = None
+                return
+            if alias not in cls._sources:
+                raise UnknownSourceError(alias)
+            cls.__discard_source(alias)
 
     @classmethod
     def list(cls):
-        return list(cls._sources.keys())
+        aliases = list(cls._sources.keys())
+        aliases.extend(alias for alias in cls._lazy if alias not in cls._sources)
+        return aliases
 
     @classmethod
     def __repr__(cls):
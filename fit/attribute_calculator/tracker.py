@@ -146,11 +146,8 @@ class LinkTracker:
             for capped_attr in (cap_map.get(attr) or ()):
                 del holder.attributes[capped_attr]
         # Clear attributes using this attribute as data source
-        for affector in self.__generate_affectors(holder):
-            modifier = affector.modifier
-            # Skip affectors which do not use attribute being damaged as source
-            if modifier.src_attr != attr:
-                continue
+        for modifier in holder.item.modifiers_by_src_attr.get(attr, ()):
+            affector = Affector(holder, modifier)
             # Go through all holders targeted by modifier
             for target_holder in self.get_affectees(affector):
                 # And remove target attribute
@@ -169,30 +166,24 @@ class LinkTracker:
                 # And remove target attribute
                 del target_holder.attributes[affector.modifier.tgt_attr]
 
-    def __generate_affectors(self, holder, state_filter=None, scope_filter=None):
+    def __generate_affectors(self, holder, state_filter, scope_filter):
         """
         Get all affectors spawned by holder.
 
         Required arguments:
         holder -- holder, for which affectors are generated
-
-        Optional arguments:
         state_filter -- filter results by affector's required state,
-        which should be in this iterable; if None, no filtering
-        occurs (default None)
-        scope_filter -- filter results by affector's required state,
-        which should be in this iterable; if None, no filtering
-        occurs (default None)
+        which should be in this iterable
+        scope_filter -- filter results by affector's required scope,
+        which should be in this iterable
 
         Return value:
         Set with Affector objects, satisfying passed filters
         """
+        modifier_index = holder.item.modifiers_by_state_scope
         affectors = set()
-        for modifier in holder.item.modifiers:
-            if state_filter is not None and modifier.state not in state_filter:
-                continue
-            if scope_filter is not None and modifier.scope not in scope_filter:
-                continue
-            affector = Affector(holder, modifier)
-            affectors.add(affector)
+        for state in state_filter:
+            for scope in scope_filter:
+                for modifier in modifier_index.get((state, scope), ()):
+                    affectors.add(Affector(holder, modifier))
         return affectors
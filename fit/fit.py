@@ -61,9 +61,11 @@ class Fit:
         self._link_tracker = LinkTracker(self)  # Tracks links between holders assigned to fit
         self._restriction_tracker = RestrictionTracker(self)  # Tracks various restrictions related to given fitting
         self.stats = StatTracker(self)  # Access point for all the fitting stats
-        # Use default source, unless specified otherwise
+        # Use default source, unless specified otherwise; lazy
+        # default source is requested by alias, so that it's
+        # marked as used by this fit as soon as it's loaded
         if source is None:
-            source = SourceManager.default
+            source = SourceManager._default_alias or SourceManager.default
         self.source = source
         # As character object shouldn't change in any sane
         # cases, initialize it here
@@ -196,7 +198,7 @@ class Fit:
         # Attempt to fetch source from source manager if passed object
         # is not instance of source class
         if not isinstance(new_source, Source) and new_source is not None:
-            new_source = SourceManager.get(new_source)
+            new_source = SourceManager._get_for_fit(self, new_source)
         old_source = self.source
         # Do not update anything if sources are the same
         if new_source is old_source:
@@ -207,6 +209,7 @@ class Fit:
                 self._disable_services(holder)
         # Assign new source and feed new data to all holders
         self.__source = new_source
+        SourceManager._track_fit(self, old_source, new_source)
         self._request_volatile_cleanup(source_check=False)
         for holder in self._holders:
             holder._refresh_source()
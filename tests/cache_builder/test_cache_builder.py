@@ -0,0 +1,110 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import io
+import json
+import os.path
+from contextlib import redirect_stdout
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock
+
+from eos import __version__ as eos_version
+from eos.data.cache_builder import CacheBuilder
+from eos.data.cache_builder.__main__ import main
+from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler
+from eos.data.data_handler import JsonDataHandler
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestCacheBuilder(EosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = TemporaryDirectory()
+        self.dump_path = os.path.join(self.tmp_dir.name, 'phobos')
+        os.mkdir(self.dump_path)
+        self.write_table('evetypes', {'1': {'typeID': 1, 'groupID': 6, 'typeName_en-us': 'Rifter'}})
+        self.write_table('evegroups', {'6': {'groupID': 6, 'categoryID': 6}})
+        self.write_table('dgmattribs', [{
+            'attributeID': 5, 'maxAttributeID': None, 'defaultValue': 0.0,
+            'highIsGood': True, 'stackable': True}])
+        self.write_table('dgmtypeattribs', [{'typeID': 1, 'attributeID': 5, 'value': 10.0}])
+        self.write_table('dgmeffects', [])
+        self.write_table('dgmtypeeffects', [])
+        self.write_table('dgmexpressions', [])
+        self.write_table('phbmetadata', [{'field_name': 'client_build', 'field_value': 1000}])
+        self.fingerprint = '1000_{}'.format(eos_version)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def write_table(self, table_name, rows):
+        with open(os.path.join(self.dump_path, '{}.json'.format(table_name)), 'w', encoding='utf8') as file:
+            json.dump(rows, file)
+
+    def run_main(self, *argv):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            exit_code = main(list(argv))
+        return exit_code, output.getvalue()
+
+    def test_builder(self):
+        cache_handler = Mock()
+        builder = CacheBuilder()
+        fingerprint = builder.build(JsonDataHandler(self.dump_path), cache_handler, 1000)
+        self.assertEqual(fingerprint, self.fingerprint)
+        self.assertEqual(cache_handler.update_cache.call_count, 1)
+        cache_data, written_fingerprint = cache_handler.update_cache.call_args[0]
+        self.assertEqual(written_fingerprint, self.fingerprint)
+        self.assertEqual(len(cache_data['types']), 1)
+        self.assertEqual(builder.table_row_counts['evetypes'], 1)
+        self.assertEqual(builder.table_row_counts['dgmtypeattribs'], 1)
+        self.assertEqual(builder.record_counts, {
+            entity_type: len(records) for entity_type, records in cache_data.items()})
+        self.assertEqual(tuple(builder.stage_timings)[-2:], ('customize', 'write'))
+        self.assertIn('fetch', builder.stage_timings)
+
+    def test_main_binary(self):
+        cache_path = os.path.join(self.tmp_dir.name, 'cache', 'eos_{fingerprint}.bin')
+        exit_code, output = self.run_main(self.dump_path, cache_path)
+        self.assertEqual(exit_code, 0)
+        cache_path = cache_path.replace('{fingerprint}', self.fingerprint)
+        self.assertIn('fingerprint: {}'.format(self.fingerprint), output)
+        self.assertIn('dgmtypeattribs', output)
+        cache_handler = BinaryCacheHandler(cache_path)
+        self.assertEqual(cache_handler.get_fingerprint(), self.fingerprint)
+        self.assertEqual(list(cache_handler.get_type_ids()), [1])
+
+    def test_main_json(self):
+        cache_path = os.path.join(self.tmp_dir.name, 'cache', 'eos.json.bz2')
+        exit_code, output = self.run_main(self.dump_path, cache_path, '--codec', 'gzip')
+        self.assertEqual(exit_code, 0)
+        cache_handler = JsonCacheHandler(cache_path)
+        self.assertEqual(cache_handler.get_fingerprint(), self.fingerprint)
+        self.assertEqual(list(cache_handler.get_type_ids()), [1])
+
+    def test_main_no_version(self):
+        self.write_table('phbmetadata', [{'field_name': 'dump_time', 'field_value': 1}])
+        cache_path = os.path.join(self.tmp_dir.name, 'eos.bin')
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(self.run_main(self.dump_path, cache_path)[0], 1)
+        self.assertFalse(os.path.exists(cache_path))
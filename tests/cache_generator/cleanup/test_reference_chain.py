@@ -0,0 +1,77 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import logging
+from unittest.mock import patch
+
+from eos.data.cache_generator.cleaner import Cleaner
+from eos.tests.cache_generator.generator_testcase import GeneratorTestCase
+
+
+@patch('eos.data.cache_generator.converter.ModifierBuilder')
+class TestReferenceChain(GeneratorTestCase):
+    """
+    Check that rows referred via long chains of references
+    are kept, and references of each row are followed once.
+    """
+
+    def __generate_data(self, depth):
+        self.dh.data['evetypes'].append({'typeID': 1, 'groupID': 5, 'typeName_en-us': ''})
+        self.dh.data['evegroups'].append({'groupID': 5, 'categoryID': 16, 'groupName_en-us': ''})
+        self.dh.data['dgmtypeeffects'].append({'typeID': 1, 'effectID': 200, 'isDefault': False})
+        self.dh.data['dgmeffects'].append({
+            'effectID': 200, 'effectCategory': 0, 'preExpression': 1000 + depth,
+            'postExpression': None, 'modifierInfo': None
+        })
+        # Each expression refers previous one; rows are added in
+        # reverse order of references to them
+        for expression_id in range(1001, 1001 + depth):
+            self.dh.data['dgmexpressions'].append({
+                'expressionID': expression_id, 'operandID': 17,
+                'arg1': expression_id - 1 if expression_id > 1001 else None, 'arg2': None,
+                'expressionValue': None, 'expressionTypeID': None,
+                'expressionGroupID': None, 'expressionAttributeID': None
+            })
+        # Unreferenced expression
+        self.dh.data['dgmexpressions'].append({
+            'expressionID': 5000, 'operandID': 17, 'arg1': 1001, 'arg2': None,
+            'expressionValue': None, 'expressionTypeID': None,
+            'expressionGroupID': None, 'expressionAttributeID': None
+        })
+
+    def test_chain(self, mod_builder):
+        depth = 300
+        self.__generate_data(depth)
+        mod_builder.return_value.build.return_value = ([], 0)
+        with patch.object(Cleaner, '_get_references', autospec=True, side_effect=Cleaner._get_references) as refs:
+            self.run_generator()
+        expressions = mod_builder.mock_calls[0][1][0]
+        self.assertEqual(
+            sorted(row['expressionID'] for row in expressions),
+            list(range(1001, 1001 + depth)))
+        # Type, its group, type effect, effect and expressions
+        followed = [(call[0][1], call[0][2].get('expressionID')) for call in refs.call_args_list]
+        self.assertEqual(len(followed), 4 + depth)
+        self.assertEqual(len(set(followed)), len(followed))
+        self.assertEqual(len(self.log), 2)
+        clean_stats = self.log[1]
+        self.assertEqual(clean_stats.name, 'eos.data.cache_generator.cleaner')
+        self.assertEqual(clean_stats.levelno, logging.INFO)
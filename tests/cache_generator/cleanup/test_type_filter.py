@@ -0,0 +1,129 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from eos.const.eve import Operand
+from eos.data.data_handler.abc import BaseDataHandler
+from eos.tests.cache_generator.generator_testcase import GeneratorTestCase
+
+
+class FilteringDataHandler(BaseDataHandler):
+    """
+    Data handler which takes data from test data handler, and
+    filters out rows of types which are not requested.
+    """
+
+    def __init__(self, data_handler):
+        self.data = data_handler.data
+        # Format: {table name: type IDs}
+        self.requested = {}
+
+    def get_evetypes(self):
+        return self.data['evetypes']
+
+    def get_evegroups(self):
+        return self.data['evegroups']
+
+    def get_dgmattribs(self):
+        return self.data['dgmattribs']
+
+    def get_dgmtypeattribs(self, type_ids=None):
+        return self.__filter('dgmtypeattribs', type_ids)
+
+    def get_dgmeffects(self):
+        return self.data['dgmeffects']
+
+    def get_dgmtypeeffects(self, type_ids=None):
+        return self.__filter('dgmtypeeffects', type_ids)
+
+    def get_dgmexpressions(self):
+        return self.data['dgmexpressions']
+
+    def get_version(self):
+        return None
+
+    def __filter(self, table_name, type_ids):
+        self.requested[table_name] = type_ids
+        if type_ids is None:
+            return self.data[table_name]
+        return [row for row in self.data[table_name] if row['typeID'] in type_ids]
+
+
+class TestCleanupTypeFilter(GeneratorTestCase):
+    """
+    Check that rows of types which may survive cleanup are
+    requested from data handler, and the rest is not.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Strong type
+        self.dh.data['evetypes'].append({'typeID': 1, 'groupID': 1, 'typeName_en-us': ''})
+        self.dh.data['dgmtypeeffects'].append({'typeID': 1, 'effectID': 100, 'isDefault': False})
+        self.dh.data['dgmtypeeffects'].append({'typeID': 1, 'effectID': 101, 'isDefault': False})
+        # Types referred by expression via ID and via name
+        self.dh.data['evetypes'].append({'typeID': 2, 'groupID': 50, 'typeName_en-us': ''})
+        self.dh.data['evetypes'].append({'typeID': 3, 'groupID': 50, 'typeName_en-us': 'Type 3'})
+        self.dh.data['dgmeffects'].append({
+            'effectID': 100, 'effectCategory': 0, 'preExpression': 1,
+            'postExpression': 2, 'modifierInfo': None
+        })
+        self.dh.data['dgmexpressions'].append({
+            'expressionID': 1, 'operandID': Operand.def_type, 'arg1': None, 'arg2': None,
+            'expressionValue': None, 'expressionTypeID': 2, 'expressionGroupID': None,
+            'expressionAttributeID': None
+        })
+        self.dh.data['dgmexpressions'].append({
+            'expressionID': 2, 'operandID': Operand.def_type, 'arg1': None, 'arg2': None,
+            'expressionValue': 'Type3', 'expressionTypeID': None, 'expressionGroupID': None,
+            'expressionAttributeID': None
+        })
+        # Type referred by modifier info
+        self.dh.data['evetypes'].append({'typeID': 4, 'groupID': 50, 'typeName_en-us': ''})
+        self.dh.data['dgmeffects'].append({
+            'effectID': 101, 'effectCategory': 0, 'preExpression': None, 'postExpression': None,
+            'modifierInfo': (
+                '- domain: charID\n  func: OwnerRequiredSkillModifier\n  modifiedAttributeID: 5\n'
+                '  modifyingAttributeID: 6\n  operator: 6\n  skillTypeID: 4\n')
+        })
+        # Type nothing refers to
+        self.dh.data['evetypes'].append({'typeID': 5, 'groupID': 50, 'typeName_en-us': ''})
+        for type_id in range(1, 6):
+            self.dh.data['dgmtypeattribs'].append({'typeID': type_id, 'attributeID': 5, 'value': 1.0})
+        for attr_id in (5, 6):
+            self.dh.data['dgmattribs'].append({'attributeID': attr_id, 'maxAttributeID': None})
+
+    def test_requested(self):
+        data_handler = FilteringDataHandler(self.dh)
+        self.run_generator(data_handler=data_handler)
+        self.assertEqual(data_handler.requested, {
+            'dgmtypeattribs': {1, 2, 3, 4},
+            'dgmtypeeffects': {1, 2, 3, 4}
+        })
+        clean_stats = [record for record in self.log if record.name == 'eos.data.cache_generator.cleaner']
+        self.assertEqual(len(clean_stats), 1)
+        self.assertIn('0.0% from dgmtypeattribs', clean_stats[0].msg)
+
+    def test_same_output(self):
+        data_handler = FilteringDataHandler(self.dh)
+        filtered_data = self.run_generator(data_handler=data_handler)
+        self.assertEqual(filtered_data, self.run_generator())
+        self.assertIn(4, filtered_data['types'])
+        self.assertNotIn(5, filtered_data['types'])
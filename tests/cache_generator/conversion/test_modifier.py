@@ -22,6 +22,7 @@
 import logging
 from unittest.mock import patch
 
+from eos.data.cache_generator.modifier_info_cache import ModifierInfoCache
 from eos.tests.cache_generator.generator_testcase import GeneratorTestCase
 
 
@@ -284,9 +285,11 @@ class TestConversionModifier(GeneratorTestCase):
         # Check initialization
         name, args, kwargs = call1
         self.assertEqual(name, '')
-        self.assertEqual(len(args), 1)
+        self.assertEqual(len(args), 2)
         self.assertEqual(len(kwargs), 0)
         expressions = args[0]
+        # Modifier info YAML parsed by other stages is reused
+        self.assertIsInstance(args[1], ModifierInfoCache)
         # Expression order isn't stable in passed list, so verify
         # passed argument using membership check
         self.assertEqual(len(expressions), 2)
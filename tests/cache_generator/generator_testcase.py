@@ -36,13 +36,17 @@ class GeneratorTestCase(EosTestCase):
         super().setUp()
         self.dh = DataHandler()
 
-    def run_generator(self):
+    def run_generator(self, build_cache=None, data_handler=None):
         """
         Run generator and rework data structure into
         keyed tables so it's easier to check.
+
+        Optional arguments:
+        build_cache -- modifier build cache to pass to generator
+        data_handler -- data handler to use instead of default one
         """
         generator = CacheGenerator()
-        data = generator.run(self.dh)
+        data = generator.run(self.dh if data_handler is None else data_handler, build_cache)
         keys = {
             'types': 'type_id',
             'attributes': 'attribute_id',
@@ -0,0 +1,179 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import logging
+import os.path
+from tempfile import TemporaryDirectory
+
+from eos.const.eve import EffectCategory, Operand
+from eos.data.cache_generator import ModifierBuildCache
+from eos.tests.cache_generator.generator_testcase import GeneratorTestCase
+
+
+class TestIncremental(GeneratorTestCase):
+    """
+    Check that generation which reuses modifier builds from
+    previous generations gives the same result as full one.
+    """
+
+    def make_modinfo(self, tgt_attr, src_attr, operator):
+        return (
+            '- domain: shipID\n  func: ItemModifier\n  modifiedAttributeID: {}\n'
+            '  modifyingAttributeID: {}\n  operator: {}\n').format(tgt_attr, src_attr, operator)
+
+    def make_expression(self, expression_id, operand_id, arg1=None, arg2=None, value=None, attr_id=None):
+        self.dh.data['dgmexpressions'].append({
+            'expressionID': expression_id, 'operandID': operand_id, 'arg1': arg1, 'arg2': arg2,
+            'expressionValue': value, 'expressionTypeID': None, 'expressionGroupID': None,
+            'expressionAttributeID': attr_id
+        })
+
+    def make_effect(self, effect_id, category=EffectCategory.passive, pre=None, post=None, modinfo=None):
+        self.dh.data['dgmeffects'].append({
+            'effectID': effect_id, 'effectCategory': category, 'preExpression': pre,
+            'postExpression': post, 'modifierInfo': modinfo
+        })
+
+    def setUp(self):
+        super().setUp()
+        self.dh.data['evetypes'].append({'typeID': 1, 'groupID': 1, 'typeName_en-us': ''})
+        self.dh.data['evetypes'].append({'typeID': 2, 'groupID': 1, 'typeName_en-us': ''})
+        self.dh.data['dgmtypeeffects'].append({'typeID': 1, 'effectID': 100})
+        self.dh.data['dgmtypeeffects'].append({'typeID': 1, 'effectID': 101})
+        self.dh.data['dgmtypeeffects'].append({'typeID': 1, 'effectID': 102})
+        self.dh.data['dgmtypeeffects'].append({'typeID': 2, 'effectID': 100})
+        self.make_effect(100, modinfo=self.make_modinfo(9, 327, 6))
+        self.make_effect(101, pre=7, post=8)
+        self.make_effect(102, modinfo=self.make_modinfo(20, 30, 4) + self.make_modinfo(21, 31, 4))
+        self.make_expression(1, Operand.def_loc, value='Ship')
+        self.make_expression(2, Operand.def_attr, attr_id=9)
+        self.make_expression(3, Operand.def_optr, value='PostPercent')
+        self.make_expression(4, Operand.def_attr, attr_id=327)
+        self.make_expression(5, Operand.itm_attr, arg1=1, arg2=2)
+        self.make_expression(6, Operand.optr_tgt, arg1=3, arg2=5)
+        self.make_expression(7, Operand.add_itm_mod, arg1=6, arg2=4)
+        self.make_expression(8, Operand.rm_itm_mod, arg1=6, arg2=4)
+
+    def modify_data(self):
+        # Change modifier info of one effect
+        effect_row = self.dh.data['dgmeffects'][2]
+        effect_row['modifierInfo'] = self.make_modinfo(20, 30, 4) + self.make_modinfo(21, 32, 2)
+        # Change expression used by expression tree of another
+        self.dh.data['dgmexpressions'][3]['expressionAttributeID'] = 328
+        # Add new effect
+        self.make_effect(103, modinfo=self.make_modinfo(9, 327, 6))
+        self.dh.data['dgmtypeeffects'].append({'typeID': 2, 'effectID': 103})
+        # Shift positions of rows
+        self.dh.data['dgmexpressions'].reverse()
+        self.dh.data['dgmeffects'].reverse()
+
+    def test_same_as_full(self):
+        build_cache = ModifierBuildCache()
+        initial = self.run_generator(build_cache)
+        self.assertEqual(build_cache.built, 3)
+        self.assertEqual(build_cache.reused, 0)
+        # Effects 100 and 101 have the same modifier
+        self.assertEqual(len(initial['modifiers']), 3)
+        self.modify_data()
+        incremental = self.run_generator(build_cache)
+        # Effects 100 and 103 have the same data, thus
+        # both reuse build made for effect 100
+        self.assertEqual(build_cache.built, 2)
+        self.assertEqual(build_cache.reused, 2)
+        self.assertEqual(len(build_cache), 3)
+        full = self.run_generator()
+        self.assertEqual(incremental, full)
+        self.assertEqual(len(full['modifiers']), 4)
+
+    def test_unchanged(self):
+        build_cache = ModifierBuildCache()
+        initial = self.run_generator(build_cache)
+        incremental = self.run_generator(build_cache)
+        self.assertEqual(build_cache.built, 0)
+        self.assertEqual(build_cache.reused, 3)
+        self.assertEqual(incremental, initial)
+
+    def test_persistence(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'builds.json.bz2')
+            build_cache = ModifierBuildCache(path)
+            self.run_generator(build_cache)
+            build_cache.save()
+            self.modify_data()
+            build_cache = ModifierBuildCache(path)
+            self.assertEqual(len(build_cache), 3)
+            incremental = self.run_generator(build_cache)
+            self.assertEqual(build_cache.reused, 2)
+        full = self.run_generator()
+        self.assertEqual(incremental, full)
+
+    def get_build_log(self):
+        return [
+            (record.levelno, record.getMessage()) for record in self.log
+            if record.name.startswith('eos.data.cache_generator.modifier_builder')]
+
+    def test_log_replayed(self):
+        # Broken modifier info, its build is logged
+        self.make_effect(104, modinfo='- {')
+        self.dh.data['dgmtypeeffects'].append({'typeID': 2, 'effectID': 104})
+        self.run_generator()
+        full_log = self.get_build_log()
+        self.assertIn((logging.ERROR, 'failed to parse modifier info YAML for effect 104'), full_log)
+        build_cache = ModifierBuildCache()
+        self.log.clear()
+        self.run_generator(build_cache)
+        self.assertEqual(self.get_build_log(), full_log)
+        self.log.clear()
+        self.run_generator(build_cache)
+        self.assertEqual(build_cache.built, 0)
+        self.assertEqual(self.get_build_log(), full_log)
+
+    def test_log_identical_effects(self):
+        # Effects with the same data are logged
+        # under their own IDs when reused
+        self.make_effect(104, modinfo='- {')
+        self.make_effect(105, modinfo='- {')
+        self.dh.data['dgmtypeeffects'].append({'typeID': 2, 'effectID': 104})
+        self.dh.data['dgmtypeeffects'].append({'typeID': 2, 'effectID': 105})
+        build_cache = ModifierBuildCache()
+        self.run_generator(build_cache)
+        full_log = self.get_build_log()
+        self.assertIn((logging.ERROR, 'failed to parse modifier info YAML for effect 104'), full_log)
+        self.assertIn((logging.ERROR, 'failed to parse modifier info YAML for effect 105'), full_log)
+        self.log.clear()
+        self.run_generator(build_cache)
+        self.assertEqual(build_cache.built, 0)
+        self.assertEqual(self.get_build_log(), full_log)
+
+    def test_log_persistence(self):
+        self.make_effect(104, modinfo='- {')
+        self.dh.data['dgmtypeeffects'].append({'typeID': 2, 'effectID': 104})
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'builds.json.bz2')
+            build_cache = ModifierBuildCache(path)
+            self.run_generator(build_cache)
+            full_log = self.get_build_log()
+            build_cache.save()
+            build_cache = ModifierBuildCache(path)
+            self.log.clear()
+            self.run_generator(build_cache)
+            self.assertEqual(build_cache.reused, 4)
+        self.assertEqual(self.get_build_log(), full_log)
@@ -0,0 +1,104 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import json
+
+from eos.const.eve import EffectCategory, Operand
+from eos.data.cache_generator import CacheGenerator
+from eos.data.cache_generator.generator import TABLE_NAMES
+from eos.tests.cache_generator.environment import DataHandler
+from eos.tests.cache_generator.generator_testcase import GeneratorTestCase
+
+
+class IoBoundDataHandler(DataHandler):
+    """Test data handler whose tables are loaded in threads."""
+
+    io_bound = True
+
+
+class TestParallel(GeneratorTestCase):
+    """
+    Check that generation in pool of processes gives
+    the same result as serial one.
+    """
+
+    def make_modinfo(self, tgt_attr, src_attr, operator):
+        return (
+            '- domain: shipID\n  func: ItemModifier\n  modifiedAttributeID: {}\n'
+            '  modifyingAttributeID: {}\n  operator: {}\n').format(tgt_attr, src_attr, operator)
+
+    def make_expression(self, expression_id, operand_id, arg1=None, arg2=None, value=None, attr_id=None):
+        self.dh.data['dgmexpressions'].append({
+            'expressionID': expression_id, 'operandID': operand_id, 'arg1': arg1, 'arg2': arg2,
+            'expressionValue': value, 'expressionTypeID': None, 'expressionGroupID': None,
+            'expressionAttributeID': attr_id
+        })
+
+    def setUp(self):
+        super().setUp()
+        self.dh.data['evetypes'].append({'typeID': 1, 'groupID': 1, 'typeName_en-us': ''})
+        self.make_expression(1, Operand.def_loc, value='Ship')
+        self.make_expression(2, Operand.def_attr, attr_id=9)
+        self.make_expression(3, Operand.def_optr, value='PostPercent')
+        self.make_expression(4, Operand.def_attr, attr_id=327)
+        self.make_expression(5, Operand.itm_attr, arg1=1, arg2=2)
+        self.make_expression(6, Operand.optr_tgt, arg1=3, arg2=5)
+        self.make_expression(7, Operand.add_itm_mod, arg1=6, arg2=4)
+        self.make_expression(8, Operand.rm_itm_mod, arg1=6, arg2=4)
+        for effect_id in range(100, 140):
+            if effect_id % 3 == 0:
+                effect_row = {'preExpression': 7, 'postExpression': 8, 'modifierInfo': None}
+            elif effect_id % 7 == 0:
+                # Broken modifier info, its build is logged
+                effect_row = {'preExpression': None, 'postExpression': None, 'modifierInfo': '- {'}
+            else:
+                effect_row = {
+                    'preExpression': None, 'postExpression': None,
+                    'modifierInfo': self.make_modinfo(effect_id % 5 + 10, effect_id, 6)}
+            effect_row.update({'effectID': effect_id, 'effectCategory': EffectCategory.passive})
+            self.dh.data['dgmeffects'].append(effect_row)
+            self.dh.data['dgmtypeeffects'].append({'typeID': 1, 'effectID': effect_id})
+
+    def generate(self, processes, data_handler=None):
+        self.log.clear()
+        generator = CacheGenerator(processes=processes)
+        data = generator.run(self.dh if data_handler is None else data_handler)
+        self.assertEqual(tuple(generator.table_timings), TABLE_NAMES)
+        log = [(record.levelno, record.getMessage()) for record in self.log]
+        return json.dumps(data, sort_keys=True), log
+
+    def test_same_as_serial(self):
+        serial_data, serial_log = self.generate(1)
+        parallel_data, parallel_log = self.generate(3)
+        self.assertEqual(parallel_data, serial_data)
+        self.assertEqual(parallel_log, serial_log)
+        # Failed builds are reported in effect ID order
+        self.assertEqual(
+            [msg for _, msg in serial_log if 'YAML' in msg],
+            ['failed to parse modifier info YAML for effect {}'.format(i) for i in (112, 119, 133)])
+
+    def test_threads_same_as_serial(self):
+        serial_data, serial_log = self.generate(1)
+        data_handler = IoBoundDataHandler()
+        data_handler.data = self.dh.data
+        threaded_data, threaded_log = self.generate(3, data_handler)
+        self.assertEqual(threaded_data, serial_data)
+        self.assertEqual(threaded_log, serial_log)
@@ -0,0 +1,75 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import yaml
+
+from eos.const.eve import EffectCategory
+from eos.data.cache_generator import CacheGenerator
+from eos.data.cache_generator.modifier_info_cache import ModifierInfoCache
+from eos.tests.cache_generator.generator_testcase import GeneratorTestCase
+
+
+class TestModifierInfoCache(GeneratorTestCase):
+
+    def make_modinfo(self, tgt_attr):
+        return (
+            '- domain: shipID\n  func: ItemModifier\n  modifiedAttributeID: {}\n'
+            '  modifyingAttributeID: 5\n  operator: 6\n').format(tgt_attr)
+
+    def test_memoized(self):
+        modinfo_cache = ModifierInfoCache()
+        data = modinfo_cache.get(self.make_modinfo(9))
+        self.assertEqual(data, [{
+            'domain': 'shipID', 'func': 'ItemModifier', 'modifiedAttributeID': 9,
+            'modifyingAttributeID': 5, 'operator': 6}])
+        self.assertIs(modinfo_cache.get(self.make_modinfo(9)), data)
+        self.assertEqual(modinfo_cache.misses, 1)
+        self.assertEqual(modinfo_cache.hits, 1)
+        self.assertEqual(len(modinfo_cache), 1)
+        self.assertEqual(len(self.log), 0)
+
+    def test_error(self):
+        modinfo_cache = ModifierInfoCache()
+        for _ in range(2):
+            with self.assertRaises(yaml.YAMLError):
+                modinfo_cache.get('- {')
+        self.assertEqual(modinfo_cache.misses, 1)
+        self.assertEqual(modinfo_cache.hits, 1)
+        self.assertEqual(len(self.log), 0)
+
+    def test_shared_by_stages(self):
+        self.dh.data['evetypes'].append({'typeID': 1, 'groupID': 1, 'typeName_en-us': ''})
+        for effect_id in (100, 101):
+            self.dh.data['dgmtypeeffects'].append({'typeID': 1, 'effectID': effect_id})
+            self.dh.data['dgmeffects'].append({
+                'effectID': effect_id, 'effectCategory': EffectCategory.passive, 'preExpression': None,
+                'postExpression': None, 'modifierInfo': self.make_modinfo(9)})
+        generator = CacheGenerator()
+        data = generator.run(self.dh)
+        self.assertEqual(len(data['modifiers']), 1)
+        # Cleaner and modifier builder request YAML of each effect
+        modinfo_cache = generator.modinfo_cache
+        self.assertEqual(modinfo_cache.misses, 1)
+        self.assertEqual(modinfo_cache.hits, 3)
+        self.assertEqual(
+            tuple(generator.stage_timings),
+            ('fetch', 'pre_cleanup', 'normalize', 'clean', 'pre_convert', 'convert'))
+        self.assertEqual(len(self.log), 2)
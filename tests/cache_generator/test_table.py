@@ -0,0 +1,91 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from eos.data.cache_generator.table import Table
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestTable(EosTestCase):
+
+    def make_table(self):
+        table = Table(('typeID', 'effectID'))
+        self.row1 = {'typeID': 1, 'effectID': 10}
+        self.row2 = {'typeID': 1, 'effectID': 11}
+        self.row3 = {'typeID': 2, 'effectID': 10, 'extra': [1]}
+        table.update((self.row1, self.row2, self.row3))
+        return table
+
+    def test_find(self):
+        table = self.make_table()
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.find('typeID', 1), [self.row1, self.row2])
+        self.assertEqual(table.find('effectID', 10), [self.row1, self.row3])
+        self.assertEqual(table.find('typeID', 3), [])
+        self.assertEqual(set(table.get_values('typeID')), {1, 2})
+        self.assertEqual(len(self.log), 0)
+
+    def test_identity(self):
+        table = self.make_table()
+        # Equal rows are still different rows
+        row = dict(self.row1)
+        self.assertNotIn(row, table)
+        table.add(row)
+        table.add(row)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(table.find('typeID', 1), [self.row1, self.row2, row])
+        self.assertEqual(len(self.log), 0)
+
+    def test_remove(self):
+        table = self.make_table()
+        table.remove(self.row1)
+        self.assertNotIn(self.row1, table)
+        self.assertEqual(list(table), [self.row2, self.row3])
+        self.assertEqual(table.find('effectID', 10), [self.row3])
+        table.difference_update((self.row1, self.row2))
+        self.assertEqual(set(table.get_values('typeID')), {2})
+        with self.assertRaises(KeyError):
+            table.remove(self.row1)
+        self.assertEqual(len(self.log), 0)
+
+    def test_set_field(self):
+        table = self.make_table()
+        table.set_field(self.row1, 'typeID', 2)
+        table.set_field(self.row1, 'extra', None)
+        self.assertEqual(table.find('typeID', 1), [self.row2])
+        self.assertEqual(table.find('typeID', 2), [self.row3, self.row1])
+        self.assertIsNone(self.row1['extra'])
+        self.assertEqual(len(self.log), 0)
+
+    def test_unhashable(self):
+        table = Table(('typeID',))
+        row = {'typeID': [1]}
+        table.add(row)
+        self.assertIn(row, table)
+        self.assertEqual(table.find('typeID', [1]), [])
+        table.remove(row)
+        self.assertEqual(len(table), 0)
+        self.assertEqual(len(self.log), 0)
+
+    def test_make_empty(self):
+        table = self.make_table().make_empty()
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.indexed_fields, ('typeID', 'effectID'))
+        self.assertEqual(len(self.log), 0)
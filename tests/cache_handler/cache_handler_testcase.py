@@ -0,0 +1,129 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import os.path
+from tempfile import TemporaryDirectory
+
+from eos.tests.eos_testcase import EosTestCase
+
+
+class CacheHandlerTestCase(EosTestCase):
+    """
+    Additional functionality provided:
+
+    self.cache_dir -- path to temporary directory, which
+    is removed after test
+    self.make_data -- compose data in the format which is
+    returned by cache generator
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.__tmp_dir = TemporaryDirectory()
+        self.cache_dir = self.__tmp_dir.name
+
+    def tearDown(self):
+        self.__tmp_dir.cleanup()
+        super().tearDown()
+
+    def cache_path(self, file_name):
+        return os.path.join(self.cache_dir, file_name)
+
+    def make_data(self):
+        return {
+            'types': [
+                {
+                    'type_id': 1, 'group': 6, 'category': 16,
+                    'attributes': {5: 10.5, 6: 3}, 'effects': [111, 112],
+                    'default_effect': 112
+                },
+                {
+                    'type_id': 2, 'group': 7, 'category': None,
+                    'attributes': {}, 'effects': [], 'default_effect': None
+                }
+            ],
+            'attributes': [
+                {
+                    'attribute_id': 5, 'max_attribute': 6, 'default_value': 0.5,
+                    'high_is_good': True, 'stackable': False
+                },
+                {
+                    'attribute_id': 6, 'max_attribute': None, 'default_value': None,
+                    'high_is_good': None, 'stackable': True
+                }
+            ],
+            'effects': [
+                {
+                    'effect_id': 111, 'effect_category': 0, 'is_offensive': False,
+                    'is_assistance': None, 'duration_attribute': 5, 'discharge_attribute': None,
+                    'range_attribute': 6, 'falloff_attribute': None, 'tracking_speed_attribute': None,
+                    'fitting_usage_chance_attribute': None, 'build_status': 4, 'modifiers': [1, 2]
+                },
+                {
+                    'effect_id': 112, 'effect_category': 1, 'is_offensive': True,
+                    'is_assistance': False, 'duration_attribute': None, 'discharge_attribute': None,
+                    'range_attribute': None, 'falloff_attribute': None, 'tracking_speed_attribute': None,
+                    'fitting_usage_chance_attribute': None, 'build_status': 3, 'modifiers': [2]
+                }
+            ],
+            'modifiers': [
+                {
+                    'modifier_id': 1, 'state': 1, 'scope': 1, 'src_attr': 5, 'operator': 4,
+                    'tgt_attr': 6, 'domain': 3, 'filter_type': None, 'filter_value': None
+                },
+                {
+                    'modifier_id': 2, 'state': 3, 'scope': 1, 'src_attr': 6, 'operator': 2,
+                    'tgt_attr': 5, 'domain': 7, 'filter_type': 3, 'filter_value': 3300
+                }
+            ]
+        }
+
+    def assert_handler_data(self, cache_handler):
+        """Check that handler serves data composed by make_data()."""
+        type_ = cache_handler.get_type(1)
+        self.assertEqual(type_.id, 1)
+        self.assertEqual(type_.group, 6)
+        self.assertEqual(type_.category, 16)
+        self.assertEqual(type_.attributes, {5: 10.5, 6: 3})
+        self.assertEqual(tuple(e.id for e in type_.effects), (111, 112))
+        self.assertIs(type_.default_effect, cache_handler.get_effect(112))
+        effect = cache_handler.get_effect(111)
+        self.assertEqual(effect.category, 0)
+        self.assertIs(effect.is_offensive, False)
+        self.assertIsNone(effect.is_assistance)
+        self.assertEqual(effect.duration_attribute, 5)
+        self.assertEqual(effect.range_attribute, 6)
+        self.assertEqual(effect.build_status, 4)
+        self.assertEqual(tuple(m.id for m in effect.modifiers), (1, 2))
+        modifier = cache_handler.get_modifier(2)
+        self.assertEqual(modifier.state, 3)
+        self.assertEqual(modifier.scope, 1)
+        self.assertEqual(modifier.src_attr, 6)
+        self.assertEqual(modifier.operator, 2)
+        self.assertEqual(modifier.tgt_attr, 5)
+        self.assertEqual(modifier.domain, 7)
+        self.assertEqual(modifier.filter_type, 3)
+        self.assertEqual(modifier.filter_value, 3300)
+        attribute = cache_handler.get_attribute(5)
+        self.assertEqual(attribute.max_attribute, 6)
+        self.assertEqual(attribute.default_value, 0.5)
+        self.assertIs(attribute.high_is_good, True)
+        self.assertIs(attribute.stackable, False)
@@ -0,0 +1,96 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler
+from eos.data.cache_handler.exception import TypeFetchError, ModifierFetchError
+from eos.tests.cache_handler.cache_handler_testcase import CacheHandlerTestCase
+
+
+class TestBinaryCacheHandler(CacheHandlerTestCase):
+
+    def test_no_cache(self):
+        cache_handler = BinaryCacheHandler(self.cache_path('cache.bin'))
+        self.assertIsNone(cache_handler.get_fingerprint())
+        self.assertRaises(TypeFetchError, cache_handler.get_type, 1)
+        self.assertEqual(len(self.log), 0)
+
+    def test_update(self):
+        cache_handler = BinaryCacheHandler(self.cache_path('cache.bin'))
+        cache_handler.update_cache(self.make_data(), 'fp')
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        self.assert_handler_data(cache_handler)
+        self.assertEqual(len(self.log), 0)
+
+    def test_reload(self):
+        path = self.cache_path('cache.bin')
+        BinaryCacheHandler(path).update_cache(self.make_data(), 'fp')
+        cache_handler = BinaryCacheHandler(path)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        self.assert_handler_data(cache_handler)
+        self.assertEqual(len(self.log), 0)
+
+    def test_old_reader(self):
+        cache_handler = BinaryCacheHandler(self.cache_path('cache.bin'))
+        cache_handler.update_cache(self.make_data(), 'fp1')
+        # Thread which has taken reader before update
+        # keeps reading records of old data
+        reader = cache_handler._reader
+        record = reader.get_record('types', 1)
+        data = self.make_data()
+        data['types'][0]['group'] = 66
+        cache_handler.update_cache(data, 'fp2')
+        self.assertEqual(reader.get_record('types', 1), record)
+        self.assertNotEqual(cache_handler._reader.get_record('types', 1), record)
+        self.assertEqual(cache_handler.get_type(1).group, 66)
+        self.assertEqual(len(self.log), 0)
+
+    def test_missing_record(self):
+        cache_handler = BinaryCacheHandler(self.cache_path('cache.bin'))
+        cache_handler.update_cache(self.make_data(), 'fp')
+        self.assertRaises(TypeFetchError, cache_handler.get_type, 3)
+        self.assertRaises(TypeFetchError, cache_handler.get_type, 0)
+        self.assertRaises(ModifierFetchError, cache_handler.get_modifier, 111)
+        self.assertEqual(len(self.log), 0)
+
+    def test_object_reuse(self):
+        cache_handler = BinaryCacheHandler(self.cache_path('cache.bin'))
+        cache_handler.update_cache(self.make_data(), 'fp')
+        type_ = cache_handler.get_type(1)
+        self.assertIs(cache_handler.get_type(1), type_)
+        self.assertIs(type_.effects[0].modifiers[1], type_.effects[1].modifiers[0])
+
+    def test_corrupted(self):
+        path = self.cache_path('cache.bin')
+        with open(path, 'wb') as file:
+            file.write(b'garbage data')
+        cache_handler = BinaryCacheHandler(path)
+        self.assertIsNone(cache_handler.get_fingerprint())
+        self.assertRaises(TypeFetchError, cache_handler.get_type, 1)
+        self.assertEqual(len(self.log), 1)
+
+    def test_import_json(self):
+        json_path = self.cache_path('cache.json.bz2')
+        JsonCacheHandler(json_path).update_cache(self.make_data(), 'fp_json')
+        cache_handler = BinaryCacheHandler(self.cache_path('cache.bin'))
+        cache_handler.import_json_cache(json_path)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp_json')
+        self.assert_handler_data(cache_handler)
+        self.assertEqual(len(self.log), 0)
@@ -0,0 +1,141 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+import gc
+
+from eos.data.cache_handler import BinaryCacheHandler, CacheInterner, JsonCacheHandler
+from eos.tests.cache_handler.cache_handler_testcase import CacheHandlerTestCase
+
+
+class TestInterner(CacheHandlerTestCase):
+
+    def make_handlers(self, interner, data_other):
+        handler1 = JsonCacheHandler(self.cache_path('cache1.json.bz2'), interner=interner)
+        handler1.update_cache(self.make_data(), 'fp1')
+        handler2 = BinaryCacheHandler(self.cache_path('cache2.bin'), interner=interner)
+        handler2.update_cache(data_other, 'fp2')
+        return handler1, handler2
+
+    def test_identical(self):
+        interner = CacheInterner()
+        handler1, handler2 = self.make_handlers(interner, self.make_data())
+        type1 = handler1.get_type(1)
+        self.assertIs(handler2.get_type(1), type1)
+        self.assertIs(handler2.get_effect(111), type1.effects[0])
+        self.assertIs(handler2.get_modifier(2), handler1.get_modifier(2))
+        self.assertIs(handler2.get_attribute(5), handler1.get_attribute(5))
+        self.assert_handler_data(handler1)
+        self.assert_handler_data(handler2)
+        self.assertEqual(len(self.log), 0)
+
+    def test_different_modifier(self):
+        interner = CacheInterner()
+        data = self.make_data()
+        data['modifiers'][1]['operator'] = 3
+        handler1, handler2 = self.make_handlers(interner, data)
+        # Change propagates to everything which refers modifier
+        self.assertIsNot(handler2.get_modifier(2), handler1.get_modifier(2))
+        self.assertEqual(handler2.get_modifier(2).operator, 3)
+        self.assertIsNot(handler2.get_effect(112), handler1.get_effect(112))
+        self.assertIsNot(handler2.get_type(1), handler1.get_type(1))
+        # Untouched objects are still shared
+        self.assertIs(handler2.get_modifier(1), handler1.get_modifier(1))
+        self.assertIs(handler2.get_type(2), handler1.get_type(2))
+        self.assertEqual(len(self.log), 0)
+
+    def test_records(self):
+        interner = CacheInterner()
+        path = self.cache_path('cache.json.bz2')
+        JsonCacheHandler(path).update_cache(self.make_data(), 'fp')
+        handler1 = JsonCacheHandler(path, interner=interner)
+        handler2 = JsonCacheHandler(path, interner=interner)
+        self.assertIs(handler2._get_type_record(1), handler1._get_type_record(1))
+        self.assertEqual(handler1.get_group_type_ids(6), (1,))
+        self.assert_handler_data(handler2)
+        self.assertEqual(len(self.log), 0)
+
+    def test_stats(self):
+        interner = CacheInterner()
+        handler1, handler2 = self.make_handlers(interner, self.make_data())
+        type1 = handler1.get_type(1)
+        type2 = handler2.get_type(1)
+        stats = interner.get_stats()
+        # Type, 2 effects and 2 modifiers are assembled once
+        self.assertEqual(stats.misses, 5)
+        self.assertEqual(stats.hits, 5)
+        self.assertEqual(stats.objects, 5)
+        self.assertGreater(stats.records, 0)
+        self.assertEqual(len(self.log), 0)
+
+    def test_objects_released(self):
+        interner = CacheInterner()
+        handler1, handler2 = self.make_handlers(interner, self.make_data())
+        handler1.get_type(1)
+        handler2.get_type(1)
+        # Handlers keep only modifiers alive, until
+        # their object cache is cleared
+        self.assertEqual(interner.get_stats().objects, 2)
+        handler1._clear_object_cache()
+        handler2._clear_object_cache()
+        self.assertEqual(interner.get_stats().objects, 0)
+        self.assertEqual(len(self.log), 0)
+
+    def test_value_types(self):
+        interner = CacheInterner()
+        data1 = self.make_data()
+        data1['attributes'][0]['default_value'] = 1.0
+        data2 = self.make_data()
+        data2['attributes'][0]['default_value'] = 1
+        handler1 = JsonCacheHandler(self.cache_path('cache1.json.bz2'), interner=interner)
+        handler1.update_cache(data1, 'fp1')
+        handler2 = JsonCacheHandler(self.cache_path('cache2.json.bz2'), interner=interner)
+        handler2.update_cache(data2, 'fp2')
+        # Values which are equal, but have different types, are not merged
+        self.assertIsNot(handler2._get_attribute_record(5), handler1._get_attribute_record(5))
+        self.assertIsNot(handler2.get_attribute(5), handler1.get_attribute(5))
+        self.assertIs(type(handler1.get_attribute(5).default_value), float)
+        self.assertIs(type(handler2.get_attribute(5).default_value), int)
+        self.assertIs(handler2.get_attribute(6), handler1.get_attribute(6))
+        self.assertEqual(len(self.log), 0)
+
+    def test_records_released(self):
+        interner = CacheInterner()
+        handler1 = JsonCacheHandler(self.cache_path('cache1.json.bz2'), interner=interner)
+        handler1.update_cache(self.make_data(), 'fp1')
+        handler2 = JsonCacheHandler(self.cache_path('cache2.json.bz2'), interner=interner)
+        handler2.update_cache(self.make_data(), 'fp2')
+        records = interner.get_stats().records
+        self.assertGreater(records, 0)
+        # Records of replaced data are released, unless
+        # other handler still uses them
+        data = self.make_data()
+        data['modifiers'][1]['operator'] = 3
+        handler1.update_cache(data, 'fp3')
+        self.assertEqual(interner.get_stats().records, records + 1)
+        handler2.update_cache(data, 'fp4')
+        self.assertEqual(interner.get_stats().records, records)
+        # Records are released when handlers are gone
+        del handler1
+        gc.collect()
+        self.assertEqual(interner.get_stats().records, records)
+        del handler2
+        gc.collect()
+        self.assertEqual(interner.get_stats().records, 0)
+        self.assertEqual(len(self.log), 0)
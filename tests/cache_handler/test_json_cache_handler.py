@@ -0,0 +1,158 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import bz2
+import json
+import os
+from unittest.mock import patch
+
+from eos.data.cache_handler import JsonCacheHandler
+from eos.data.cache_handler.exception import TypeFetchError
+from eos.data.cache_handler.json_cache_handler import read_json_cache
+from eos.data.cache_handler.record_handler import strip_data
+from eos.tests.cache_handler.cache_handler_testcase import CacheHandlerTestCase
+
+
+@patch('eos.data.cache_handler.json_cache_handler.read_json_cache', wraps=read_json_cache)
+class TestJsonCacheHandler(CacheHandlerTestCase):
+
+    def test_no_cache(self, reader):
+        cache_handler = JsonCacheHandler(self.cache_path('cache.json.bz2'))
+        self.assertIsNone(cache_handler.get_fingerprint())
+        self.assertRaises(TypeFetchError, cache_handler.get_type, 1)
+        self.assertEqual(reader.call_count, 0)
+        self.assertEqual(len(self.log), 0)
+
+    def test_update(self, reader):
+        cache_handler = JsonCacheHandler(self.cache_path('cache.json.bz2'))
+        cache_handler.update_cache(self.make_data(), 'fp')
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        self.assert_handler_data(cache_handler)
+        self.assertEqual(reader.call_count, 0)
+        self.assertEqual(len(self.log), 0)
+
+    def test_fingerprint_from_meta(self, reader):
+        path = self.cache_path('cache.json.bz2')
+        JsonCacheHandler(path).update_cache(self.make_data(), 'fp')
+        cache_handler = JsonCacheHandler(path)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        self.assertEqual(
+            cache_handler.get_record_counts(),
+            {'types': 2, 'attributes': 2, 'effects': 2, 'modifiers': 2})
+        # Body is not needed for any of the calls above
+        self.assertEqual(reader.call_count, 0)
+        self.assert_handler_data(cache_handler)
+        self.assertEqual(reader.call_count, 1)
+        self.assertEqual(len(self.log), 0)
+
+    def test_fingerprint_no_meta(self, reader):
+        path = self.cache_path('cache.json.bz2')
+        JsonCacheHandler(path).update_cache(self.make_data(), 'fp')
+        os.remove('{}.meta'.format(path))
+        cache_handler = JsonCacheHandler(path)
+        self.assertEqual(reader.call_count, 0)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        self.assertEqual(reader.call_count, 1)
+        self.assert_handler_data(cache_handler)
+        self.assertEqual(reader.call_count, 1)
+        self.assertEqual(len(self.log), 0)
+
+    def rewrite_meta(self, path, **changes):
+        meta_path = '{}.meta'.format(path)
+        with open(meta_path) as file:
+            meta = json.load(file)
+        meta.update(changes)
+        with open(meta_path, 'w') as file:
+            json.dump(meta, file)
+
+    def test_meta_counts_mismatch(self, reader):
+        path = self.cache_path('cache.json.bz2')
+        JsonCacheHandler(path).update_cache(self.make_data(), 'fp')
+        self.rewrite_meta(path, counts={'types': 5})
+        cache_handler = JsonCacheHandler(path)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        # Mismatch is found once body is loaded, and then
+        # cache is not used
+        self.assertRaises(TypeFetchError, cache_handler.get_type, 1)
+        self.assertIsNone(cache_handler.get_fingerprint())
+        self.assertEqual(len(self.log), 1)
+
+    def test_meta_fingerprint_mismatch(self, reader):
+        path = self.cache_path('cache.json.bz2')
+        JsonCacheHandler(path).update_cache(self.make_data(), 'fp')
+        self.rewrite_meta(path, fingerprint='fp2')
+        cache_handler = JsonCacheHandler(path)
+        self.assertRaises(TypeFetchError, cache_handler.get_type, 1)
+        self.assertIsNone(cache_handler.get_fingerprint())
+        self.assertEqual(len(self.log), 1)
+
+    def test_meta_stale(self, reader):
+        path = self.cache_path('cache.json.bz2')
+        JsonCacheHandler(path).update_cache(self.make_data(), 'fp')
+        meta_path = '{}.meta'.format(path)
+        with open(meta_path) as file:
+            meta = file.read()
+        # Body is replaced, while metadata of old body is left
+        JsonCacheHandler(path, codec='none').update_cache(self.make_data(), 'fp2')
+        with open(meta_path, 'w') as file:
+            file.write(meta)
+        cache_handler = JsonCacheHandler(path)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp2')
+        self.assertEqual(reader.call_count, 1)
+        self.assert_handler_data(cache_handler)
+        self.assertEqual(len(self.log), 0)
+
+    def test_meta_without_stamp(self, reader):
+        path = self.cache_path('cache.json.bz2')
+        JsonCacheHandler(path).update_cache(self.make_data(), 'fp')
+        with open('{}.meta'.format(path), 'w') as file:
+            json.dump({'fingerprint': 'fp2', 'counts': {'types': 2}}, file)
+        cache_handler = JsonCacheHandler(path)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        self.assert_handler_data(cache_handler)
+        self.assertEqual(len(self.log), 0)
+
+    def test_codecs(self, reader):
+        for codec in ('none', 'gzip', 'lzma', 'bz2'):
+            path = self.cache_path('cache_{}.json'.format(codec))
+            JsonCacheHandler(path, codec=codec).update_cache(self.make_data(), 'fp_{}'.format(codec))
+            # Codec is detected when reading
+            cache_handler = JsonCacheHandler(path)
+            self.assert_handler_data(cache_handler)
+            self.assertEqual(cache_handler.get_fingerprint(), 'fp_{}'.format(codec))
+        self.assertEqual(reader.call_count, 4)
+        self.assertEqual(len(self.log), 0)
+
+    def test_unknown_codec(self, reader):
+        with self.assertRaises(ValueError):
+            JsonCacheHandler(self.cache_path('cache.json'), codec='zip')
+
+    def test_single_object_format(self, reader):
+        # Caches written as single JSON object are still readable
+        path = self.cache_path('cache.json.bz2')
+        data = strip_data(self.make_data())
+        data['fingerprint'] = 'fp'
+        with bz2.BZ2File(path, 'w') as file:
+            file.write(json.dumps(data).encode('utf-8'))
+        cache_handler = JsonCacheHandler(path)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        self.assert_handler_data(cache_handler)
+        self.assertEqual(len(self.log), 0)
@@ -0,0 +1,96 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from eos.data.cache_handler import JsonCacheHandler
+from eos.data.cache_handler.object_cache import ObjectCache
+from eos.tests.cache_handler.cache_handler_testcase import CacheHandlerTestCase
+
+
+class Obj:
+    pass
+
+
+class TestObjectCache(CacheHandlerTestCase):
+
+    def test_weak_only(self):
+        cache = ObjectCache()
+        obj = Obj()
+        cache.add(1, obj, 0.5)
+        self.assertIs(cache.get(1), obj)
+        del obj
+        self.assertRaises(KeyError, cache.get, 1)
+        self.assertEqual(cache.get_stats(), (1, 1, 0, 0.5, 0))
+
+    def test_strong_keeps_alive(self):
+        cache = ObjectCache(2)
+        cache.add(1, Obj(), 0)
+        cache.add(2, Obj(), 0)
+        self.assertIsInstance(cache.get(1), Obj)
+        self.assertIsInstance(cache.get(2), Obj)
+        stats = cache.get_stats()
+        self.assertEqual(stats.hits, 2)
+        self.assertEqual(stats.misses, 0)
+        self.assertEqual(stats.size, 2)
+
+    def test_strong_eviction(self):
+        cache = ObjectCache(2)
+        cache.add(1, Obj(), 0)
+        cache.add(2, Obj(), 0)
+        # Touch first object, so that second one is least recently used
+        cache.get(1)
+        cache.add(3, Obj(), 0)
+        self.assertRaises(KeyError, cache.get, 2)
+        self.assertIsInstance(cache.get(1), Obj)
+        self.assertIsInstance(cache.get(3), Obj)
+        stats = cache.get_stats()
+        self.assertEqual(stats.evictions, 1)
+        self.assertEqual(stats.size, 2)
+
+    def test_evicted_referenced(self):
+        cache = ObjectCache(1)
+        obj = Obj()
+        cache.add(1, obj, 0)
+        cache.add(2, Obj(), 0)
+        # Object is still referenced, thus weak tier serves it
+        self.assertIs(cache.get(1), obj)
+
+    def test_clear(self):
+        cache = ObjectCache(2)
+        cache.add(1, Obj(), 0.25)
+        cache.clear()
+        self.assertRaises(KeyError, cache.get, 1)
+        self.assertEqual(cache.get_stats(), (0, 1, 0, 0.25, 0))
+
+    def test_handler(self):
+        cache_handler = JsonCacheHandler(self.cache_path('cache.json.bz2'), object_cache_size=1)
+        cache_handler.update_cache(self.make_data(), 'fp')
+        type_id = id(cache_handler.get_type(1))
+        # Type is dropped by caller, but is kept by strong tier
+        self.assertEqual(id(cache_handler.get_type(1)), type_id)
+        stats = cache_handler.get_object_cache_stats()
+        self.assertEqual(stats['types'].hits, 1)
+        self.assertEqual(stats['types'].misses, 1)
+        self.assertEqual(stats['types'].size, 1)
+        self.assertEqual(stats['effects'].misses, 2)
+        self.assertEqual(stats['modifiers'].misses, 2)
+        self.assertEqual(stats['modifiers'].hits, 1)
+        self.assertGreater(stats['types'].build_time, 0)
+        self.assertEqual(len(self.log), 0)
@@ -0,0 +1,164 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import multiprocessing
+import os
+import uuid
+from multiprocessing import resource_tracker
+from unittest import skipUnless
+
+from eos.data.cache_handler import BinaryCacheHandler, SharedMemoryCacheHandler
+from eos.data.cache_handler.exception import TypeFetchError
+from eos.tests.cache_handler.cache_handler_testcase import CacheHandlerTestCase
+
+
+def fetch_in_worker(name, queue):
+    cache_handler = SharedMemoryCacheHandler(name)
+    type_ = cache_handler.get_type(1)
+    queue.put((cache_handler.get_fingerprint(), type_.group, tuple(e.id for e in type_.effects)))
+    cache_handler.close()
+
+
+class TestSharedMemoryCacheHandler(CacheHandlerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.name = 'eos_test_{}'.format(uuid.uuid4().hex[:16])
+        self.publisher = SharedMemoryCacheHandler(self.name)
+
+    def tearDown(self):
+        self.publisher.unlink()
+        super().tearDown()
+
+    def test_no_block(self):
+        self.assertIsNone(self.publisher.get_fingerprint())
+        self.assertRaises(TypeFetchError, self.publisher.get_type, 1)
+        self.assertEqual(len(self.log), 0)
+
+    def test_update(self):
+        self.publisher.update_cache(self.make_data(), 'fp')
+        self.assertEqual(self.publisher.get_fingerprint(), 'fp')
+        self.assert_handler_data(self.publisher)
+        self.assertEqual(len(self.log), 0)
+
+    def test_attach(self):
+        self.publisher.update_cache(self.make_data(), 'fp')
+        cache_handler = SharedMemoryCacheHandler(self.name)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        self.assert_handler_data(cache_handler)
+        cache_handler.close()
+        self.assertEqual(len(self.log), 0)
+
+    def test_republish(self):
+        self.publisher.update_cache(self.make_data(), 'fp1')
+        old_handler = SharedMemoryCacheHandler(self.name)
+        data = self.make_data()
+        data['types'][0]['group'] = 66
+        self.publisher.update_cache(data, 'fp2')
+        # Already attached handler keeps serving old data
+        self.assertEqual(old_handler.get_fingerprint(), 'fp1')
+        self.assertEqual(old_handler.get_type(1).group, 6)
+        new_handler = SharedMemoryCacheHandler(self.name)
+        self.assertEqual(new_handler.get_fingerprint(), 'fp2')
+        self.assertEqual(new_handler.get_type(1).group, 66)
+        old_handler.close()
+        new_handler.close()
+        self.assertEqual(len(self.log), 0)
+
+    def test_old_reader(self):
+        self.publisher.update_cache(self.make_data(), 'fp1')
+        # Thread which has taken reader before data has been
+        # republished or handler closed keeps reading old block
+        reader = self.publisher._reader
+        record = reader.get_record('types', 1)
+        data = self.make_data()
+        data['types'][0]['group'] = 66
+        self.publisher.update_cache(data, 'fp2')
+        self.publisher.close()
+        self.assertEqual(reader.fingerprint, 'fp1')
+        self.assertEqual(reader.get_record('types', 1), record)
+        self.assertEqual(len(self.log), 0)
+
+    def test_unlink(self):
+        self.publisher.update_cache(self.make_data(), 'fp')
+        self.publisher.unlink()
+        cache_handler = SharedMemoryCacheHandler(self.name)
+        self.assertIsNone(cache_handler.get_fingerprint())
+        self.assertEqual(len(self.log), 0)
+
+    def test_unlink_attached(self):
+        self.publisher.update_cache(self.make_data(), 'fp')
+        cache_handler = SharedMemoryCacheHandler(self.name)
+        # Handler which hasn't created block doesn't destroy it
+        cache_handler.unlink()
+        self.assertIsNone(cache_handler.get_fingerprint())
+        other_handler = SharedMemoryCacheHandler(self.name)
+        self.assertEqual(other_handler.get_fingerprint(), 'fp')
+        other_handler.close()
+        self.assertEqual(len(self.log), 0)
+
+    def test_publish_over_attached(self):
+        self.publisher.update_cache(self.make_data(), 'fp1')
+        cache_handler = SharedMemoryCacheHandler(self.name)
+        # Block created by other handler is not replaced
+        self.assertRaises(FileExistsError, cache_handler.update_cache, self.make_data(), 'fp2')
+        other_handler = SharedMemoryCacheHandler(self.name)
+        self.assertEqual(other_handler.get_fingerprint(), 'fp1')
+        other_handler.close()
+        self.assertEqual(len(self.log), 0)
+
+    def test_attach_keeps_tracker(self):
+        self.publisher.update_cache(self.make_data(), 'fp')
+        register = resource_tracker.register
+        cache_handler = SharedMemoryCacheHandler(self.name)
+        self.assertIs(resource_tracker.register, register)
+        cache_handler.close()
+
+    def test_failed_init(self):
+        cache_handler = SharedMemoryCacheHandler.__new__(SharedMemoryCacheHandler)
+        # Nothing to release for handler which hasn't been initialized
+        cache_handler.__del__()
+        self.assertEqual(len(self.log), 0)
+
+    def test_import_binary(self):
+        path = self.cache_path('cache.bin')
+        BinaryCacheHandler(path).update_cache(self.make_data(), 'fp_bin')
+        self.publisher.import_binary_cache(path)
+        cache_handler = SharedMemoryCacheHandler(self.name)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp_bin')
+        self.assert_handler_data(cache_handler)
+        cache_handler.close()
+        self.assertEqual(len(self.log), 0)
+
+    @skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_worker(self):
+        self.publisher.update_cache(self.make_data(), 'fp')
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        process = context.Process(target=fetch_in_worker, args=(self.name, queue))
+        process.start()
+        result = queue.get(timeout=30)
+        process.join()
+        self.assertEqual(result, ('fp', 6, (111, 112)))
+        # Worker must not destroy block when it exits
+        cache_handler = SharedMemoryCacheHandler(self.name)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+        cache_handler.close()
@@ -0,0 +1,174 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import os
+import sys
+import uuid
+from threading import Event, Thread
+
+from eos.data.cache_handler import json_cache_handler
+from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler, SharedMemoryCacheHandler
+from eos.tests.cache_handler.cache_handler_testcase import CacheHandlerTestCase
+
+
+class TestThreadSafety(CacheHandlerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Make threads switch as often as possible
+        self.__old_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.__old_interval)
+        super().tearDown()
+
+    def make_generation(self, generation):
+        """
+        Compose data, all objects of which tell
+        generation of data they've been made of.
+        """
+        data = self.make_data()
+        for type_row in data['types']:
+            type_row['group'] = generation
+            type_row['attributes'] = {5: generation}
+        for effect_row in data['effects']:
+            effect_row['duration_attribute'] = generation
+        for modifier_row in data['modifiers']:
+            modifier_row['filter_value'] = generation
+        return data
+
+    def check_type(self, type_):
+        generation = type_.group
+        self.assertEqual(type_.attributes, {5: generation})
+        for effect in type_.effects:
+            self.assertEqual(effect.duration_attribute, generation)
+            for modifier in effect.modifiers:
+                self.assertEqual(modifier.filter_value, generation)
+        return generation
+
+    def hammer(self, cache_handler, generations):
+        cache_handler.update_cache(self.make_generation(0), 'fp0')
+        done = Event()
+        errors = []
+        seen = set()
+
+        def read():
+            try:
+                while not done.is_set():
+                    for type_id in (1, 2):
+                        seen.add(self.check_type(cache_handler.get_type(type_id)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        try:
+            for generation in range(1, generations + 1):
+                cache_handler.update_cache(self.make_generation(generation), 'fp{}'.format(generation))
+        finally:
+            done.set()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+        # Readers saw data of more than one generation, and
+        # once update is over, only data of new one is served
+        self.assertGreater(len(seen), 1)
+        self.assertEqual(self.check_type(cache_handler.get_type(1)), generations)
+        self.assertEqual(cache_handler.get_fingerprint(), 'fp{}'.format(generations))
+
+    def test_json(self):
+        cache_handler = JsonCacheHandler(self.cache_path('cache.json'), codec='none')
+        self.hammer(cache_handler, 30)
+        self.assertEqual(len(self.log), 0)
+
+    def test_json_object_cache(self):
+        cache_handler = JsonCacheHandler(self.cache_path('cache.json'), object_cache_size=2, codec='none')
+        self.hammer(cache_handler, 30)
+        self.assertEqual(len(self.log), 0)
+
+    def test_binary(self):
+        cache_handler = BinaryCacheHandler(self.cache_path('cache.bin'), object_cache_size=2)
+        self.hammer(cache_handler, 30)
+        self.assertEqual(len(self.log), 0)
+
+    def test_shared_memory(self):
+        cache_handler = SharedMemoryCacheHandler('eos_test_{}'.format(uuid.uuid4().hex[:16]), object_cache_size=2)
+        try:
+            self.hammer(cache_handler, 30)
+        finally:
+            cache_handler.unlink()
+        self.assertEqual(len(self.log), 0)
+
+    def test_json_load(self):
+        path = self.cache_path('cache.json')
+        JsonCacheHandler(path, codec='none').update_cache(self.make_generation(1), 'fp1')
+        # Cache body is loaded by whichever thread needs it first
+        cache_handler = JsonCacheHandler(path)
+        results = []
+        threads = [
+            Thread(target=lambda: results.append(self.check_type(cache_handler.get_type(1))))
+            for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [1] * 8)
+        self.assertEqual(len(self.log), 0)
+
+    def test_json_load_fingerprint(self):
+        path = self.cache_path('cache.json')
+        JsonCacheHandler(path, codec='none').update_cache(self.make_generation(1), 'fp1')
+        # Without metadata, fingerprint is known only once body is loaded
+        os.remove('{}.meta'.format(path))
+        cache_handler = JsonCacheHandler(path)
+        loading = Event()
+        proceed = Event()
+
+        def read_json_cache(cache_path):
+            loading.set()
+            proceed.wait(5)
+            return original_read(cache_path)
+
+        results = []
+        original_read = json_cache_handler.read_json_cache
+        json_cache_handler.read_json_cache = read_json_cache
+        try:
+            loader = Thread(target=cache_handler.get_type, args=(1,))
+            loader.start()
+            self.assertTrue(loading.wait(5))
+            # Threads which ask for fingerprint or record counts
+            # while body is being loaded wait for it
+            readers = [
+                Thread(target=lambda: results.append(cache_handler.get_fingerprint())),
+                Thread(target=lambda: results.append(cache_handler.get_record_counts().get('types')))]
+            for thread in readers:
+                thread.start()
+            readers[0].join(0.1)
+            proceed.set()
+            for thread in (loader, *readers):
+                thread.join()
+        finally:
+            json_cache_handler.read_json_cache = original_read
+        self.assertCountEqual(results, ['fp1', 2])
+        self.assertEqual(len(self.log), 0)
@@ -0,0 +1,111 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import bz2
+import json
+
+from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler
+from eos.data.cache_handler.binary_cache_handler import pack_cache
+from eos.data.cache_handler.record_handler import INDEX_NAMES, strip_data
+from eos.tests.cache_handler.cache_handler_testcase import CacheHandlerTestCase
+
+
+class TestTypeIndex(CacheHandlerTestCase):
+
+    def make_handlers(self):
+        json_path = self.cache_path('cache.json.bz2')
+        json_handler = JsonCacheHandler(json_path)
+        json_handler.update_cache(self.make_data(), 'fp')
+        binary_handler = BinaryCacheHandler(self.cache_path('cache.bin'))
+        binary_handler.update_cache(self.make_data(), 'fp')
+        imported_handler = BinaryCacheHandler(self.cache_path('imported.bin'))
+        imported_handler.import_json_cache(json_path)
+        return (
+            json_handler, JsonCacheHandler(json_path),
+            binary_handler, BinaryCacheHandler(self.cache_path('cache.bin')),
+            imported_handler)
+
+    def test_group(self):
+        for cache_handler in self.make_handlers():
+            self.assertEqual(cache_handler.get_group_type_ids(6), (1,))
+            self.assertEqual(cache_handler.get_group_type_ids(7), (2,))
+            self.assertEqual(cache_handler.get_group_type_ids(8), ())
+        self.assertEqual(len(self.log), 0)
+
+    def test_category(self):
+        for cache_handler in self.make_handlers():
+            self.assertEqual(cache_handler.get_category_type_ids(16), (1,))
+            self.assertEqual(cache_handler.get_category_type_ids(None), ())
+        self.assertEqual(len(self.log), 0)
+
+    def test_attribute(self):
+        for cache_handler in self.make_handlers():
+            self.assertEqual(cache_handler.get_attribute_type_ids(5), (1,))
+            self.assertEqual(cache_handler.get_attribute_type_ids(6), (1,))
+            self.assertEqual(cache_handler.get_attribute_type_ids(7), ())
+        self.assertEqual(len(self.log), 0)
+
+    def test_effect(self):
+        data = self.make_data()
+        data['types'][1]['effects'] = [112]
+        cache_handler = BinaryCacheHandler(self.cache_path('effects.bin'))
+        cache_handler.update_cache(data, 'fp')
+        self.assertEqual(cache_handler.get_effect_type_ids(111), (1,))
+        self.assertEqual(cache_handler.get_effect_type_ids(112), (1, 2))
+        self.assertEqual(cache_handler.get_effect_type_ids(113), ())
+        self.assertEqual(len(self.log), 0)
+
+    def make_old_handlers(self):
+        """Make handlers for caches written without indexes."""
+        json_path = self.cache_path('old.json.bz2')
+        JsonCacheHandler(json_path).update_cache(self.make_data(), 'fp')
+        with bz2.open(json_path, 'rt', encoding='utf-8') as file:
+            lines = file.read().splitlines(True)
+        with bz2.open(json_path, 'wt', encoding='utf-8') as file:
+            file.write(lines[0])
+            file.writelines(line for line in lines[1:] if json.loads(line)[0] not in INDEX_NAMES)
+        slim_data = strip_data(self.make_data())
+        for index_name in INDEX_NAMES:
+            del slim_data[index_name]
+        binary_path = self.cache_path('old.bin')
+        with open(binary_path, 'wb') as file:
+            file.write(pack_cache(slim_data, 'fp'))
+        imported_handler = BinaryCacheHandler(self.cache_path('imported.bin'))
+        imported_handler.import_json_cache(json_path)
+        return JsonCacheHandler(json_path), BinaryCacheHandler(binary_path), imported_handler
+
+    def test_rebuilt(self):
+        for cache_handler in self.make_old_handlers():
+            self.assertEqual(cache_handler.get_fingerprint(), 'fp')
+            self.assertEqual(cache_handler.get_group_type_ids(6), (1,))
+            self.assertEqual(cache_handler.get_category_type_ids(16), (1,))
+            self.assertEqual(cache_handler.get_attribute_type_ids(6), (1,))
+            self.assertEqual(cache_handler.get_effect_type_ids(112), (1,))
+            self.assertEqual(cache_handler.get_effect_type_ids(113), ())
+        self.assertEqual(len(self.log), 0)
+
+    def test_record_counts(self):
+        # Indexes are not counted as records
+        for cache_handler in self.make_handlers() + self.make_old_handlers():
+            self.assertEqual(
+                cache_handler.get_record_counts(),
+                {'types': 2, 'attributes': 2, 'effects': 2, 'modifiers': 2})
+        self.assertEqual(len(self.log), 0)
@@ -0,0 +1,136 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from threading import Barrier, Thread
+
+from eos.data.cache_handler import BinaryCacheHandler, JsonCacheHandler
+from eos.data.cache_handler.exception import TypeFetchError
+from eos.tests.cache_handler.cache_handler_testcase import CacheHandlerTestCase
+
+
+class BlockingCacheHandler(BinaryCacheHandler):
+    """Handler whose type record reads wait for each other."""
+
+    def __init__(self, cache_path):
+        super().__init__(cache_path)
+        self.barrier = Barrier(2, timeout=5)
+
+    def _get_type_record(self, type_id):
+        self.barrier.wait()
+        return super()._get_type_record(type_id)
+
+
+class ReplacingCacheHandler(BinaryCacheHandler):
+    """Handler which replaces its data while first type record is read."""
+
+    def __init__(self, cache_path, new_data):
+        super().__init__(cache_path)
+        self.new_data = new_data
+
+    def _get_type_record(self, type_id):
+        type_data = super()._get_type_record(type_id)
+        if self.new_data is not None:
+            new_data, self.new_data = self.new_data, None
+            self.update_cache(new_data, 'fp2')
+        return type_data
+
+
+class TestWarm(CacheHandlerTestCase):
+
+    def make_handlers(self):
+        json_handler = JsonCacheHandler(self.cache_path('cache.json.bz2'))
+        json_handler.update_cache(self.make_data(), 'fp')
+        binary_handler = BinaryCacheHandler(self.cache_path('cache.bin'))
+        binary_handler.update_cache(self.make_data(), 'fp')
+        # Handler which reads cache from disk
+        return json_handler, binary_handler, JsonCacheHandler(self.cache_path('cache.json.bz2'))
+
+    def test_type_ids(self):
+        for cache_handler in self.make_handlers():
+            self.assertEqual(sorted(cache_handler.get_type_ids()), [1, 2])
+
+    def test_get_types(self):
+        for cache_handler in self.make_handlers():
+            types = cache_handler.get_types((2, 1, 2))
+            self.assertEqual([type_.id for type_ in types], [2, 1, 2])
+            self.assertIs(types[0], types[2])
+            self.assertIs(types[1], cache_handler.get_type(1))
+            self.assertRaises(TypeFetchError, cache_handler.get_types, (1, 3))
+        self.assertEqual(len(self.log), 0)
+
+    def test_warm_all(self):
+        for cache_handler in self.make_handlers():
+            progress = []
+            self.assertEqual(cache_handler.warm(progress=lambda *args: progress.append(args)), 2)
+            self.assertEqual(progress, [(2, 2)])
+            # Types are kept alive, thus they're taken from object cache
+            cache_handler.get_type(1)
+            cache_handler.get_type(2)
+            stats = cache_handler.get_object_cache_stats()
+            self.assertEqual(stats['types'].misses, 2)
+            self.assertEqual(stats['types'].hits, 2)
+            self.assertEqual(stats['modifiers'].misses, 2)
+        self.assertEqual(len(self.log), 0)
+
+    def test_warm_threads(self):
+        for cache_handler in self.make_handlers():
+            self.assertEqual(cache_handler.warm(type_ids=(2, 1, 1), threads=4), 2)
+            cache_handler.get_type(1)
+            stats = cache_handler.get_object_cache_stats()
+            self.assertEqual(stats['types'].misses, 2)
+            self.assertEqual(stats['types'].hits, 1)
+        self.assertEqual(len(self.log), 0)
+
+    def test_unwarm(self):
+        for cache_handler in self.make_handlers():
+            cache_handler.warm()
+            cache_handler.unwarm()
+            cache_handler.get_type(1)
+            stats = cache_handler.get_object_cache_stats()
+            self.assertEqual(stats['types'].misses, 3)
+            self.assertEqual(stats['types'].hits, 0)
+        self.assertEqual(len(self.log), 0)
+
+    def test_concurrent_reads(self):
+        cache_handler = BlockingCacheHandler(self.cache_path('cache.bin'))
+        cache_handler.update_cache(self.make_data(), 'fp')
+        types = {}
+        threads = [
+            Thread(target=lambda type_id=type_id: types.update({type_id: cache_handler.get_type(type_id)}))
+            for type_id in (1, 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Records of both types were being read at the same time
+        self.assertFalse(cache_handler.barrier.broken)
+        self.assertEqual(types[1].group, 6)
+        self.assertEqual(types[2].group, 7)
+        self.assertEqual(len(self.log), 0)
+
+    def test_data_replaced_during_read(self):
+        new_data = self.make_data()
+        new_data['types'][0]['group'] = 8
+        cache_handler = ReplacingCacheHandler(self.cache_path('cache.bin'), new_data)
+        cache_handler.update_cache(self.make_data(), 'fp')
+        # Record read before replacement is read again
+        self.assertEqual(cache_handler.get_type(1).group, 8)
+        self.assertEqual(len(self.log), 0)
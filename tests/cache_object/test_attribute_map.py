@@ -0,0 +1,89 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from array import array
+
+from eos.data.cache_object.attribute_map import AttributeMap, compose_attribute_map
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestAttributeMap(EosTestCase):
+
+    def test_mapping(self):
+        attr_map = compose_attribute_map(((6, 3), (5, 10.5)), {})
+        self.assertIsInstance(attr_map, AttributeMap)
+        self.assertEqual(attr_map[5], 10.5)
+        self.assertEqual(attr_map[6], 3)
+        self.assertEqual(len(attr_map), 2)
+        self.assertEqual(list(attr_map), [5, 6])
+        self.assertIn(5, attr_map)
+        self.assertNotIn(7, attr_map)
+        self.assertRaises(KeyError, attr_map.__getitem__, 7)
+        self.assertIsNone(attr_map.get(7))
+        self.assertIsNone(attr_map.get(None))
+        self.assertEqual(attr_map.get(7, 1), 1)
+        self.assertEqual(attr_map, {5: 10.5, 6: 3})
+        self.assertEqual(len(self.log), 0)
+
+    def test_read_only(self):
+        attr_map = compose_attribute_map(((5, 10.5),), {})
+        with self.assertRaises(TypeError):
+            attr_map[5] = 1
+        with self.assertRaises(AttributeError):
+            attr_map.some_attribute = 1
+
+    def test_layout_sharing(self):
+        layouts = {}
+        attr_map1 = compose_attribute_map(((5, 1), (6, 2)), layouts)
+        attr_map2 = compose_attribute_map(((6, 4), (5, 3)), layouts)
+        attr_map3 = compose_attribute_map(((5, 1),), layouts)
+        self.assertEqual(len(layouts), 2)
+        self.assertEqual(len(layouts), 2)
+        self.assertEqual(attr_map1, {5: 1, 6: 2})
+        self.assertEqual(attr_map2, {5: 3, 6: 4})
+        self.assertEqual(attr_map3, {5: 1})
+
+    def test_values_array(self):
+        layouts = {}
+        attr_map = compose_attribute_map(((5, 1),), layouts)
+        self.assertEqual(attr_map, AttributeMap(array('q', (5,)), array('d', (1,))))
+
+    def test_value_types(self):
+        layouts = {}
+        for attr_pairs in (((5, 1), (6, 2)), ((5, 1.0), (6, 2.0)), ((5, 1), (6, 2.0), (7, -3))):
+            attr_map = compose_attribute_map(attr_pairs, layouts)
+            self.assertIsInstance(attr_map, AttributeMap)
+            for attr_id, value in attr_pairs:
+                self.assertIs(type(attr_map[attr_id]), type(value))
+                self.assertEqual(attr_map[attr_id], value)
+        # Maps with the same types of values share integer mask
+        attr_map1 = compose_attribute_map(((5, 1), (6, 2.5)), layouts)
+        attr_map2 = compose_attribute_map(((5, 3), (6, 4.5)), layouts)
+        self.assertEqual(len(layouts), 4)
+        self.assertEqual(attr_map1, {5: 1, 6: 2.5})
+        self.assertEqual(attr_map2, {5: 3, 6: 4.5})
+        self.assertEqual(len(self.log), 0)
+
+    def test_fallback(self):
+        attr_map = compose_attribute_map(((5, None), (6, 2 ** 60)), {})
+        self.assertIs(type(attr_map), dict)
+        self.assertEqual(attr_map, {5: None, 6: 2 ** 60})
+        self.assertEqual(len(self.log), 0)
@@ -0,0 +1,76 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from eos.const.eos import Scope, Slot, State
+from eos.const.eve import Effect as EffectId, EffectCategory
+from eos.data.cache_object import Effect, Modifier, Type
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestType(EosTestCase):
+
+    def test_slots(self):
+        type_ = Type(type_id=1)
+        with self.assertRaises(AttributeError):
+            type_.some_attribute = 1
+
+    def test_cached_property(self):
+        effect = Effect(effect_id=EffectId.hi_power, category=EffectCategory.active)
+        type_ = Type(type_id=1, effects=(effect,))
+        slots = type_.slots
+        self.assertEqual(slots, {Slot.module_high})
+        self.assertIs(type_.slots, slots)
+        self.assertEqual(type_.max_state, State.active)
+
+    def test_cached_property_override(self):
+        type_ = Type(type_id=1)
+        type_.slots = {Slot.rig}
+        self.assertEqual(type_.slots, {Slot.rig})
+        del type_.slots
+        self.assertEqual(type_.slots, set())
+        # Deletion of not cached value is no-op
+        del type_.max_state
+        self.assertEqual(type_.max_state, State.offline)
+
+    def test_modifier_index(self):
+        modifier1 = Modifier(modifier_id=1, state=State.offline, scope=Scope.local, src_attr=5)
+        modifier2 = Modifier(modifier_id=2, state=State.active, scope=Scope.local, src_attr=5)
+        modifier3 = Modifier(modifier_id=3, state=State.offline, scope=Scope.local, src_attr=6)
+        effect1 = Effect(effect_id=1, modifiers=(modifier1, modifier2))
+        effect2 = Effect(effect_id=2, modifiers=(modifier3,))
+        type_ = Type(type_id=1, effects=(effect1, effect2))
+        self.assertEqual(type_.modifiers_by_state_scope, {
+            (State.offline, Scope.local): (modifier1, modifier3),
+            (State.active, Scope.local): (modifier2,)
+        })
+        self.assertEqual(type_.modifiers_by_src_attr, {5: (modifier1, modifier2), 6: (modifier3,)})
+        self.assertIs(type_.modifiers_by_src_attr, type_.modifiers_by_src_attr)
+        with self.assertRaises(TypeError):
+            type_.modifiers_by_src_attr[7] = ()
+
+    def test_modifier_index_shared(self):
+        # Modifier shared by effects is listed in
+        # source attribute index once
+        modifier = Modifier(modifier_id=1, state=State.offline, scope=Scope.local, src_attr=5)
+        effect1 = Effect(effect_id=1, modifiers=(modifier,))
+        effect2 = Effect(effect_id=2, modifiers=(modifier,))
+        type_ = Type(type_id=1, effects=(effect1, effect2))
+        self.assertEqual(type_.modifiers_by_src_attr, {5: (modifier,)})
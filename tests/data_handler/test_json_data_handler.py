@@ -0,0 +1,113 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import io
+import json
+import os.path
+from json import JSONDecodeError
+from tempfile import TemporaryDirectory
+
+from eos.data.data_handler import JsonDataHandler
+from eos.util.json_stream import iter_json_stream
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestJsonDataHandler(EosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = TemporaryDirectory()
+        self.dh = JsonDataHandler(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def write_file(self, filename, data):
+        with open(os.path.join(self.tmp_dir.name, '{}.json'.format(filename)), 'w', encoding='utf8') as file:
+            json.dump(data, file)
+
+    def test_rows(self):
+        rows = [{'typeID': 1, 'attributeID': 2, 'value': 1e-05}, {'typeID': 3, 'attributeID': 4, 'value': 10}]
+        self.write_file('dgmtypeattribs', rows)
+        self.assertEqual(list(self.dh.get_dgmtypeattribs()), rows)
+        self.assertEqual(len(self.log), 0)
+
+    def test_rows_keyed(self):
+        row1 = {'typeID': 1, 'groupID': 2, 'typeName_en-us': 'Rifter'}
+        row2 = {'typeID': 3, 'groupID': 2, 'typeName_en-us': 'Slasher'}
+        self.write_file('evetypes', {'1': row1, '3': row2})
+        self.assertEqual(list(self.dh.get_evetypes()), [row1, row2])
+        self.assertEqual(len(self.log), 0)
+
+    def test_version(self):
+        self.write_file('phbmetadata', [
+            {'field_name': 'dump_time', 'field_value': 1},
+            {'field_name': 'client_build', 'field_value': 1000}
+        ])
+        self.assertEqual(self.dh.get_version(), 1000)
+        self.assertEqual(len(self.log), 0)
+
+
+class TestJsonStream(EosTestCase):
+
+    def parse(self, text, **kwargs):
+        return list(iter_json_stream(io.StringIO(text), **kwargs))
+
+    def test_chunk_boundaries(self):
+        data = [
+            {'a': [1, 2.5, -3e-07, None, True, False]},
+            'string with \\"escapes\\" é',
+            123456789,
+            [],
+            {}
+        ]
+        text = json.dumps(data, indent=1)
+        for chunk_size in range(1, len(text) + 2):
+            self.assertEqual(self.parse(text, chunk_size=chunk_size), data)
+        self.assertEqual(len(self.log), 0)
+
+    def test_object(self):
+        text = '{"1": {"a": 1}, "2": 2.0e3}'
+        for chunk_size in (1, 4, 1000):
+            self.assertEqual(self.parse(text, chunk_size=chunk_size), [('1', {'a': 1}), ('2', 2000.0)])
+            self.assertEqual(self.parse(text, values_only=True, chunk_size=chunk_size), [{'a': 1}, 2000.0])
+        self.assertEqual(len(self.log), 0)
+
+    def test_empty(self):
+        self.assertEqual(self.parse(' [ ] '), [])
+        self.assertEqual(self.parse('{}'), [])
+        self.assertEqual(len(self.log), 0)
+
+    def test_leading_whitespace(self):
+        for chunk_size in (1, 2, 1000):
+            self.assertEqual(self.parse('  \n[] \n ', chunk_size=chunk_size), [])
+            self.assertEqual(self.parse('\t  \r\n {"1": 2}', chunk_size=chunk_size), [('1', 2)])
+            with self.assertRaises(JSONDecodeError):
+                self.parse('  \n  ', chunk_size=chunk_size)
+        self.assertEqual(len(self.log), 0)
+
+    def test_malformed(self):
+        for text in ('', '1', '[1 2]', '[1,]', '{"a" 1}', '{1: 2}', '[1] 2', '[1'):
+            for chunk_size in (1, 1000):
+                with self.assertRaises(JSONDecodeError):
+                    self.parse(text, chunk_size=chunk_size)
+        self.assertEqual(len(self.log), 0)
@@ -0,0 +1,98 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import os.path
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+
+from eos.data.data_handler import SQLiteDataHandler
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestSQLiteDataHandler(EosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'eve.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE dgmtypeattribs (typeID INTEGER, attributeID INTEGER, value REAL)')
+        conn.executemany('INSERT INTO dgmtypeattribs VALUES (?, ?, ?)', (
+            (1, 10, 1.5), (2, 10, 2.5), (1, 11, 3.5), (3, 10, 4.5)))
+        conn.execute('CREATE TABLE phbmetadata (field_name TEXT, field_value TEXT)')
+        conn.execute('INSERT INTO phbmetadata VALUES ("client_build", "1000")')
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def get_indexes(self):
+        conn = sqlite3.connect(self.db_path)
+        indexes = [row[0] for row in conn.execute('SELECT name FROM sqlite_master WHERE type = "index"')]
+        conn.close()
+        return indexes
+
+    def test_rows(self):
+        dh = SQLiteDataHandler(self.db_path)
+        self.assertEqual(list(dh.get_dgmtypeattribs()), [
+            {'typeID': 1, 'attributeID': 10, 'value': 1.5},
+            {'typeID': 2, 'attributeID': 10, 'value': 2.5},
+            {'typeID': 1, 'attributeID': 11, 'value': 3.5},
+            {'typeID': 3, 'attributeID': 10, 'value': 4.5}
+        ])
+        self.assertEqual(self.get_indexes(), [])
+        self.assertEqual(len(self.log), 0)
+
+    def test_rows_filtered(self):
+        dh = SQLiteDataHandler(self.db_path)
+        rows = list(dh.get_dgmtypeattribs(type_ids={1, 3}))
+        self.assertCountEqual(rows, [
+            {'typeID': 1, 'attributeID': 10, 'value': 1.5},
+            {'typeID': 1, 'attributeID': 11, 'value': 3.5},
+            {'typeID': 3, 'attributeID': 10, 'value': 4.5}
+        ])
+        self.assertEqual(self.get_indexes(), ['dgmtypeattribs_typeID'])
+        self.assertEqual(len(self.log), 0)
+
+    def test_rows_interleaved(self):
+        # Each fetch has its own cursor, so rows can
+        # be consumed in any order
+        dh = SQLiteDataHandler(self.db_path)
+        rows1 = dh.get_dgmtypeattribs()
+        rows2 = dh.get_dgmtypeattribs(type_ids={2})
+        self.assertEqual(next(rows1)['typeID'], 1)
+        self.assertEqual(list(rows2), [{'typeID': 2, 'attributeID': 10, 'value': 2.5}])
+        self.assertEqual(len(list(rows1)), 3)
+        self.assertEqual(dh.get_version(), '1000')
+
+    def test_threads(self):
+        dh = SQLiteDataHandler(self.db_path)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(lambda: list(dh.get_dgmtypeattribs(type_ids={1}))) for _ in range(2)]
+            for future in futures:
+                self.assertCountEqual(future.result(), [
+                    {'typeID': 1, 'attributeID': 10, 'value': 1.5},
+                    {'typeID': 1, 'attributeID': 11, 'value': 3.5}
+                ])
+        self.assertEqual(len(self.log), 0)
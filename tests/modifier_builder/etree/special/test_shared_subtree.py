@@ -0,0 +1,165 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from itertools import count
+
+from eos.const.eos import EffectBuildStatus
+from eos.const.eve import EffectCategory, Operand
+from eos.data.cache_generator.modifier_builder import ModifierBuilder
+from eos.data.cache_generator.modifier_builder.expression_tree.etree2actions import ETree2Actions
+from eos.tests.modifier_builder.modbuilder_testcase import ModBuilderTestCase
+
+
+class TestBuilderEtreeSharedSubtree(ModBuilderTestCase):
+    """Test conversion of subtrees which are referenced by multiple trees"""
+
+    def setUp(self):
+        super().setUp()
+        self.exp_ids = count(1)
+        e_tgt_loc = self.make_exp(operandID=Operand.def_loc, expressionValue='Ship')
+        e_tgt_grp = self.make_exp(operandID=Operand.def_grp, expressionGroupID=46)
+        self.e_tgt_itms = self.make_exp(
+            operandID=Operand.loc_grp,
+            arg1=e_tgt_loc['expressionID'],
+            arg2=e_tgt_grp['expressionID']
+        )
+        self.e_optr = self.make_exp(operandID=Operand.def_optr, expressionValue='PostPercent')
+        # Format: (pre-expression ID, post-expression ID)
+        self.mod1 = self.make_mod(tgt_attr_id=54, src_attr_id=351)
+        self.mod2 = self.make_mod(tgt_attr_id=158, src_attr_id=349)
+        self.mod3 = self.make_mod(tgt_attr_id=160, src_attr_id=767)
+
+    def make_exp(self, **kwargs):
+        return self.ef.make(next(self.exp_ids), **kwargs)
+
+    def make_mod(self, tgt_attr_id, src_attr_id):
+        e_tgt_attr = self.make_exp(operandID=Operand.def_attr, expressionAttributeID=tgt_attr_id)
+        e_src_attr = self.make_exp(operandID=Operand.def_attr, expressionAttributeID=src_attr_id)
+        e_tgt_spec = self.make_exp(
+            operandID=Operand.itm_attr,
+            arg1=self.e_tgt_itms['expressionID'],
+            arg2=e_tgt_attr['expressionID']
+        )
+        e_optr_tgt = self.make_exp(
+            operandID=Operand.optr_tgt,
+            arg1=self.e_optr['expressionID'],
+            arg2=e_tgt_spec['expressionID']
+        )
+        e_add_mod = self.make_exp(
+            operandID=Operand.add_loc_grp_mod,
+            arg1=e_optr_tgt['expressionID'],
+            arg2=e_src_attr['expressionID']
+        )
+        e_rm_mod = self.make_exp(
+            operandID=Operand.rm_loc_grp_mod,
+            arg1=e_optr_tgt['expressionID'],
+            arg2=e_src_attr['expressionID']
+        )
+        return e_add_mod['expressionID'], e_rm_mod['expressionID']
+
+    def splice(self, *mods):
+        pre_exp_id, post_exp_id = mods[0]
+        for mod_pre_exp_id, mod_post_exp_id in mods[1:]:
+            pre_exp_id = self.make_exp(operandID=Operand.splice, arg1=pre_exp_id, arg2=mod_pre_exp_id)['expressionID']
+            post_exp_id = self.make_exp(operandID=Operand.splice, arg1=post_exp_id, arg2=mod_post_exp_id)['expressionID']
+        return pre_exp_id, post_exp_id
+
+    def make_effect_rows(self):
+        effect_rows = []
+        splice12 = self.splice(self.mod1, self.mod2)
+        splice123 = self.splice(splice12, self.mod3)
+        for effect_id, (pre_exp_id, post_exp_id) in (
+            (1, splice12),
+            (2, self.splice(self.mod2, self.mod3)),
+            (3, splice123),
+            (4, self.splice(self.mod3, splice12)),
+            (5, self.splice(splice12, splice123))
+        ):
+            effect_rows.append({
+                'effect_id': effect_id,
+                'pre_expression': pre_exp_id,
+                'post_expression': post_exp_id,
+                'effect_category': EffectCategory.passive,
+                'modifier_info': None
+            })
+        return effect_rows
+
+    def get_mod_data(self, modifiers):
+        return sorted(
+            (
+                modifier.state, modifier.scope, modifier.src_attr, modifier.operator,
+                modifier.tgt_attr, modifier.domain, modifier.filter_type, modifier.filter_value
+            ) for modifier in modifiers
+        )
+
+    def test_same_output(self):
+        effect_rows = self.make_effect_rows()
+        shared_builder = ModifierBuilder(self.ef.data)
+        for effect_row in effect_rows:
+            shared_modifiers, shared_status = shared_builder.build(effect_row)
+            separate_modifiers, separate_status = ModifierBuilder(self.ef.data).build(effect_row)
+            self.assertEqual(shared_status, EffectBuildStatus.ok_full)
+            self.assertEqual(separate_status, EffectBuildStatus.ok_full)
+            self.assertEqual(self.get_mod_data(shared_modifiers), self.get_mod_data(separate_modifiers))
+        self.assertEqual(len(self.log), 0)
+
+    def test_node_visits(self):
+        effect_rows = self.make_effect_rows()
+        shared_converter = ETree2Actions(self.ef.data)
+        separate_visits = 0
+        for effect_row in effect_rows:
+            for tree_root_id in (effect_row['pre_expression'], effect_row['post_expression']):
+                shared_converter.convert(tree_root_id, effect_row['effect_category'])
+                separate_converter = ETree2Actions(self.ef.data)
+                separate_converter.convert(tree_root_id, effect_row['effect_category'])
+                separate_visits += separate_converter.node_visits
+        self.assertGreater(shared_converter.subtree_hits, 0)
+        self.assertLess(shared_converter.node_visits * 2, separate_visits)
+
+    def test_actions_not_shared(self):
+        # Actions generated for the same subtree are independent objects,
+        # so that referencing the subtree twice still gives two actions
+        pre_exp_id, post_exp_id = self.splice(self.mod1, self.mod1)
+        converter = ETree2Actions(self.ef.data)
+        actions1, skipped_data1 = converter.convert(pre_exp_id, EffectCategory.passive)
+        actions2, skipped_data2 = converter.convert(pre_exp_id, EffectCategory.passive)
+        self.assertEqual(len(actions1), 2)
+        self.assertIsNot(actions1[0], actions1[1])
+        self.assertTrue(set(actions1).isdisjoint(actions2))
+        self.assertIs(skipped_data1, False)
+        self.assertIs(skipped_data2, False)
+        self.assertEqual(len(self.log), 0)
+
+    def test_skipped_data(self):
+        e_inactive = self.make_exp(operandID=Operand.attack)
+        pre_exp_id = self.make_exp(
+            operandID=Operand.splice,
+            arg1=self.mod1[0],
+            arg2=e_inactive['expressionID']
+        )['expressionID']
+        converter = ETree2Actions(self.ef.data)
+        actions, skipped_data = converter.convert(self.mod1[0], EffectCategory.passive)
+        self.assertEqual(len(actions), 1)
+        self.assertIs(skipped_data, False)
+        actions, skipped_data = converter.convert(pre_exp_id, EffectCategory.passive)
+        self.assertEqual(len(actions), 1)
+        self.assertIs(skipped_data, True)
+        self.assertEqual(len(self.log), 0)
@@ -0,0 +1,99 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import asyncio
+from threading import Event
+from unittest.mock import Mock
+
+from eos import __version__ as eos_version
+from eos.data.exception import ExistingSourceError, UnknownSourceError
+from eos.data.source import SourceManager
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestSourceManagerAsync(EosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.__old_sources = SourceManager._sources
+        self.__old_default = SourceManager.default
+        SourceManager._sources = {}
+        SourceManager.default = None
+        # Data handler blocks on fetching version until
+        # test lets it continue
+        self.release = Event()
+        self.data_handler = Mock()
+
+        def get_version():
+            self.release.wait(5)
+            return '1'
+
+        self.data_handler.get_version.side_effect = get_version
+        self.cache_handler = Mock()
+        self.cache_handler.get_fingerprint.return_value = '1_{}'.format(eos_version)
+
+    def tearDown(self):
+        self.release.set()
+        SourceManager._sources = self.__old_sources
+        SourceManager.default = self.__old_default
+        super().tearDown()
+
+    def test_future(self):
+        future = SourceManager.add_future('src', self.data_handler, self.cache_handler, make_default=True)
+        self.assertRaises(UnknownSourceError, SourceManager.get, 'src')
+        self.assertRaises(ExistingSourceError, SourceManager.add_future, 'src', self.data_handler, self.cache_handler)
+        self.release.set()
+        source = future.result(5)
+        self.assertIs(source.cache_handler, self.cache_handler)
+        self.assertIs(SourceManager.get('src'), source)
+        self.assertIs(SourceManager.default, source)
+        self.cache_handler.update_cache.assert_not_called()
+
+    def test_future_failure(self):
+        self.data_handler.get_version.side_effect = RuntimeError
+        future = SourceManager.add_future('src', self.data_handler, self.cache_handler)
+        self.assertRaises(RuntimeError, future.result, 5)
+        self.assertRaises(UnknownSourceError, SourceManager.get, 'src')
+        # Alias is free again
+        self.data_handler.get_version.side_effect = None
+        self.data_handler.get_version.return_value = '1'
+        SourceManager.add('src', self.data_handler, self.cache_handler)
+        self.assertIs(SourceManager.get('src').cache_handler, self.cache_handler)
+
+    def test_async(self):
+
+        async def run():
+            adding = asyncio.ensure_future(SourceManager.add_async('src', self.data_handler, self.cache_handler))
+            getting = asyncio.ensure_future(SourceManager.get_async('src'))
+            # Event loop is not blocked while source is being prepared
+            await asyncio.sleep(0.01)
+            self.assertFalse(adding.done())
+            self.assertFalse(getting.done())
+            self.release.set()
+            return await adding, await getting
+
+        added, got = asyncio.run(run())
+        self.assertIs(added, got)
+        self.assertIs(SourceManager.get('src'), added)
+
+    def test_async_unknown(self):
+        with self.assertRaises(UnknownSourceError):
+            asyncio.run(SourceManager.get_async('src'))
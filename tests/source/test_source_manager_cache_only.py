@@ -0,0 +1,91 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import os.path
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock
+
+from eos import __version__ as eos_version
+from eos.data.cache_builder import CacheBuilder
+from eos.data.cache_handler import BinaryCacheHandler
+from eos.data.exception import IncompatibleCacheError, UnknownSourceError
+from eos.data.source import SourceManager
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestSourceManagerCacheOnly(EosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.__old_sources = SourceManager._sources
+        self.__old_default = SourceManager.default
+        SourceManager._sources = {}
+        SourceManager.default = None
+        self.cache_handler = Mock()
+
+    def tearDown(self):
+        SourceManager._sources = self.__old_sources
+        SourceManager.default = self.__old_default
+        super().tearDown()
+
+    def test_compatible(self):
+        self.cache_handler.get_fingerprint.return_value = '1000_{}'.format(eos_version)
+        SourceManager.add('src', None, self.cache_handler, make_default=True)
+        source = SourceManager.get('src')
+        self.assertIs(source.cache_handler, self.cache_handler)
+        self.assertIs(SourceManager.default, source)
+        self.cache_handler.update_cache.assert_not_called()
+
+    def test_other_eos_version(self):
+        self.cache_handler.get_fingerprint.return_value = '1000_{}x'.format(eos_version)
+        self.assertRaises(IncompatibleCacheError, SourceManager.add, 'src', None, self.cache_handler)
+        self.assertRaises(UnknownSourceError, SourceManager.get, 'src')
+        self.cache_handler.update_cache.assert_not_called()
+
+    def test_no_data_version(self):
+        self.cache_handler.get_fingerprint.return_value = '_{}'.format(eos_version)
+        self.assertRaises(IncompatibleCacheError, SourceManager.add, 'src', None, self.cache_handler)
+        self.assertRaises(UnknownSourceError, SourceManager.get, 'src')
+
+    def test_no_cache(self):
+        self.cache_handler.get_fingerprint.return_value = None
+        self.assertRaises(IncompatibleCacheError, SourceManager.add, 'src', None, self.cache_handler)
+        self.assertRaises(UnknownSourceError, SourceManager.get, 'src')
+
+    def test_future(self):
+        self.cache_handler.get_fingerprint.return_value = None
+        future = SourceManager.add_future('src', None, self.cache_handler)
+        self.assertRaises(IncompatibleCacheError, future.result, 5)
+        self.assertRaises(UnknownSourceError, SourceManager.get, 'src')
+
+    def test_prebuilt(self):
+        data_handler = Mock()
+        data_handler.get_evetypes.return_value = [{'typeID': 1, 'groupID': 6, 'typeName_en-us': 'Rifter'}]
+        data_handler.get_evegroups.return_value = [{'groupID': 6, 'categoryID': 6}]
+        for table_name in ('dgmattribs', 'dgmtypeattribs', 'dgmeffects', 'dgmtypeeffects', 'dgmexpressions'):
+            getattr(data_handler, 'get_{}'.format(table_name)).return_value = []
+        with TemporaryDirectory() as tmp_dir:
+            cache_path = os.path.join(tmp_dir, 'eos.bin')
+            CacheBuilder().build(data_handler, BinaryCacheHandler(cache_path), 1000)
+            cache_handler = BinaryCacheHandler(cache_path)
+            SourceManager.add('src', None, cache_handler)
+            self.assertIs(SourceManager.get('src').cache_handler, cache_handler)
+            self.assertEqual(list(cache_handler.get_type_ids()), [1])
@@ -0,0 +1,207 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import asyncio
+import gc
+import logging
+from unittest.mock import Mock, patch
+
+from eos import __version__ as eos_version
+from eos.const.eve import Type
+from eos.data.exception import ExistingSourceError, UnknownSourceError
+from eos.data.source import SourceManager
+from eos.fit import Fit
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestSourceManagerLazy(EosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.__old_state = {
+            attr_name: getattr(SourceManager, attr_name) for attr_name in (
+                '_sources', '_lazy', '_fit_refs', '_idle_since', '_sizes', '_loads',
+                '_evictions', '_load_time', 'idle_time', 'record_budget', '_default',
+                '_default_alias')}
+        SourceManager._sources = {}
+        SourceManager._lazy = {}
+        SourceManager._fit_refs = {}
+        SourceManager._idle_since = {}
+        SourceManager._sizes = {}
+        SourceManager._loads = 0
+        SourceManager._evictions = 0
+        SourceManager._load_time = 0
+        SourceManager.idle_time = None
+        SourceManager.record_budget = None
+        SourceManager.default = None
+        self.made_handlers = []
+        self.ch.type_(type_id=Type.character_static)
+
+    def tearDown(self):
+        for attr_name, value in self.__old_state.items():
+            setattr(SourceManager, attr_name, value)
+        super().tearDown()
+
+    def make_cache_handler(self, size=100):
+        cache_handler = Mock()
+        cache_handler.get_fingerprint.return_value = '1_{}'.format(eos_version)
+        cache_handler.get_record_counts.return_value = {'types': size}
+        cache_handler.get_type.side_effect = self.ch.get_type
+        self.made_handlers.append(cache_handler)
+        return cache_handler
+
+    def add(self, alias, size=100, **kwargs):
+        SourceManager.add_lazy(alias, None, lambda: self.make_cache_handler(size), **kwargs)
+
+    def test_load_on_request(self):
+        self.add('src')
+        self.assertEqual(SourceManager.list(), ['src'])
+        self.assertEqual(len(self.made_handlers), 0)
+        source = SourceManager.get('src')
+        self.assertIs(source.cache_handler, self.made_handlers[0])
+        self.assertIs(SourceManager.get('src'), source)
+        stats = SourceManager.get_lazy_stats()
+        self.assertEqual(stats.loads, 1)
+        self.assertEqual(stats.evictions, 0)
+        self.assertEqual(stats.loaded, 1)
+        self.assertEqual(stats.size, 100)
+
+    def test_existing(self):
+        self.add('src')
+        self.assertRaises(ExistingSourceError, self.add, 'src')
+        self.assertRaises(ExistingSourceError, SourceManager.add, 'src', None, self.make_cache_handler())
+
+    def test_fit(self):
+        self.add('src', make_default=True)
+        fit = Fit()
+        self.assertIs(fit.source, SourceManager.get('src'))
+        fit = Fit(source='src')
+        self.assertIs(fit.source.cache_handler, self.made_handlers[0])
+        self.assertEqual(SourceManager.get_lazy_stats().loads, 1)
+
+    def test_default(self):
+        self.add('src', make_default=True)
+        self.assertEqual(SourceManager.get_lazy_stats().loads, 0)
+        self.assertIs(SourceManager.default, SourceManager.get('src'))
+        self.assertEqual(SourceManager.get_lazy_stats().loads, 1)
+        SourceManager.remove('src')
+        self.assertIsNone(SourceManager.default)
+
+    def test_no_eviction_by_default(self):
+        self.add('src')
+        SourceManager.get('src')
+        self.assertEqual(SourceManager.evict(), [])
+        self.assertEqual(SourceManager.get_lazy_stats().loaded, 1)
+
+    def test_idle_eviction(self):
+        SourceManager.idle_time = 0
+        self.add('src')
+        fit = Fit(source='src')
+        source = fit.source
+        # Used by live fit
+        self.assertEqual(SourceManager.evict(), [])
+        del fit
+        gc.collect()
+        self.assertEqual(SourceManager.evict(), ['src'])
+        stats = SourceManager.get_lazy_stats()
+        self.assertEqual(stats.evictions, 1)
+        self.assertEqual(stats.loaded, 0)
+        self.assertEqual(stats.size, 0)
+        # Loaded again with new handlers
+        self.assertIsNot(SourceManager.get('src'), source)
+        self.assertEqual(len(self.made_handlers), 2)
+        self.assertEqual(SourceManager.get_lazy_stats().loads, 2)
+
+    def test_idle_time(self):
+        SourceManager.idle_time = 3600
+        self.add('src')
+        SourceManager.get('src')
+        self.assertEqual(SourceManager.evict(), [])
+
+    def test_source_switch(self):
+        SourceManager.idle_time = 0
+        self.add('src1')
+        self.add('src2')
+        fit = Fit(source='src1')
+        fit.source = 'src2'
+        self.assertEqual(SourceManager.evict(), ['src1'])
+        fit.source = None
+        self.assertEqual(SourceManager.evict(), ['src2'])
+
+    def test_record_budget(self):
+        SourceManager.record_budget = 250
+        self.add('src1')
+        self.add('src2')
+        self.add('src3')
+        fit = Fit(source='src1')
+        SourceManager.get('src2')
+        # Loading third source exceeds budget, least recently
+        # used source which has no fits is evicted
+        SourceManager.get('src3')
+        self.assertIn('src1', SourceManager._sources)
+        self.assertNotIn('src2', SourceManager._sources)
+        self.assertIn('src3', SourceManager._sources)
+        stats = SourceManager.get_lazy_stats()
+        self.assertEqual(stats.evictions, 1)
+        self.assertEqual(stats.size, 200)
+        self.assertIs(fit.source, SourceManager.get('src1'))
+
+    def test_budget_eviction_before_tracking(self):
+        SourceManager.record_budget = 50
+        self.add('src')
+        track_fit = SourceManager._track_fit
+
+        def evict_and_track(fit, old_source, new_source):
+            # Other thread evicts unused sources before
+            # fit reports that it uses the source
+            evicted.extend(SourceManager.evict())
+            track_fit(fit, old_source, new_source)
+
+        evicted = []
+        with patch.object(SourceManager, '_track_fit', evict_and_track):
+            fit = Fit(source='src')
+        self.assertEqual(evicted, [])
+        self.assertIs(fit.source, SourceManager.get('src'))
+        self.assertEqual(SourceManager.get_lazy_stats().loads, 1)
+
+    def test_no_record_counts(self):
+        cache_handler = self.make_cache_handler()
+        del cache_handler.get_record_counts
+        SourceManager.add_lazy('src', None, lambda: cache_handler)
+        SourceManager.get('src')
+        self.assertEqual(SourceManager.get_lazy_stats().size, 0)
+        warnings = [r for r in self.log if r.levelno == logging.WARNING]
+        self.assertEqual(len(warnings), 1)
+        self.assertEqual(warnings[0].name, 'eos.data.source')
+
+    def test_remove(self):
+        self.add('src')
+        SourceManager.get('src')
+        SourceManager.remove('src')
+        self.assertEqual(SourceManager.list(), [])
+        self.assertRaises(UnknownSourceError, SourceManager.get, 'src')
+        self.assertEqual(SourceManager.get_lazy_stats().loaded, 0)
+
+    def test_async(self):
+        self.add('src')
+        source = asyncio.run(SourceManager.get_async('src'))
+        self.assertIs(source, SourceManager.get('src'))
+        self.assertEqual(SourceManager.get_lazy_stats().loads, 1)
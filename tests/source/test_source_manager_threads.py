@@ -0,0 +1,188 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+import sys
+from threading import Barrier, Event, Thread
+from unittest.mock import Mock
+
+from eos import __version__ as eos_version
+from eos.const.eve import Type
+from eos.data.exception import ExistingSourceError
+from eos.data.source import SourceManager
+from eos.fit import Fit
+from eos.tests.eos_testcase import EosTestCase
+
+
+class TestSourceManagerThreads(EosTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.__old_state = {
+            attr_name: getattr(SourceManager, attr_name) for attr_name in (
+                '_sources', '_lazy', '_fit_refs', '_idle_since', '_sizes', '_loads', '_default',
+                '_default_alias')}
+        SourceManager._sources = {}
+        SourceManager._lazy = {}
+        SourceManager._fit_refs = {}
+        SourceManager._idle_since = {}
+        SourceManager._sizes = {}
+        SourceManager._loads = 0
+        SourceManager.default = None
+        self.__old_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.__old_interval)
+        for attr_name, value in self.__old_state.items():
+            setattr(SourceManager, attr_name, value)
+        super().tearDown()
+
+    def make_cache_handler(self):
+        cache_handler = Mock()
+        cache_handler.get_fingerprint.return_value = '1_{}'.format(eos_version)
+        cache_handler.get_record_counts.return_value = {}
+        return cache_handler
+
+    def run_threads(self, target, amount=8):
+        barrier = Barrier(amount)
+        errors = []
+        results = []
+
+        def run():
+            barrier.wait()
+            try:
+                results.append(target())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [Thread(target=run) for _ in range(amount)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return results
+
+    def test_lazy_load(self):
+        SourceManager.add_lazy('src', None, self.make_cache_handler)
+        results = self.run_threads(lambda: SourceManager.get('src'))
+        # Source is loaded once, and all threads get it
+        self.assertEqual(SourceManager.get_lazy_stats().loads, 1)
+        self.assertEqual(len(set(map(id, results))), 1)
+
+    def test_parallel_loads(self):
+        slow_loading = Event()
+        proceed = Event()
+
+        def make_slow_cache_handler():
+            slow_loading.set()
+            proceed.wait(5)
+            return self.make_cache_handler()
+
+        SourceManager.add_lazy('slow', None, make_slow_cache_handler)
+        SourceManager.add_lazy('fast', None, self.make_cache_handler)
+        slow_thread = Thread(target=SourceManager.get, args=('slow',))
+        fast_thread = Thread(target=SourceManager.get, args=('fast',))
+        slow_thread.start()
+        try:
+            self.assertTrue(slow_loading.wait(5))
+            # Source is loaded while other one is still loading
+            fast_thread.start()
+            fast_thread.join(2)
+            self.assertFalse(fast_thread.is_alive())
+        finally:
+            proceed.set()
+            for thread in (slow_thread, fast_thread):
+                if thread.is_alive():
+                    thread.join()
+        self.assertEqual(SourceManager.get_lazy_stats().loads, 2)
+
+    def test_lookup_during_registration(self):
+        SourceManager.add('src', None, self.make_cache_handler())
+        source = SourceManager.get('src')
+        thread_ids = iter(range(8))
+
+        def run():
+            thread_id = next(thread_ids)
+            # Half of threads keep adding and removing
+            # sources, others look existing source up
+            for i in range(300):
+                if thread_id % 2:
+                    alias = 'tmp_{}_{}'.format(thread_id, i)
+                    SourceManager.add(alias, None, self.make_cache_handler())
+                    SourceManager.remove(alias)
+                self.assertIs(SourceManager.get('src'), source)
+
+        self.run_threads(run)
+        self.assertEqual(SourceManager.list(), ['src'])
+
+    def test_add_reserves_alias(self):
+        preparing = Event()
+        proceed = Event()
+        cache_handler = self.make_cache_handler()
+
+        def get_fingerprint():
+            preparing.set()
+            proceed.wait(5)
+            return '1_{}'.format(eos_version)
+
+        cache_handler.get_fingerprint.side_effect = get_fingerprint
+        thread = Thread(target=SourceManager.add, args=('src', None, cache_handler))
+        thread.start()
+        self.assertTrue(preparing.wait(5))
+        try:
+            self.assertRaises(ExistingSourceError, SourceManager.add, 'src', None, self.make_cache_handler())
+            self.assertRaises(ExistingSourceError, SourceManager.add_lazy, 'src', None, self.make_cache_handler)
+        finally:
+            proceed.set()
+            thread.join()
+        self.assertIs(SourceManager.get('src').cache_handler, cache_handler)
+        self.assertEqual(SourceManager._pending, {})
+
+    def test_fit_tracking_during_eviction(self):
+        self.ch.type_(type_id=Type.character_static)
+
+        def make_cache_handler():
+            cache_handler = self.make_cache_handler()
+            cache_handler.get_type.side_effect = self.ch.get_type
+            return cache_handler
+
+        SourceManager.add_lazy('src', None, make_cache_handler)
+        old_idle_time = SourceManager.idle_time
+        SourceManager.idle_time = 0
+        thread_ids = iter(range(8))
+
+        def run():
+            thread_id = next(thread_ids)
+            # Half of threads keep making fits, which are
+            # released right away, others keep evicting
+            for _ in range(300):
+                if thread_id % 2:
+                    Fit(source='src')
+                else:
+                    SourceManager.evict()
+
+        try:
+            self.run_threads(run)
+        finally:
+            SourceManager.idle_time = old_idle_time
+        self.assertEqual(SourceManager._idle_since.keys() - SourceManager._sizes.keys(), set())
@@ -47,3 +47,39 @@ class CachedProperty:
         value = self.__method(instance)
         setattr(instance, self.__method.__name__, value)
         return value
+
+
+class CachedSlotProperty:
+    """
+    Analogue of CachedProperty for classes which use __slots__, thus
+    have no instance dictionary to store results in. Result is stored
+    in slot named after decorated method with _cached_ prefix (e.g.
+    _cached_slots for slots method), which class has to declare.
+    Cached value can be overridden by assignment, and cache can be
+    cleared by deletion.
+    """
+
+    def __init__(self, method):
+        self.__method = method
+        self.__slot_name = '_cached_{}'.format(method.__name__)
+
+    def __get__(self, instance, owner):
+        # Return descriptor if called from class
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.__slot_name)
+        except AttributeError:
+            pass
+        value = self.__method(instance)
+        setattr(instance, self.__slot_name, value)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.__slot_name, value)
+
+    def __delete__(self, instance):
+        try:
+            delattr(instance, self.__slot_name)
+        except AttributeError:
+            pass
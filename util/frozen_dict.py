@@ -40,6 +40,11 @@ class FrozenDict(dict):
     # Prohibit use of methods which modify dictionary
     __delitem__ = __setitem__ = clear = pop = popitem = setdefault = update = _blocked_attribute
 
+    def __reduce__(self):
+        # Default pickling fills dictionary item by item,
+        # which is prohibited for frozen dictionary
+        return type(self), (dict(self),)
+
     @CachedProperty
     def _hash(self):
         return hash(frozenset(self.items()))
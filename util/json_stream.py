@@ -0,0 +1,222 @@
+#===============================================================================
+# Copyright (C) 2011 Diego Duclos
+# Copyright (C) 2011-2015 Anton Vorobyov
+#
+# This file is part of Eos.
+#
+# Eos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Eos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Eos. If not, see <http://www.gnu.org/licenses/>.
+#===============================================================================
+
+
+from json import JSONDecodeError, JSONDecoder
+from json.decoder import WHITESPACE
+
+
+# Amount of characters read from file at once
+CHUNK_SIZE = 65536
+
+_scan_once = JSONDecoder().scan_once
+_skip_whitespace = WHITESPACE.match
+_whitespace_chars = ' \t\n\r'
+
+
+def iter_json_stream(file, values_only=False, chunk_size=CHUNK_SIZE):
+    """
+    Parse JSON document incrementally, without loading whole
+    document into memory.
+
+    Required arguments:
+    file -- text file object with JSON document, which must be
+    array or object at top level
+
+    Optional arguments:
+    values_only -- when top level is object, yield just its values
+    chunk_size -- amount of characters read from file at once
+
+    Return value:
+    Iterator over items of top-level array, or over (key, value)
+    tuples of top-level object
+
+    Possible exceptions:
+    JSONDecodeError -- raised when document is malformed
+    """
+    buffer = ''
+    pos = 0
+    # Leading whitespace may take more than one chunk
+    while True:
+        pos = _skip_whitespace(buffer, pos).end()
+        if pos < len(buffer):
+            break
+        new_buffer = _read(file, buffer, pos, chunk_size)
+        if new_buffer is None:
+            break
+        buffer = new_buffer
+        pos = 0
+    opening = buffer[pos:pos + 1]
+    if opening == '[':
+        closing = ']'
+        is_object = False
+    elif opening == '{':
+        closing = '}'
+        is_object = True
+    else:
+        raise JSONDecodeError('Expecting array or object at top level', buffer, pos)
+    pos += 1
+    # Position of the first character of current item, parsing
+    # of item is restarted from it when we need more data
+    item_pos = pos
+    key = None
+    first_item = True
+    # Items before this position are parsed one by one
+    slow_until = 0
+    # Scanner shares equal keys only within single value it parses,
+    # thus share keys of items parsed one by one ourselves, to keep
+    # memory footprint on par with parsing whole document
+    # Format: {key: key}
+    share_key = {}.setdefault
+    # Whether we expect key of object item or value
+    expect_key = is_object
+    while True:
+        # Regular expression call is relatively slow, thus
+        # avoid it when there's no whitespace to skip
+        if pos < len(buffer) and buffer[pos] in _whitespace_chars:
+            pos = _skip_whitespace(buffer, pos).end()
+        # Data ended right before next value or delimiter
+        if pos >= len(buffer):
+            new_buffer = _read(file, buffer, item_pos, chunk_size)
+            if new_buffer is None:
+                raise JSONDecodeError('Unexpected end of document', buffer, pos)
+            pos -= item_pos
+            buffer = new_buffer
+            item_pos = slow_until = 0
+            continue
+        # Empty container
+        if first_item and buffer[pos] == closing:
+            pos += 1
+            break
+        # Parsing each item separately is slow, thus when we are
+        # at item boundary, attempt to parse all complete items in
+        # buffer at once as standalone container
+        if (expect_key or not is_object) and pos >= slow_until:
+            batch_end = _find_batch_end(buffer, pos)
+            if batch_end is None:
+                slow_until = len(buffer)
+            else:
+                try:
+                    batch, end = _scan_once('{}{}{}'.format(opening, buffer[pos:batch_end], closing), 0)
+                except (StopIteration, JSONDecodeError):
+                    batch = end = None
+                # Comma we found may belong to nested container,
+                # in this case parse items one by one up to it
+                if end != batch_end - pos + 2:
+                    slow_until = batch_end
+                else:
+                    if not is_object:
+                        yield from batch
+                    elif values_only:
+                        yield from batch.values()
+                    else:
+                        yield from batch.items()
+                    pos = item_pos = batch_end + 1
+                    first_item = False
+                    continue
+        try:
+            value, end = _scan_once(buffer, pos)
+        except (StopIteration, JSONDecodeError):
+            value = end = None
+        # Numbers cut by end of data are parsed successfully,
+        # thus we need delimiter after value to be sure it's
+        # complete
+        if end is not None:
+            delimiter_pos = end
+            if end < len(buffer) and buffer[end] in _whitespace_chars:
+                delimiter_pos = _skip_whitespace(buffer, end).end()
+            delimiter = buffer[delimiter_pos:delimiter_pos + 1]
+        else:
+            delimiter = None
+        if expect_key:
+            valid = delimiter == ':' and isinstance(value, str)
+        else:
+            valid = delimiter == ',' or delimiter == closing
+        if not valid:
+            new_buffer = _read(file, buffer, item_pos, chunk_size)
+            if new_buffer is None:
+                raise JSONDecodeError('Malformed item', buffer, pos)
+            # Reparse whole item, as key may be parsed
+            # before cut value
+            buffer = new_buffer
+            pos = item_pos = slow_until = 0
+            expect_key = is_object
+            continue
+        pos = delimiter_pos + 1
+        if expect_key:
+            key = value
+            expect_key = False
+            continue
+        if type(value) is dict:
+            value = {share_key(k, k): v for k, v in value.items()}
+        if not is_object:
+            yield value
+        elif values_only:
+            yield value
+        else:
+            yield key, value
+        item_pos = pos
+        expect_key = is_object
+        first_item = False
+        if delimiter == closing:
+            break
+    pos = _skip_whitespace(buffer, pos).end()
+    while pos >= len(buffer):
+        new_buffer = _read(file, buffer, pos, chunk_size)
+        if new_buffer is None:
+            return
+        buffer = new_buffer
+        pos = _skip_whitespace(buffer, 0).end()
+    raise JSONDecodeError('Extra data', buffer, pos)
+
+
+def _find_batch_end(buffer, start):
+    """
+    Find the last comma in buffer which follows closing bracket,
+    i.e. which is likely to separate complete items.
+
+    Return value:
+    Position of the comma, or None if there's no such comma
+    """
+    end = buffer.rfind(',', start)
+    while end > start:
+        prev_pos = end - 1
+        while prev_pos > start and buffer[prev_pos] in _whitespace_chars:
+            prev_pos -= 1
+        if buffer[prev_pos] in '}]':
+            return end
+        end = buffer.rfind(',', start, end)
+    return None
+
+
+def _read(file, buffer, pos, chunk_size):
+    """
+    Read next chunk of file, dropping part of buffer before
+    passed position.
+
+    Return value:
+    New buffer, or None if file has no more data
+    """
+    # Read at least as much as we already have, so that
+    # long items are not reparsed over and over
+    chunk = file.read(max(chunk_size, len(buffer) - pos))
+    if not chunk:
+        return None
+    return buffer[pos:] + chunk